@@ -0,0 +1,100 @@
+"""
+Seeds the event table, moves the payloads to a file system blob store with
+``pinax_stripe_offload_events`` and reports the size of the event table
+before and after, the time the move took, and the cost of reading
+``event.message`` from the database, from the store, and from the cache.
+
+    python benchmarks/blob_offload.py [--events 20000]
+"""
+import argparse
+import random
+import shutil
+import tempfile
+from io import StringIO
+
+from event_kinds import megabytes
+from payload_compression import KINDS, payloads
+from utils import Timer, setup
+
+
+def table_size():
+    from django.db import connection
+
+    from pinax.stripe.models import Event
+
+    table = Event._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table])
+            except Exception:
+                return None
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+def read_all(pks):
+    from pinax.stripe.models import Event
+
+    with Timer() as timer:
+        for pk in pks:
+            if Event.objects.get(pk=pk).message is None:
+                raise RuntimeError("event {} read no message".format(pk))
+    return timer.elapsed / len(pks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--cache-size", type=int, default=128)
+    args = parser.parse_args()
+
+    location = tempfile.mkdtemp()
+    setup(
+        PINAX_STRIPE_BLOB_STORE="pinax.stripe.blobs.FileSystemBlobStore",
+        PINAX_STRIPE_BLOB_LOCATION=location,
+        PINAX_STRIPE_BLOB_CACHE_SIZE=args.cache_size,
+    )
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    from pinax.stripe.models import Event
+
+    rng = random.Random(0)
+    per_kind = max(1, args.events // len(KINDS))
+    print("seeding {} events...".format(per_kind * len(KINDS)))
+    for kind in KINDS:
+        Event.objects.bulk_create([Event.objects.build(message) for message in payloads(kind, per_kind, rng)])
+    pks = list(Event.objects.order_by("?").values_list("pk", flat=True)[:1000])
+
+    before = table_size()
+    database = read_all(pks)
+
+    with Timer() as timer:
+        call_command("pinax_stripe_offload_events", "--all", stdout=StringIO())
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM")
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM FULL {}".format(connection.ops.quote_name(Event._meta.db_table)))
+    after = table_size()
+
+    store = read_all(pks)
+    cached = read_all(pks[-args.cache_size:])
+    shutil.rmtree(location)
+
+    print("event table: {} MB before, {} MB after".format(megabytes(before), megabytes(after)))
+    print("offload: {:.1f}s ({:.0f} events/s)".format(timer.elapsed, Event.objects.count() / timer.elapsed))
+    print("{:<24} {:>10}".format("read message from", "us/event"))
+    print("{:<24} {:>10.1f}".format("database", database * 1e6))
+    print("{:<24} {:>10.1f}".format("blob store", store * 1e6))
+    print("{:<24} {:>10.1f}".format("cache", cached * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-event cost of resolving a handler and its signals.
+
+    python benchmarks/dispatch.py [--patterns 20] [--number 200000]
+"""
+import argparse
+import fnmatch
+import random
+import timeit
+
+from utils import setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patterns", type=int, default=20, help="Number of wildcard subscriptions.")
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    setup()
+
+    from pinax.stripe.webhooks import registry
+
+    kinds = sorted(registry.keys())
+    prefixes = sorted({kind.rsplit(".", 1)[0] for kind in kinds})
+    for prefix in prefixes[:args.patterns]:
+        registry.get_signal("{}.*".format(prefix))
+    patterns = dict(registry._patterns)
+    stream = [random.Random(0).choice(kinds) for _ in range(1024)]
+
+    def exact_only():
+        for kind in stream:
+            registry.get(kind)
+            registry.get_signal(kind)
+
+    def scan_patterns():
+        for kind in stream:
+            registry.get(kind)
+            [registry.get_signal(kind)] + [
+                signal for pattern, signal in patterns.items() if fnmatch.fnmatchcase(kind, pattern)
+            ]
+
+    def dispatch_table():
+        for kind in stream:
+            registry.resolve(kind)
+
+    registry.compile()
+    print("{} event types, {} wildcard subscriptions".format(len(kinds), len(patterns)))
+    for label, func in [
+        ("exact lookups (no wildcards)", exact_only),
+        ("exact + pattern scan", scan_patterns),
+        ("compiled dispatch table", dispatch_table),
+    ]:
+        loops = max(1, args.number // len(stream))
+        elapsed = min(timeit.repeat(func, number=loops, repeat=3))
+        print("{:<30} {:>8.1f} ns/event".format(label, elapsed / (loops * len(stream)) * 1e9))
+
+
+if __name__ == "__main__":
+    main()
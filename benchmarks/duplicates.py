@@ -0,0 +1,62 @@
+"""
+Latency of acknowledging redeliveries of events that are already stored,
+without a seen filter and with the in-process and cache backed ones.
+
+    python benchmarks/duplicates.py [--events 200] [--redeliveries 5]
+"""
+import argparse
+
+from utils import Timer, encode, event_payload, report, setup, sign
+
+FILTERS = [
+    ("database only", None),
+    ("local", "pinax.stripe.dedup.LocalSeenFilter"),
+    ("cache (locmem)", "pinax.stripe.dedup.CacheSeenFilter"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--redeliveries", type=int, default=5)
+    args = parser.parse_args()
+
+    setup(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+
+    from django.conf import settings
+    from django.test import RequestFactory, override_settings
+
+    from pinax.stripe.dedup import get_filter
+    from pinax.stripe.models import Event
+    from pinax.stripe.views import Webhook
+
+    factory = RequestFactory()
+    view = Webhook.as_view()
+
+    for position, (label, path) in enumerate(FILTERS):
+        Event.objects.all().delete()
+        bodies = [encode(event_payload("evt_{}_{}".format(position, index))) for index in range(args.events)]
+        samples = []
+        with override_settings(PINAX_STRIPE_SEEN_FILTER=path):
+            for attempt in range(args.redeliveries + 1):
+                for body in bodies:
+                    request = factory.post(
+                        "/webhook/",
+                        data=body,
+                        content_type="application/json",
+                        HTTP_STRIPE_SIGNATURE=sign(body, settings.PINAX_STRIPE_ENDPOINT_SECRET),
+                    )
+                    with Timer() as timer:
+                        response = view(request)
+                    assert response.status_code == 200, response.status_code
+                    if attempt:
+                        samples.append(timer.elapsed)
+            seen = get_filter()
+            if seen is not None:
+                stats = seen.stats()
+                label = "{} ({:.0%} hits)".format(label, stats.hit_rate)
+        report(label, samples)
+
+
+if __name__ == "__main__":
+    main()
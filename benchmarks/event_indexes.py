@@ -0,0 +1,137 @@
+"""
+Seeds the event table and times the admin changelist and the replay/lookup
+queries without and with the indexes from migration 0004.
+
+    python benchmarks/event_indexes.py [--rows 1000000]
+"""
+import argparse
+import datetime
+import random
+
+from utils import Timer, setup
+
+# added by migration 0004
+INDEXES = [
+    "pinax_stripe_evt_unproc_idx",
+    "pinax_stripe_evt_kind_idx",
+    "pinax_stripe_evt_customer_idx",
+    "pinax_stripe_evt_account_idx",
+]
+
+QUERIES = [
+    "admin: changelist",
+    "admin: kind filter",
+    "admin: unprocessed filter",
+    "replay: unprocessed",
+    "replay: unprocessed by kind",
+    "lookup: customer timeline",
+    "lookup: account timeline",
+]
+
+
+def seed(rows, batch_size=20000):
+    from django.utils import timezone
+
+    from pinax.stripe.models import Event
+    from pinax.stripe.webhooks import registry
+
+    kinds = sorted(registry.keys())
+    start = timezone.now() - datetime.timedelta(days=365)
+    rng = random.Random(0)
+    for offset in range(0, rows, batch_size):
+        Event.objects.bulk_create([
+            Event(
+                stripe_id="evt_{:012d}".format(index),
+                kind=rng.choice(kinds),
+                livemode=True,
+                customer_id="cus_{:06d}".format(rng.randrange(10000)),
+                account_id="acct_{:04d}".format(rng.randrange(1000)),
+                message={"id": "evt_{:012d}".format(index)},
+                processed=rng.random() > 0.02,
+                created_at=start + datetime.timedelta(seconds=index * 31536000 // rows),
+            )
+            for index in range(offset, min(rows, offset + batch_size))
+        ])
+
+
+def run_queries(repeat):
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+
+    from pinax.stripe.models import Event
+    from pinax.stripe.replay import Replay
+
+    user = get_user_model()(username="bench", is_staff=True, is_superuser=True)
+    model_admin = admin.site._registry[Event]
+    factory = RequestFactory()
+
+    def changelist(**params):
+        request = factory.get("/admin/pinax_stripe/event/", params)
+        request.user = user
+        return model_admin.changelist_view(request).render()
+
+    queries = {
+        "admin: changelist": lambda: changelist(),
+        "admin: kind filter": lambda: changelist(kind="invoice.paid"),
+        "admin: unprocessed filter": lambda: changelist(processed__exact="0"),
+        "replay: unprocessed": lambda: list(Replay().queryset().values_list("pk", flat=True)[:500]),
+        "replay: unprocessed by kind": lambda: list(Replay(kinds=["invoice.paid"]).queryset().values_list("pk", flat=True)[:500]),
+        "lookup: customer timeline": lambda: list(Event.objects.filter(customer_id="cus_000042").order_by("-created_at")[:50]),
+        "lookup: account timeline": lambda: list(Event.objects.filter(account_id="acct_0042").order_by("-created_at")[:50]),
+    }
+    results = {}
+    for label in QUERIES:
+        best = None
+        for _ in range(repeat):
+            with Timer() as timer:
+                queries[label]()
+            best = timer.elapsed if best is None else min(best, timer.elapsed)
+        results[label] = best
+    return results
+
+
+def analyze():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db import connection
+
+    from pinax.stripe.models import Event
+
+    print("seeding {} events...".format(args.rows))
+    seed(args.rows)
+    # drop the indexes rather than migrating back, later migrations add columns
+    indexes = [index for index in Event._meta.indexes if index.name in INDEXES]
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(Event, index)
+    analyze()
+    before = run_queries(args.repeat)
+
+    with Timer() as timer:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Event, index)
+    print("index build: {:.1f}s".format(timer.elapsed))
+    analyze()
+    after = run_queries(args.repeat)
+
+    print("{:<30} {:>12} {:>12}".format("query", "before (ms)", "after (ms)"))
+    for label in QUERIES:
+        print("{:<30} {:>12.2f} {:>12.2f}".format(label, before[label] * 1000, after[label] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compares storing the event type as a string with storing it as a small
+integer code (migration 0012): the size of the column's table and indexes,
+and the time of the admin kind filter.
+
+Both variants are narrow copies of the seeded event table holding only the
+columns the kind indexes cover, so the sizes differ by the kind column alone.
+
+    python benchmarks/event_kinds.py [--rows 1000000]
+"""
+import argparse
+
+from event_indexes import analyze, seed
+from utils import Timer, setup
+
+VARIANTS = {
+    "string": "varchar(250)",
+    "code": "smallint",
+}
+
+
+def create_variant(name, column_type):
+    from django.db import connection
+
+    from pinax.stripe.models import Event, EventType
+
+    table = "bench_kind_{}".format(name)
+    kind = "t.name" if name == "string" else "e.kind"
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TABLE {} (id integer PRIMARY KEY, kind {} NOT NULL, created_at timestamp, stripe_created_at timestamp)".format(
+            table,
+            column_type
+        ))
+        cursor.execute(
+            "INSERT INTO {} SELECT e.id, {}, e.created_at, e.stripe_created_at FROM {} e JOIN {} t ON t.id = e.kind".format(
+                table,
+                kind,
+                Event._meta.db_table,
+                EventType._meta.db_table
+            )
+        )
+        cursor.execute("CREATE INDEX {0}_kind_idx ON {0} (kind, created_at)".format(table))
+        cursor.execute("CREATE INDEX {0}_kind_sc_idx ON {0} (kind, stripe_created_at)".format(table))
+    return table
+
+
+def relation_size(name):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_relation_size(%s)", [name])
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [name])
+            except Exception:
+                # SQLite built without the dbstat table
+                return None
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+def megabytes(size):
+    return "n/a" if size is None else "{:.1f}".format(size / 1048576)
+
+
+def time_filter(table, value, repeat):
+    from django.db import connection
+
+    # the queries the admin issues for the kind filter: its choices, then
+    # the filtered count and first page
+    queries = [
+        ("SELECT DISTINCT kind FROM {} ORDER BY kind".format(table), []),
+        ("SELECT COUNT(*) FROM {} WHERE kind = %s".format(table), [value]),
+        ("SELECT id FROM {} WHERE kind = %s ORDER BY created_at DESC LIMIT 100".format(table), [value]),
+    ]
+    best = None
+    for _ in range(repeat):
+        with Timer() as timer, connection.cursor() as cursor:
+            for sql, params in queries:
+                cursor.execute(sql, params)
+                cursor.fetchall()
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+    return best
+
+
+def time_changelist(repeat):
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+
+    from pinax.stripe.models import Event
+
+    user = get_user_model()(username="bench", is_staff=True, is_superuser=True)
+    model_admin = admin.site._registry[Event]
+    best = None
+    for _ in range(repeat):
+        request = RequestFactory().get("/admin/pinax_stripe/event/", {"kind": "invoice.paid"})
+        request.user = user
+        with Timer() as timer:
+            model_admin.changelist_view(request).render()
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+
+    from pinax.stripe.models import EventType
+
+    print("seeding {} events...".format(args.rows))
+    seed(args.rows)
+    tables = {name: create_variant(name, column_type) for name, column_type in VARIANTS.items()}
+    analyze()
+
+    values = {"string": "invoice.paid", "code": EventType.objects.code_for("invoice.paid")}
+    print("{:<10} {:>12} {:>16} {:>16} {:>14}".format("kind", "table (MB)", "kind_idx (MB)", "kind_sc_idx (MB)", "filter (ms)"))
+    for name, table in tables.items():
+        print("{:<10} {:>12} {:>16} {:>16} {:>14.2f}".format(
+            name,
+            megabytes(relation_size(table)),
+            megabytes(relation_size("{}_kind_idx".format(table))),
+            megabytes(relation_size("{}_kind_sc_idx".format(table))),
+            time_filter(table, values[name], args.repeat) * 1000
+        ))
+    print("admin changelist filtered on kind: {:.2f}ms".format(time_changelist(args.repeat) * 1000))
+
+
+if __name__ == "__main__":
+    main()
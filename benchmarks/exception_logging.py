@@ -0,0 +1,78 @@
+"""
+Cost of logging handler failures during an outage, where every event fails
+the same way: one EventProcessingException row per failure (as before)
+against grouping them, with full captures sampled at a few rates.
+
+    python benchmarks/exception_logging.py [--failures 2000]
+"""
+import argparse
+import sys
+import traceback
+
+from utils import Timer, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--failures", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db import connection
+    from django.test import override_settings
+
+    from pinax.stripe.models import (
+        Event,
+        EventProcessingException,
+        EventProcessingExceptionGroup
+    )
+    from pinax.stripe.webhooks import registry
+
+    WebhookClass = registry.get("invoice.paid")
+    events = [
+        Event.objects.create(stripe_id="evt_{}".format(index), kind="invoice.paid", message={})
+        for index in range(args.failures)
+    ]
+
+    def downstream(event):
+        raise ConnectionError("Connection to billing-sync refused while handling {}".format(event.stripe_id))
+
+    def row_per_failure(webhook, exception):
+        EventProcessingException.objects.create(
+            event=webhook.event,
+            data="",
+            message=str(exception),
+            traceback="".join(traceback.format_exception(*sys.exc_info()))
+        )
+
+    def grouped(webhook, exception):
+        webhook.log_exception(data=None, exception=exception)
+
+    print("{:<30} {:>14} {:>12} {:>8}".format("mode", "us/failure", "exceptions", "groups"))
+    for label, log, rate in [
+        ("row per failure", row_per_failure, 1.0),
+        ("grouped, sample 100%", grouped, 1.0),
+        ("grouped, sample 10%", grouped, 0.1),
+        ("grouped, sample 1% (default)", grouped, 0.01),
+    ]:
+        EventProcessingException.objects.all().delete()
+        EventProcessingExceptionGroup.objects.all().delete()
+        with override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_RATE=rate), Timer() as timer:
+            for event in events:
+                webhook = WebhookClass(event)
+                try:
+                    downstream(event)
+                except ConnectionError as e:
+                    log(webhook, e)
+        connection.close()
+        print("{:<30} {:>14.1f} {:>12} {:>8}".format(
+            label,
+            timer.elapsed / args.failures * 1e6,
+            EventProcessingException.objects.count(),
+            EventProcessingExceptionGroup.objects.count(),
+        ))
+
+
+if __name__ == "__main__":
+    main()
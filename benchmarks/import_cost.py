@@ -0,0 +1,105 @@
+"""
+Time and memory spent setting up the app and importing
+``pinax.stripe.webhooks`` in a fresh process, for this tree and for a
+baseline revision checked out with ``git archive``. The default baseline is
+the revision before handler classes and signals were created lazily, whose
+webhooks package star-imported the 177 generated classes.
+
+``--revision`` measures another revision than the working tree the same way.
+
+    python benchmarks/import_cost.py [--runs 10] [--baseline REV] [--revision REV]
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from utils import ROOT
+
+CHILD = """
+import json, sys, time, tracemalloc
+sys.path.insert(0, {path!r})
+from django.conf import settings
+settings.configure(
+    INSTALLED_APPS=["pinax.stripe"],
+    PINAX_STRIPE_SECRET_KEY="sk",
+    PINAX_STRIPE_PUBLIC_KEY="pk",
+    PINAX_STRIPE_ENDPOINT_SECRET="whsec",
+)
+# keep third party imports out of the numbers
+import appconf, django, django.db.models, django.dispatch, pkg_resources, stripe
+if {memory}:
+    tracemalloc.start()
+start = time.perf_counter()
+django.setup()
+import pinax.stripe.webhooks
+end = time.perf_counter()
+current, peak = tracemalloc.get_traced_memory()
+print(json.dumps({{"setup": end - start, "memory": current}}))
+"""
+
+
+def git(*args):
+    return subprocess.check_output(["git"] + list(args), cwd=ROOT).decode("utf-8").strip()
+
+
+def eager_revision():
+    # the last revision whose webhooks package star-imported the generated classes
+    lazy = git("log", "-1", "--format=%H", "-S", "from .generated import *", "--", "pinax/stripe/webhooks/__init__.py")
+    return "{}^".format(lazy)
+
+
+def checkout(revision):
+    path = tempfile.mkdtemp()
+    archive = subprocess.Popen(["git", "archive", revision, "pinax"], cwd=ROOT, stdout=subprocess.PIPE)
+    subprocess.check_call(["tar", "-x", "-C", path], stdin=archive.stdout)
+    if archive.wait() != 0:
+        raise SystemExit("git archive {} failed".format(revision))
+    return path
+
+
+def run_child(path, memory):
+    # run from the root so the package metadata is found, importing path's pinax
+    output = subprocess.check_output([sys.executable, "-c", CHILD.format(path=path, memory=memory)], cwd=ROOT)
+    return json.loads(output)
+
+
+def measure(path, runs):
+    # time without tracemalloc, which slows allocations down considerably
+    return (
+        statistics.median(run_child(path, memory=False)["setup"] for _ in range(runs)),
+        statistics.median(run_child(path, memory=True)["memory"] for _ in range(runs)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", help="Git revision to compare with (default: the last eager one).")
+    parser.add_argument("--revision", help="Git revision to measure instead of the working tree.")
+    args = parser.parse_args()
+
+    trees = [(git("rev-parse", "--short", args.baseline or eager_revision()), None)]
+    if args.revision is None:
+        trees.append(("working", ROOT))
+    else:
+        trees.append((git("rev-parse", "--short", args.revision), None))
+    checkouts = []
+    try:
+        print("{:<12} {:>16} {:>14}".format("tree", "app setup (ms)", "memory (KiB)"))
+        for label, path in trees:
+            if path is None:
+                path = checkout(label)
+                checkouts.append(path)
+            setup, memory = measure(path, args.runs)
+            print("{:<12} {:>16.2f} {:>14.1f}".format(label, setup * 1000, memory / 1024.0))
+    finally:
+        for path in checkouts:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Time and peak memory per webhook request for small, medium and huge events,
+comparing the old ingest path (``stripe.Webhook.construct_event`` then
+``to_dict_recursive()`` then serializing the dict again on insert) with
+verifying and storing the raw body, parsed once with the stdlib or orjson.
+
+Events are only stored (database backend), so handlers are not part of the
+numbers.
+
+    python benchmarks/ingest.py [--requests 50]
+"""
+import argparse
+import tracemalloc
+
+from utils import Timer, encode, event_payload, percentile, setup, sign
+
+SIZES = [("small", 0), ("medium", 50), ("huge", 2000)]
+
+
+def invoice(lines):
+    return {
+        "id": "in_1",
+        "object": "invoice",
+        "customer": "cus_1",
+        "amount_due": 1000 * lines,
+        "currency": "usd",
+        "lines": {
+            "object": "list",
+            "has_more": False,
+            "total_count": lines,
+            "data": [
+                {
+                    "id": "il_{}".format(index),
+                    "object": "line_item",
+                    "amount": 1000,
+                    "currency": "usd",
+                    "description": "1 x Gold plan (at $10.00 / month)",
+                    "discountable": True,
+                    "livemode": False,
+                    "metadata": {"order": str(index)},
+                    "period": {"start": 1600000000, "end": 1602592000},
+                    "plan": {"id": "gold", "object": "plan", "amount": 1000, "interval": "month", "product": "prod_1"},
+                    "proration": False,
+                    "quantity": 1,
+                    "tax_amounts": [],
+                    "type": "subscription",
+                }
+                for index in range(lines)
+            ],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    setup(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+
+    import stripe
+
+    from pinax.stripe.models import Event
+    from pinax.stripe.views import Webhook
+
+    class ConstructEventWebhook(Webhook):
+
+        def post(self, request, *args, **kwargs):
+            event = stripe.Webhook.construct_event(
+                self.request.body, self.request.META["HTTP_STRIPE_SIGNATURE"], settings.PINAX_STRIPE_ENDPOINT_SECRET
+            )
+            self.add_event(event.to_dict_recursive())
+            return HttpResponse()
+
+    paths = [
+        ("construct_event", ConstructEventWebhook.as_view(), None),
+        ("raw body (json)", Webhook.as_view(), "json.loads"),
+        ("raw body (orjson)", Webhook.as_view(), None),
+    ]
+    factory = RequestFactory()
+
+    print("{:<8} {:>10} {:<20} {:>10} {:>10} {:>12}".format("size", "body (KiB)", "path", "p50 (ms)", "p99 (ms)", "peak (KiB)"))
+    for size, lines in SIZES:
+        obj = invoice(lines) if lines else None
+        body_size = len(encode(event_payload("evt_size", kind="invoice.paid", obj=obj)))
+        for label, view, loads in paths:
+            Event.objects.all().delete()
+
+            def request(index):
+                body = encode(event_payload("evt_{}_{}".format(label, index), kind="invoice.paid", obj=obj))
+                return factory.post(
+                    "/webhook/",
+                    data=body,
+                    content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=sign(body, settings.PINAX_STRIPE_ENDPOINT_SECRET),
+                )
+
+            samples = []
+            peaks = []
+            with override_settings(PINAX_STRIPE_JSON_LOADS=loads):
+                for index in range(args.requests):
+                    req = request(index)
+                    with Timer() as timer:
+                        response = view(req)
+                    assert response.status_code == 200, response.status_code
+                    samples.append(timer.elapsed)
+                # measured separately, tracemalloc slows allocation down
+                tracemalloc.start()
+                for index in range(args.requests, args.requests + 5):
+                    req = request(index)
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    view(req)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+                tracemalloc.stop()
+            print("{:<8} {:>10.1f} {:<20} {:>10.3f} {:>10.3f} {:>12.1f}".format(
+                size,
+                body_size / 1024.0,
+                label,
+                percentile(samples, 50) * 1000,
+                percentile(samples, 99) * 1000,
+                max(peaks) / 1024.0,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cost of the metrics hooks: per call when no sink is configured, and on the
+webhook view with metrics disabled and with each bundled sink.
+
+    python benchmarks/metrics_overhead.py [--requests 500] [--number 1000000]
+"""
+import argparse
+import timeit
+
+from utils import Timer, encode, event_payload, report, setup, sign
+
+SINKS = [
+    ("disabled", None),
+    ("memory", "pinax.stripe.metrics.MemorySink"),
+    ("prometheus", "pinax.stripe.metrics.PrometheusSink"),
+    # nothing needs to be listening, the datagrams are simply dropped
+    ("statsd", "pinax.stripe.metrics.StatsdSink"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--number", type=int, default=1000000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.test import RequestFactory, override_settings
+
+    from pinax.stripe import metrics
+    from pinax.stripe.models import Event
+    from pinax.stripe.views import Webhook
+
+    def disabled_calls():
+        with metrics.timer("event.handler", kind="plan.updated"):
+            pass
+        metrics.increment("event.processed", kind="plan.updated")
+
+    def baseline():
+        pass
+
+    overhead = min(timeit.repeat(disabled_calls, number=args.number, repeat=3))
+    empty = min(timeit.repeat(baseline, number=args.number, repeat=3))
+    print("disabled timer + increment: {:.1f} ns/call".format((overhead - empty) / args.number * 1e9))
+
+    factory = RequestFactory()
+    view = Webhook.as_view()
+    for label, sink in SINKS:
+        Event.objects.all().delete()
+        samples = []
+        with override_settings(PINAX_STRIPE_METRICS_SINK=sink):
+            for index in range(args.requests):
+                body = encode(event_payload("evt_{}_{}".format(label, index)))
+                request = factory.post(
+                    "/webhook/",
+                    data=body,
+                    content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=sign(body, settings.PINAX_STRIPE_ENDPOINT_SECRET),
+                )
+                with Timer() as timer:
+                    response = view(request)
+                assert response.status_code == 200, response.status_code
+                samples.append(timer.elapsed)
+        report("view ({})".format(label), samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Seeds the event table and times fetching the events of one Stripe object
+through the payload (a JSON key lookup and the admin's ``icontains`` search)
+and through ``Event.objects.for_object``, served by the index from
+migration 0015.
+
+    python benchmarks/object_lookups.py [--rows 200000]
+"""
+import argparse
+import datetime
+import random
+
+from event_indexes import analyze
+from utils import Timer, setup
+
+OBJECTS = [
+    ("sub", "subscription"),
+    ("in", "invoice"),
+    ("cus", "customer"),
+    ("ch", "charge"),
+]
+
+
+def seed(rows, batch_size=20000):
+    from django.utils import timezone
+
+    from pinax.stripe.models import Event
+
+    start = timezone.now() - datetime.timedelta(days=365)
+    rng = random.Random(0)
+    for offset in range(0, rows, batch_size):
+        events = []
+        for index in range(offset, min(rows, offset + batch_size)):
+            prefix, object_type = rng.choice(OBJECTS)
+            events.append(Event(
+                stripe_id="evt_{:012d}".format(index),
+                kind="{}.updated".format(object_type),
+                livemode=True,
+                stripe_created_at=start + datetime.timedelta(seconds=index * 31536000 // rows),
+                message={
+                    "id": "evt_{:012d}".format(index),
+                    "data": {"object": {"id": "{}_{:06d}".format(prefix, rng.randrange(20000)), "object": object_type}},
+                },
+            ))
+        Event.objects.bulk_create(events)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+
+    from pinax.stripe.models import Event
+
+    print("seeding {} events...".format(args.rows))
+    seed(args.rows)
+    analyze()
+
+    object_id = "sub_000042"
+    queries = [
+        ("message: key lookup", lambda: list(
+            Event.objects.filter(message__data__object__id=object_id).order_by("stripe_created_at", "pk")
+        )),
+        ("message: icontains", lambda: list(
+            Event.objects.filter(message__icontains=object_id).order_by("stripe_created_at", "pk")
+        )),
+        ("for_object", lambda: list(Event.objects.for_object(object_id))),
+    ]
+    print("{:<24} {:>8} {:>10}".format("query", "events", "best (ms)"))
+    for label, query in queries:
+        best = None
+        for _ in range(args.repeat):
+            with Timer() as timer:
+                found = query()
+            best = timer.elapsed if best is None else min(best, timer.elapsed)
+        print("{:<24} {:>8} {:>10.2f}".format(label, len(found), best * 1000))
+
+
+if __name__ == "__main__":
+    main()
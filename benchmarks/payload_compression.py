@@ -0,0 +1,267 @@
+"""
+Reports, for each event kind, the compression ratio of stored payloads and
+what compressing costs at ingest and decompressing costs on read, for zlib
+and zstd (when installed), with and without a dictionary trained from other
+events of all kinds.
+
+    python benchmarks/payload_compression.py [--events 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from utils import Timer, encode, event_payload, setup
+
+KINDS = [
+    "charge.succeeded",
+    "customer.updated",
+    "customer.subscription.updated",
+    "invoice.paid",
+    "invoice.updated",
+    "payment_intent.succeeded",
+    "plan.created",
+]
+
+
+def metadata(rng):
+    return {"order_id": str(rng.randrange(10 ** 8)), "source": rng.choice(["web", "ios", "android"])}
+
+
+def price(rng):
+    return {
+        "id": "price_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "price",
+        "active": True,
+        "billing_scheme": "per_unit",
+        "currency": "usd",
+        "livemode": False,
+        "metadata": {},
+        "product": "prod_{:014d}".format(rng.randrange(10 ** 14)),
+        "recurring": {"aggregate_usage": None, "interval": "month", "interval_count": 1, "usage_type": "licensed"},
+        "tax_behavior": "unspecified",
+        "type": "recurring",
+        "unit_amount": rng.randrange(100, 10000),
+        "unit_amount_decimal": str(rng.randrange(100, 10000)),
+    }
+
+
+def invoice(rng):
+    lines = [{
+        "id": "il_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "line_item",
+        "amount": rng.randrange(100, 10000),
+        "currency": "usd",
+        "description": "1 x Seat (at $10.00 / month)",
+        "discount_amounts": [],
+        "discountable": True,
+        "livemode": False,
+        "metadata": {},
+        "period": {"end": 1640000000 + index, "start": 1637000000 + index},
+        "price": price(rng),
+        "proration": False,
+        "quantity": 1,
+        "tax_amounts": [],
+        "tax_rates": [],
+        "type": "subscription",
+    } for index in range(rng.randrange(1, 20))]
+    return {
+        "id": "in_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "invoice",
+        "account_country": "US",
+        "amount_due": sum(line["amount"] for line in lines),
+        "amount_paid": sum(line["amount"] for line in lines),
+        "amount_remaining": 0,
+        "billing_reason": "subscription_cycle",
+        "collection_method": "charge_automatically",
+        "currency": "usd",
+        "customer": "cus_{:010d}".format(rng.randrange(10 ** 10)),
+        "lines": {"object": "list", "data": lines, "has_more": False, "total_count": len(lines)},
+        "metadata": metadata(rng),
+        "paid": True,
+        "status": "paid",
+        "subscription": "sub_{:014d}".format(rng.randrange(10 ** 14)),
+        "total": sum(line["amount"] for line in lines),
+    }
+
+
+def subscription(rng):
+    items = [{
+        "id": "si_{:010d}".format(rng.randrange(10 ** 10)),
+        "object": "subscription_item",
+        "created": 1637000000,
+        "metadata": {},
+        "price": price(rng),
+        "quantity": rng.randrange(1, 5),
+        "tax_rates": [],
+    } for _ in range(rng.randrange(1, 4))]
+    return {
+        "id": "sub_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "subscription",
+        "billing_cycle_anchor": 1637000000,
+        "cancel_at_period_end": False,
+        "collection_method": "charge_automatically",
+        "current_period_end": 1640000000,
+        "current_period_start": 1637000000,
+        "customer": "cus_{:010d}".format(rng.randrange(10 ** 10)),
+        "items": {"object": "list", "data": items, "has_more": False, "total_count": len(items)},
+        "latest_invoice": "in_{:014d}".format(rng.randrange(10 ** 14)),
+        "metadata": metadata(rng),
+        "status": rng.choice(["active", "past_due", "trialing"]),
+    }
+
+
+def charge(rng):
+    return {
+        "id": "ch_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "charge",
+        "amount": rng.randrange(100, 100000),
+        "amount_captured": rng.randrange(100, 100000),
+        "balance_transaction": "txn_{:014d}".format(rng.randrange(10 ** 14)),
+        "billing_details": {
+            "address": {"city": None, "country": None, "line1": None, "line2": None, "postal_code": "42424", "state": None},
+            "email": "jenny{}@example.com".format(rng.randrange(10000)),
+            "name": None,
+            "phone": None,
+        },
+        "captured": True,
+        "currency": "usd",
+        "customer": "cus_{:010d}".format(rng.randrange(10 ** 10)),
+        "metadata": metadata(rng),
+        "outcome": {"network_status": "approved_by_network", "risk_level": "normal", "risk_score": rng.randrange(100), "seller_message": "Payment complete.", "type": "authorized"},
+        "paid": True,
+        "payment_method_details": {
+            "card": {
+                "brand": "visa",
+                "checks": {"address_line1_check": None, "address_postal_code_check": "pass", "cvc_check": "pass"},
+                "country": "US",
+                "exp_month": rng.randrange(1, 13),
+                "exp_year": rng.randrange(2022, 2030),
+                "fingerprint": "{:016x}".format(rng.getrandbits(64)),
+                "funding": "credit",
+                "last4": "{:04d}".format(rng.randrange(10000)),
+                "network": "visa",
+            },
+            "type": "card",
+        },
+        "status": "succeeded",
+    }
+
+
+def customer(rng):
+    return {
+        "id": "cus_{:010d}".format(rng.randrange(10 ** 10)),
+        "object": "customer",
+        "balance": 0,
+        "created": 1637000000,
+        "currency": "usd",
+        "delinquent": False,
+        "email": "jenny{}@example.com".format(rng.randrange(10000)),
+        "invoice_prefix": "{:08X}".format(rng.getrandbits(32)),
+        "invoice_settings": {"custom_fields": None, "default_payment_method": None, "footer": None},
+        "livemode": False,
+        "metadata": metadata(rng),
+        "preferred_locales": [],
+        "tax_exempt": "none",
+    }
+
+
+def payment_intent(rng):
+    obj = charge(rng)
+    return {
+        "id": "pi_{:014d}".format(rng.randrange(10 ** 14)),
+        "object": "payment_intent",
+        "amount": obj["amount"],
+        "capture_method": "automatic",
+        "charges": {"object": "list", "data": [obj], "has_more": False, "total_count": 1},
+        "confirmation_method": "automatic",
+        "currency": "usd",
+        "customer": obj["customer"],
+        "metadata": obj["metadata"],
+        "payment_method_types": ["card"],
+        "status": "succeeded",
+    }
+
+
+OBJECTS = {
+    "charge": charge,
+    "customer": customer,
+    "customer.subscription": subscription,
+    "invoice": invoice,
+    "payment_intent": payment_intent,
+    "plan": lambda rng: {"id": "gold", "object": "plan", "amount": 2000, "currency": "usd", "interval": "month"},
+}
+
+
+def payloads(kind, count, rng):
+    from pinax.stripe.payloads import parse
+
+    make = OBJECTS[kind.rsplit(".", 1)[0]]
+    return [
+        parse(encode(event_payload("evt_{:014d}".format(rng.randrange(10 ** 14)), kind=kind, obj=make(rng))))
+        for _ in range(count)
+    ]
+
+
+def codecs(samples, size):
+    from pinax.stripe import compression
+
+    classes = [compression.ZlibCodec]
+    if compression.zstandard is not None:
+        classes.append(compression.ZstdCodec)
+    result = []
+    for codec_class in classes:
+        name = codec_class.__name__.replace("Codec", "").lower()
+        result.append((name, codec_class()))
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec_class.train(samples, size))
+        result.append((name + "+dict", codec_class(dictionary=path)))
+        os.remove(path)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000, help="events per kind")
+    parser.add_argument("--dictionary-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    setup()
+
+    from pinax.stripe import compression
+    from pinax.stripe.payloads import loads
+
+    rng = random.Random(0)
+    training = [compression.encode(message) for kind in KINDS for message in payloads(kind, 200, rng)]
+    rng.shuffle(training)
+    available = codecs(training, args.dictionary_size)
+
+    print("{:<32} {:<10} {:>9} {:>7} {:>12} {:>12}".format("kind", "codec", "bytes", "ratio", "ingest (us)", "read (us)"))
+    for kind in KINDS:
+        messages = payloads(kind, args.events, rng)
+        encoded = [compression.encode(message) for message in messages]
+        size = sum(len(data) for data in encoded)
+        with Timer() as timer:
+            for data in encoded:
+                loads(data)
+        print("{:<32} {:<10} {:>9.0f} {:>7.2f} {:>12} {:>12.1f}".format(
+            kind, "json", size / len(encoded), 1.0, "-", timer.elapsed / len(encoded) * 1e6
+        ))
+        for name, codec in available:
+            with Timer() as timer:
+                stored = [compression.compress(message, codec) for message in messages]
+            ingest = timer.elapsed / len(messages)
+            with Timer() as timer:
+                for payload in stored:
+                    payload = bytes(payload)
+                    loads(codec.decompress(payload[len(compression.header(codec)):]))
+            read = timer.elapsed / len(stored)
+            compressed = sum(len(payload) for payload in stored)
+            print("{:<32} {:<10} {:>9.0f} {:>7.2f} {:>12.1f} {:>12.1f}".format(
+                "", name, compressed / len(stored), size / compressed, ingest * 1e6, read * 1e6
+            ))
+
+
+if __name__ == "__main__":
+    main()
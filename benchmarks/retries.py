@@ -0,0 +1,80 @@
+"""
+Cost of one worker poll when thousands of events are failing: the old
+"unprocessed, minus what this worker saw fail" query against the indexed
+"due now" query, where failed events wait out their backoff.
+
+    python benchmarks/retries.py [--failing 20000] [--due 100]
+"""
+import argparse
+import datetime
+import random
+
+from utils import Timer, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--failing", type=int, default=20000)
+    parser.add_argument("--due", type=int, default=100)
+    parser.add_argument("--processed", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db import connection
+    from django.utils import timezone
+
+    from pinax.stripe.models import Event
+    from pinax.stripe.webhooks import registry
+
+    now = timezone.now()
+    rng = random.Random(0)
+    kinds = sorted(registry.keys())
+
+    def event(index, **kwargs):
+        return Event(
+            stripe_id="evt_{:09d}".format(index),
+            kind=rng.choice(kinds),
+            message={},
+            created_at=now - datetime.timedelta(seconds=index),
+            **kwargs
+        )
+
+    Event.objects.bulk_create([event(index, processed=True) for index in range(args.processed)], batch_size=5000)
+    Event.objects.bulk_create([
+        event(args.processed + index, attempts=rng.randint(1, 7), next_attempt_at=now + datetime.timedelta(seconds=rng.randint(60, 6 * 3600)))
+        for index in range(args.failing)
+    ], batch_size=5000)
+    Event.objects.bulk_create([
+        event(args.processed + args.failing + index, next_attempt_at=now - datetime.timedelta(seconds=index))
+        for index in range(args.due)
+    ], batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    failed = set(Event.objects.filter(attempts__gt=0).values_list("pk", flat=True))
+
+    def unprocessed_minus_failed():
+        return list(Event.objects.filter(
+            processed=False,
+            kind__in=list(registry.keys())
+        ).exclude(pk__in=failed).order_by("created_at", "pk").values_list("pk", flat=True)[:100])
+
+    def due_now():
+        return list(Event.objects.due(now).filter(
+            kind__in=list(registry.keys())
+        ).order_by("next_attempt_at", "pk").values_list("pk", flat=True)[:100])
+
+    assert sorted(unprocessed_minus_failed()) == sorted(due_now())
+    print("{} processed, {} failing, {} due".format(args.processed, args.failing, args.due))
+    for label, query in [("unprocessed minus failed", unprocessed_minus_failed), ("due now (indexed)", due_now)]:
+        best = None
+        for _ in range(args.repeat):
+            with Timer() as timer:
+                query()
+            best = timer.elapsed if best is None else min(best, timer.elapsed)
+        print("{:<26} {:>9.2f} ms/poll".format(label, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Shared helpers for the scripts in this directory.
+
+The benchmarks reuse the test settings but run against a throw-away SQLite
+file (so that worker threads share the same database) unless
+``PINAX_STRIPE_DATABASE_ENGINE`` points somewhere else.
+"""
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def setup(**overrides):
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    from pinax.stripe.tests import settings as test_settings
+
+    values = {key: getattr(test_settings, key) for key in dir(test_settings) if key.isupper()}
+    if values["DATABASES"]["default"]["ENGINE"].endswith("sqlite3"):
+        values["DATABASES"] = {
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(tempfile.mkdtemp(), "bench.sqlite3"),
+                # concurrent benchmarks wait for the write lock instead of failing
+                "OPTIONS": {"timeout": 30},
+            }
+        }
+    # the admin templates are needed to render changelists
+    values["TEMPLATES"] = [dict(values["TEMPLATES"][0], APP_DIRS=True)]
+    values.update(overrides)
+    settings.configure(**values)
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+
+def sign(payload, secret, timestamp=None):
+    timestamp = int(timestamp or time.time())
+    signed = "{}.{}".format(timestamp, payload.decode("utf-8")).encode("utf-8")
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return "t={},v1={}".format(timestamp, signature)
+
+
+def event_payload(stripe_id, kind="plan.updated", obj=None, created=None):
+    return {
+        "id": stripe_id,
+        "object": "event",
+        "api_version": "2020-08-27",
+        "created": created or int(time.time()),
+        "livemode": False,
+        "pending_webhooks": 1,
+        "type": kind,
+        "data": {"object": obj or {"id": "gold", "object": "plan"}},
+    }
+
+
+def encode(payload):
+    return json.dumps(payload).encode("utf-8")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples, unit="ms", scale=1000.0):
+    print("{:<28} n={:<6} p50={:>9.3f}{unit} p99={:>9.3f}{unit} mean={:>9.3f}{unit}".format(
+        label,
+        len(samples),
+        percentile(samples, 50) * scale,
+        percentile(samples, 99) * scale,
+        statistics.mean(samples) * scale,
+        unit=unit,
+    ))
+
+
+class Timer:
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
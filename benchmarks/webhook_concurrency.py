@@ -0,0 +1,121 @@
+"""
+Requests per second of the sync and the async webhook view served through
+Django's ASGI handler, with concurrent deliveries and a handler that waits on
+I/O (``time.sleep`` for the sync view, ``asyncio.sleep`` for the async one).
+
+    python benchmarks/webhook_concurrency.py [--requests 500] [--concurrency 50] [--handler-ms 20]
+"""
+import argparse
+import asyncio
+import time
+
+from utils import encode, event_payload, setup, sign
+
+# filled in once Django is set up, this module is the ROOT_URLCONF
+urlpatterns = []
+
+
+def scope(url, body, signature):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": url,
+        "raw_path": url.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 0),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("utf-8")),
+            (b"stripe-signature", signature.encode("utf-8")),
+        ],
+    }
+
+
+async def deliver(app, url, body, signature):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # the client never disconnects; Django cancels this once it responds
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await app(scope(url, body, signature), receive, send)
+    return statuses[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--handler-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    setup(ROOT_URLCONF="__main__")
+
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIHandler
+    from django.urls import path
+
+    from pinax.stripe.models import Event, EventType
+    from pinax.stripe.views import AsyncWebhook, Webhook
+    from pinax.stripe.webhooks import registry
+
+    urlpatterns.extend([
+        path("sync/", Webhook.as_view()),
+        path("async/", AsyncWebhook.as_view()),
+    ])
+    delay = args.handler_ms / 1000.0
+
+    def sync_handler(self):
+        time.sleep(delay)
+
+    async def async_handler(self):
+        await asyncio.sleep(delay)
+
+    WebhookClass = registry.get("plan.updated")
+    app = ASGIHandler()
+
+    async def run(label, url):
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(index):
+            body = encode(event_payload("evt_{}_{}".format(label, index)))
+            signature = sign(body, settings.PINAX_STRIPE_ENDPOINT_SECRET)
+            async with semaphore:
+                status = await deliver(app, url, body, signature)
+            assert status == 200, status
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(args.requests)))
+        return time.perf_counter() - start
+
+    # cache the type's code up front, so the first deliveries do not each
+    # read it inside their insert transaction, which SQLite can deadlock on
+    EventType.objects.code_for("plan.updated")
+    for label, url, handler in [("sync view", "/sync/", sync_handler), ("async view", "/async/", async_handler)]:
+        Event.objects.all().delete()
+        WebhookClass.process_webhook = handler
+        elapsed = asyncio.run(run(label.split()[0], url))
+        assert Event.objects.filter(processed=True).count() == args.requests
+        print("{:<28} n={:<6} concurrency={:<4} {:>9.1f} req/s".format(
+            label,
+            args.requests,
+            args.concurrency,
+            args.requests / elapsed,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Response time of the webhook view with a deliberately slow handler, for the
+inline and the deferred processing backends.
+
+    python benchmarks/webhook_latency.py [--requests 200] [--handler-ms 20]
+"""
+import argparse
+import time
+
+from utils import Timer, encode, event_payload, report, setup, sign
+
+BACKENDS = [
+    ("inline", "pinax.stripe.processing.InlineBackend"),
+    ("deferred (thread pool)", "pinax.stripe.processing.ThreadPoolBackend"),
+    ("deferred (database)", "pinax.stripe.processing.DatabaseBackend"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--handler-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.test import RequestFactory, override_settings
+
+    from pinax.stripe.models import Event
+    from pinax.stripe.processing import Worker, load_backend
+    from pinax.stripe.views import Webhook
+    from pinax.stripe.webhooks import registry
+
+    def slow_handler(self):
+        time.sleep(args.handler_ms / 1000.0)
+
+    registry.get("plan.updated").process_webhook = slow_handler
+    factory = RequestFactory()
+    view = Webhook.as_view()
+
+    for label, backend in BACKENDS:
+        Event.objects.all().delete()
+        samples = []
+        with override_settings(PINAX_STRIPE_PROCESSING_BACKEND=backend):
+            for index in range(args.requests):
+                body = encode(event_payload("evt_{}_{}".format(label, index)))
+                request = factory.post(
+                    "/webhook/",
+                    data=body,
+                    content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=sign(body, settings.PINAX_STRIPE_ENDPOINT_SECRET),
+                )
+                with Timer() as timer:
+                    response = view(request)
+                assert response.status_code == 200, response.status_code
+                samples.append(timer.elapsed)
+            if backend.endswith("ThreadPoolBackend"):
+                load_backend(backend).executor.shutdown(wait=True)
+            elif backend.endswith("DatabaseBackend"):
+                Worker().drain()
+        report(label, samples)
+        assert not Event.objects.filter(processed=False).exists()
+
+
+if __name__ == "__main__":
+    main()
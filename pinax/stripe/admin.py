@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 
-from .models import Event, EventProcessingException
+from .models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
 
 
 class ModelAdmin(admin.ModelAdmin):
@@ -37,7 +41,30 @@ class EventProcessingExceptionAdmin(ModelAdmin):
         "data"
     ]
     raw_id_fields = [
-        "event"
+        "event",
+        "group"
+    ]
+
+
+class EventProcessingExceptionGroupAdmin(ModelAdmin):
+    list_display = [
+        "exception_type",
+        "message",
+        "count",
+        "first_seen",
+        "last_seen"
+    ]
+    list_filter = [
+        "exception_type",
+        "last_seen"
+    ]
+    search_fields = [
+        "fingerprint",
+        "exception_type",
+        "message"
+    ]
+    ordering = [
+        "-last_seen"
     ]
 
 
@@ -47,18 +74,23 @@ class EventAdmin(ModelAdmin):
         "kind",
         "livemode",
         "processed",
+        "attempts",
+        "dead_letter",
         "created_at",
         "account_id",
         "customer_id"
     ]
     list_filter = [
         "kind",
+        "object_type",
         "created_at",
-        "processed"
+        "processed",
+        "dead_letter"
     ]
     search_fields = [
         "stripe_id",
         "customer_id",
+        "object_id",
         "message",
         "account_id",
     ]
@@ -66,3 +98,4 @@ class EventAdmin(ModelAdmin):
 
 admin.site.register(Event, EventAdmin)
 admin.site.register(EventProcessingException, EventProcessingExceptionAdmin)
+admin.site.register(EventProcessingExceptionGroup, EventProcessingExceptionGroupAdmin)
@@ -1,9 +1,30 @@
 import importlib
 
 from django.apps import AppConfig as BaseAppConfig
+from django.apps import apps as global_apps
+from django.db.models.signals import post_migrate
 from django.utils.translation import gettext_lazy as _
 
 
+def create_event_types(sender, using, apps=global_apps, **kwargs):
+    # flush sends post_migrate without apps
+    from .models import EventTypeManager
+    from .webhooks import registry
+
+    # the table may have been flushed or migrated away since codes were cached
+    EventTypeManager.forget(using)
+
+    try:
+        EventType = apps.get_model("pinax_stripe", "EventType")
+    except LookupError:
+        # migrated back to before event types existed
+        return
+    EventType._default_manager.db_manager(using).bulk_create(
+        [EventType(name=name) for name in registry.keys()],
+        ignore_conflicts=True
+    )
+
+
 class AppConfig(BaseAppConfig):
 
     name = "pinax.stripe"
@@ -12,3 +33,4 @@ class AppConfig(BaseAppConfig):
 
     def ready(self):
         importlib.import_module("pinax.stripe.webhooks")
+        post_migrate.connect(create_event_types, sender=self)
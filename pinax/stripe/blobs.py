@@ -0,0 +1,226 @@
+"""
+Blob stores for event payloads moved out of the database.
+
+``pinax_stripe_offload_events`` moves the payloads of older events to the
+store named by ``PINAX_STRIPE_BLOB_STORE``, leaving the metadata columns in
+the ``Event`` table; ``event.message`` then fetches the payload from the
+store when it is read.
+"""
+import collections
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import compression
+from .conf import settings
+from .payloads import RawJSON, loads
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+
+class BlobStore:
+    """
+    Base class for blob stores.
+
+    Blobs are addressed by the SHA-256 of their content (see ``key_for``),
+    so writing one again is harmless. Subclasses implement ``put``, ``get``,
+    which raises ``KeyError`` for a missing blob, and ``delete``.
+    """
+
+    def put(self, key, data):
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class FileSystemBlobStore(BlobStore):
+    """
+    Keeps blobs as files under ``PINAX_STRIPE_BLOB_LOCATION``, sharded into
+    two levels of directories by the first characters of their key.
+    """
+
+    def __init__(self, location=None):
+        self.location = location or settings.PINAX_STRIPE_BLOB_LOCATION
+
+    def path(self, key):
+        return os.path.join(self.location, key[:2], key[2:4], key)
+
+    def put(self, key, data):
+        path = self.path(key)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # written aside and renamed, so a reader never sees half a blob
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    """
+    Keeps blobs in the S3 bucket ``PINAX_STRIPE_BLOB_BUCKET`` under
+    ``PINAX_STRIPE_BLOB_PREFIX``. ``PINAX_STRIPE_BLOB_ENDPOINT_URL`` points
+    it at another S3-compatible service, such as MinIO. Needs ``boto3``
+    (``pip install pinax-stripe-light[s3]``) unless a ``client`` is given.
+    """
+
+    def __init__(self, bucket=None, prefix=None, client=None):
+        self.bucket = bucket or settings.PINAX_STRIPE_BLOB_BUCKET
+        self.prefix = settings.PINAX_STRIPE_BLOB_PREFIX if prefix is None else prefix
+        if client is None:
+            if boto3 is None:
+                raise ImportError("S3BlobStore needs the boto3 package")
+            client = boto3.client("s3", endpoint_url=settings.PINAX_STRIPE_BLOB_ENDPOINT_URL)
+        self.client = client
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(key)
+        return response["Body"].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+class BlobCache:
+    """
+    The most recently fetched blobs, up to ``max_size`` of them, so reading
+    the message of the same event again does not go back to the store.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.blobs = collections.OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            data = self.blobs.get(key)
+            if data is not None:
+                self.blobs.move_to_end(key)
+            return data
+
+    def add(self, key, data):
+        with self.lock:
+            self.blobs[key] = data
+            self.blobs.move_to_end(key)
+            while len(self.blobs) > self.max_size:
+                self.blobs.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.blobs.pop(key, None)
+
+    def __len__(self):
+        return len(self.blobs)
+
+
+@functools.lru_cache(maxsize=None)
+def load_store(path):
+    return import_string(path)()
+
+
+def get_store():
+    """
+    Return the configured store, or ``None`` when payloads stay in the
+    database.
+    """
+    path = settings.PINAX_STRIPE_BLOB_STORE
+    if path is None:
+        return None
+    return load_store(path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_cache():
+    return BlobCache(settings.PINAX_STRIPE_BLOB_CACHE_SIZE)
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    if setting.startswith("PINAX_STRIPE_BLOB_"):
+        load_store.cache_clear()
+        get_cache.cache_clear()
+
+
+def key_for(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_for(event):
+    """
+    The bytes to offload for ``event``: its payload compressed if it is
+    stored so or ``PINAX_STRIPE_PAYLOAD_COMPRESSION`` is set, its JSON text
+    otherwise.
+    """
+    if event.payload is not None:
+        return bytes(event.payload)
+    if compression.get_codec() is not None:
+        return compression.compress(event.message)
+    return compression.encode(event.message)
+
+
+def put(data):
+    """
+    Write ``data`` to the store and return its key.
+    """
+    key = key_for(data)
+    get_store().put(key, data)
+    return key
+
+
+def fetch(key):
+    """
+    Read the message stored under ``key``, through the cache.
+    """
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        data = get_store().get(key)
+        cache.add(key, data)
+    if data[:1] in compression.CODECS:
+        return compression.decompress(data)
+    text = data.decode("utf-8")
+    return RawJSON(loads(text), raw=text)
+
+
+def delete(key):
+    get_cache().discard(key)
+    get_store().delete(key)
@@ -0,0 +1,225 @@
+"""
+Compressed storage of event payloads.
+
+With ``PINAX_STRIPE_PAYLOAD_COMPRESSION`` set, ``Event.message`` is written
+to ``Event.payload`` as compressed bytes instead of to the JSON column, and
+only decompressed when ``event.message`` is first read.
+"""
+import functools
+import hashlib
+import json
+import zlib
+
+from django.utils.module_loading import import_string
+
+from .conf import settings
+from .payloads import RawJSON, RawJSONEncoder, loads
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+# stored after the codec's tag when no dictionary was used
+NO_DICTIONARY = b"\x00" * 4
+
+
+def dictionary_id(dictionary):
+    """
+    The four bytes identifying the contents ``dictionary`` in the payloads
+    compressed with it.
+    """
+    return hashlib.sha256(dictionary).digest()[:4]
+
+
+class Codec:
+    """
+    Base class for payload codecs.
+
+    Every payload a codec compresses starts with its one byte ``tag`` and
+    the ``dictionary_id`` of the dictionary it used, so rows written before
+    switching codecs or dictionaries can still be read. ``dictionary`` is
+    the path of a dictionary trained with ``train`` (see the
+    ``pinax_stripe_compress_events`` command); payloads compressed with one
+    need the same dictionary to be read back.
+    """
+
+    tag = None
+
+    def __init__(self, level=None, dictionary=None):
+        self.level = level
+        self.dictionary = None
+        self.dictionary_id = NO_DICTIONARY
+        if dictionary is not None:
+            with open(dictionary, "rb") as f:
+                self.dictionary = f.read()
+            self.dictionary_id = dictionary_id(self.dictionary)
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+    @classmethod
+    def train(cls, samples, size):
+        """
+        Return a dictionary of at most ``size`` bytes for payloads like
+        ``samples``, a list of encoded payloads.
+        """
+        raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+
+    tag = b"\x01"
+
+    # zlib only looks back this far, so a longer dictionary is wasted
+    max_dictionary_size = 32768
+
+    def compress(self, data):
+        level = -1 if self.level is None else self.level
+        if self.dictionary is None:
+            return zlib.compress(data, level)
+        compressor = zlib.compressobj(level, zdict=self.dictionary)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        if self.dictionary is None:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self.dictionary)
+        return decompressor.decompress(data) + decompressor.flush()
+
+    @classmethod
+    def train(cls, samples, size):
+        # a zlib dictionary is plain content, the most common strings last:
+        # the samples' text, most recent at the end
+        size = min(size, cls.max_dictionary_size)
+        content = b""
+        for sample in samples:
+            content += sample
+            if len(content) >= size * 4:
+                content = content[-size:]
+        return content[-size:]
+
+
+class ZstdCodec(Codec):
+    """
+    Needs ``zstandard`` (``pip install pinax-stripe-light[zstd]``).
+    """
+
+    tag = b"\x02"
+
+    def __init__(self, level=None, dictionary=None):
+        if zstandard is None:
+            raise ImportError("ZstdCodec needs the zstandard package")
+        super().__init__(level=level, dictionary=dictionary)
+        options = {"level": 3 if self.level is None else self.level}
+        if self.dictionary is not None:
+            options["dict_data"] = zstandard.ZstdCompressionDict(self.dictionary)
+        self.compressor_options = options
+
+    def compress(self, data):
+        # compressors are not thread safe and cheap to make
+        return zstandard.ZstdCompressor(**self.compressor_options).compress(data)
+
+    def decompress(self, data):
+        options = {}
+        if self.dictionary is not None:
+            options["dict_data"] = self.compressor_options["dict_data"]
+        return zstandard.ZstdDecompressor(**options).decompress(data)
+
+    @classmethod
+    def train(cls, samples, size):
+        if zstandard is None:
+            raise ImportError("ZstdCodec needs the zstandard package")
+        return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+CODECS = {
+    ZlibCodec.tag: "pinax.stripe.compression.ZlibCodec",
+    ZstdCodec.tag: "pinax.stripe.compression.ZstdCodec",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_codec(path, level, dictionary):
+    return import_string(path)(level=level, dictionary=dictionary)
+
+
+@functools.lru_cache(maxsize=None)
+def load_dictionaries(paths):
+    """
+    Map the id of each of the dictionary files at ``paths`` to its path.
+    """
+    dictionaries = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            dictionaries[dictionary_id(f.read())] = path
+    return dictionaries
+
+
+def find_dictionary(identifier):
+    """
+    The path of the dictionary with the id ``identifier``, out of
+    ``PINAX_STRIPE_PAYLOAD_DICTIONARY`` and
+    ``PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES``.
+    """
+    if identifier == NO_DICTIONARY:
+        return None
+    paths = tuple(settings.PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES)
+    if settings.PINAX_STRIPE_PAYLOAD_DICTIONARY is not None:
+        paths = (settings.PINAX_STRIPE_PAYLOAD_DICTIONARY,) + paths
+    try:
+        return load_dictionaries(paths)[identifier]
+    except KeyError:
+        raise ValueError(
+            "The payload was compressed with dictionary {}, which is neither "
+            "PINAX_STRIPE_PAYLOAD_DICTIONARY nor in "
+            "PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES".format(identifier.hex())
+        )
+
+
+def get_codec():
+    """
+    Return the configured codec, or ``None`` when payloads are stored as
+    plain JSON.
+    """
+    path = settings.PINAX_STRIPE_PAYLOAD_COMPRESSION
+    if path is None:
+        return None
+    return load_codec(path, settings.PINAX_STRIPE_PAYLOAD_COMPRESSION_LEVEL, settings.PINAX_STRIPE_PAYLOAD_DICTIONARY)
+
+
+def encode(message):
+    """
+    The JSON text of ``message`` as bytes, as received for a parsed payload.
+    """
+    return json.dumps(message, cls=RawJSONEncoder).encode("utf-8")
+
+
+def header(codec):
+    """
+    The bytes every payload compressed by ``codec`` starts with.
+    """
+    return codec.tag + codec.dictionary_id
+
+
+def compress(message, codec=None):
+    codec = codec or get_codec()
+    return header(codec) + codec.compress(encode(message))
+
+
+def decompress(payload):
+    """
+    Turn the stored ``payload`` back into the message, whichever codec and
+    dictionary compressed it.
+    """
+    payload = bytes(payload)
+    start = len(NO_DICTIONARY) + 1
+    codec = get_codec()
+    if codec is None or header(codec) != payload[:start]:
+        codec = load_codec(CODECS[payload[:1]], None, find_dictionary(payload[1:start]))
+    text = codec.decompress(payload[start:]).decode("utf-8")
+    return RawJSON(loads(text), raw=text)
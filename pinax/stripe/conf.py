@@ -12,6 +12,40 @@ class PinaxStripeAppConf(AppConf):
     SECRET_KEY = None
     API_VERSION = "2020-08-27"
     ENDPOINT_SECRET = None
+    PROCESSING_BACKEND = "pinax.stripe.processing.InlineBackend"
+    PROCESSING_MAX_WORKERS = 4
+    RETRY_MAX_ATTEMPTS = 8
+    RETRY_BASE_DELAY = 60
+    RETRY_MAX_DELAY = 6 * 60 * 60
+    EVENT_RETENTION_DAYS = None
+    EVENT_RETENTION_DAYS_BY_KIND = {}
+    EXCEPTION_RETENTION_DAYS = None
+    EXCEPTION_SAMPLE_RATE = 0.01
+    EXCEPTION_SAMPLE_EVENTS = 10
+    LATEST_WINS_KINDS = []
+    COALESCE_WINDOW = None
+    EVENT_PARTITIONING = False
+    ROBUST_RECEIVERS = False
+    RECEIVER_MAX_WORKERS = 4
+    SEEN_FILTER = None
+    SEEN_FILTER_SIZE = 10000
+    SEEN_FILTER_TIMEOUT = 3600
+    SEEN_FILTER_CACHE = "default"
+    JSON_LOADS = None
+    PAYLOAD_COMPRESSION = None
+    PAYLOAD_COMPRESSION_LEVEL = None
+    PAYLOAD_DICTIONARY = None
+    PAYLOAD_PREVIOUS_DICTIONARIES = []
+    BLOB_STORE = None
+    BLOB_LOCATION = None
+    BLOB_BUCKET = None
+    BLOB_PREFIX = "events/"
+    BLOB_ENDPOINT_URL = None
+    BLOB_CACHE_SIZE = 128
+    BLOB_AFTER_DAYS = None
+    METRICS_SINK = None
+    METRICS_PREFIX = "pinax_stripe"
+    STATSD_ADDRESS = ("127.0.0.1", 8125)
 
     class Meta:
         prefix = "pinax_stripe"
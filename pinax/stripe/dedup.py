@@ -0,0 +1,148 @@
+import collections
+import functools
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .conf import settings
+
+
+class SeenStats(collections.namedtuple("SeenStats", ["lookups", "hits"])):
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class SeenFilter:
+    """
+    Base class for filters of recently stored event ids.
+
+    A hit means the event has been stored already, so the webhook view can
+    acknowledge the delivery without touching the ``Event`` table. A miss
+    says nothing: the unique constraint on ``stripe_id`` still decides.
+    Subclasses implement ``contains`` and ``add``, which returns whether the
+    id was new to the filter.
+    """
+
+    def __init__(self):
+        self.stats_lock = threading.Lock()
+        self.lookups = self.hits = 0
+
+    def contains(self, stripe_id):
+        raise NotImplementedError
+
+    def add(self, stripe_id):
+        raise NotImplementedError
+
+    def seen(self, stripe_id):
+        hit = self.contains(stripe_id)
+        with self.stats_lock:
+            self.lookups += 1
+            self.hits += hit
+        return hit
+
+    def remember(self, stripe_id):
+        """
+        Add ``stripe_id`` once the transaction storing it has been committed,
+        so a rolled back insert is never reported as seen.
+        """
+        transaction.on_commit(functools.partial(self.add, stripe_id))
+
+    def stats(self):
+        with self.stats_lock:
+            return SeenStats(self.lookups, self.hits)
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.lookups = self.hits = 0
+
+
+class LocalSeenFilter(SeenFilter):
+    """
+    Keeps the most recently stored ids in process, up to
+    ``PINAX_STRIPE_SEEN_FILTER_SIZE`` of them and for at most
+    ``PINAX_STRIPE_SEEN_FILTER_TIMEOUT`` seconds each.
+    """
+
+    def __init__(self, max_size=None, timeout=None):
+        super().__init__()
+        self.max_size = max_size or settings.PINAX_STRIPE_SEEN_FILTER_SIZE
+        self.timeout = timeout or settings.PINAX_STRIPE_SEEN_FILTER_TIMEOUT
+        self.lock = threading.Lock()
+        self.expires = collections.OrderedDict()
+
+    def contains(self, stripe_id):
+        with self.lock:
+            expires = self.expires.get(stripe_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self.expires[stripe_id]
+                return False
+            return True
+
+    def add(self, stripe_id):
+        with self.lock:
+            now = time.monotonic()
+            new = self.expires.get(stripe_id, now) <= now
+            self.expires[stripe_id] = now + self.timeout
+            self.expires.move_to_end(stripe_id)
+            while len(self.expires) > self.max_size:
+                self.expires.popitem(last=False)
+            return new
+
+    def __len__(self):
+        return len(self.expires)
+
+
+class CacheSeenFilter(SeenFilter):
+    """
+    Shares the ids between processes through the Django cache named by
+    ``PINAX_STRIPE_SEEN_FILTER_CACHE``, e.g. a Redis or memcached backend.
+    """
+
+    key_prefix = "pinax-stripe:seen:"
+
+    def __init__(self, alias=None, timeout=None):
+        super().__init__()
+        self.alias = alias or settings.PINAX_STRIPE_SEEN_FILTER_CACHE
+        self.timeout = timeout or settings.PINAX_STRIPE_SEEN_FILTER_TIMEOUT
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def contains(self, stripe_id):
+        return self.cache.get(self.key_prefix + stripe_id) is not None
+
+    def add(self, stripe_id):
+        # a single atomic operation on the cache server, unlike a lookup
+        # followed by a set
+        return self.cache.add(self.key_prefix + stripe_id, True, self.timeout)
+
+
+@functools.lru_cache(maxsize=None)
+def load_filter(path):
+    return import_string(path)()
+
+
+def get_filter():
+    """
+    Return the configured filter, or ``None`` when there is none.
+    """
+    path = settings.PINAX_STRIPE_SEEN_FILTER
+    if path is None:
+        return None
+    return load_filter(path)
+
+
+@receiver(setting_changed)
+def reset_filter(setting, **kwargs):
+    if setting.startswith("PINAX_STRIPE_SEEN_FILTER"):
+        load_filter.cache_clear()
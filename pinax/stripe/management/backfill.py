@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ..models import Event
+
+
+class BackfillCommand(BaseCommand):
+    """
+    Base for the commands that fill in columns of ``Event`` from the stored
+    payload, walking the events in batches of primary keys.
+
+    Subclasses set ``fields``, the columns they fill in, and implement
+    ``queryset`` to pick the events to scan and ``fill`` to set the fields
+    of one event and return whether there was anything to set.
+    """
+
+    fields = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def queryset(self):
+        raise NotImplementedError()
+
+    def fill(self, event):
+        raise NotImplementedError()
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        qs = self.queryset().order_by("pk").only("pk", "message", "payload", "blob_key")
+        last_pk = 0
+        scanned = updated = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = [event for event in batch if self.fill(event)]
+            Event.objects.bulk_update(changed, self.fields)
+            scanned += len(batch)
+            updated += len(changed)
+        self.stdout.write("Scanned {} events, set {} on {}.".format(scanned, self.fields[0], updated))
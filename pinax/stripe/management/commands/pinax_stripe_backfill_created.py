@@ -0,0 +1,16 @@
+from ...models import Event
+from ...utils import convert_tstamp
+from ..backfill import BackfillCommand
+
+
+class Command(BackfillCommand):
+
+    help = "Fill in Event.stripe_created_at from the stored payload for events that do not have it."
+    fields = ["stripe_created_at"]
+
+    def queryset(self):
+        return Event.objects.filter(stripe_created_at__isnull=True)
+
+    def fill(self, event):
+        event.stripe_created_at = convert_tstamp(event.message or {}, "created")
+        return event.stripe_created_at is not None
@@ -0,0 +1,16 @@
+from ...models import Event
+from ...utils import extract_customer_id
+from ..backfill import BackfillCommand
+
+
+class Command(BackfillCommand):
+
+    help = "Fill in Event.customer_id from the stored payload for events that do not have it."
+    fields = ["customer_id"]
+
+    def queryset(self):
+        return Event.objects.filter(customer_id="")
+
+    def fill(self, event):
+        event.customer_id = extract_customer_id(event.message)
+        return bool(event.customer_id)
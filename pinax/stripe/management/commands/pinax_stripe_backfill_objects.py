@@ -0,0 +1,18 @@
+from ...models import Event
+from ...utils import extract_object
+from ..backfill import BackfillCommand
+
+
+class Command(BackfillCommand):
+
+    help = "Fill in Event.object_id and Event.object_type from the stored payload for events that do not have them."
+    fields = ["object_id", "object_type"]
+
+    def queryset(self):
+        return Event.objects.filter(object_id="").exclude(message={})
+
+    def fill(self, event):
+        obj = extract_object(event.message)
+        event.object_id = obj.get("id") or ""
+        event.object_type = obj.get("object") or ""
+        return bool(event.object_id)
@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from ...compression import compress, encode, get_codec, header
+from ...conf import settings
+from ...models import Event
+
+
+class Command(BaseCommand):
+
+    help = "Compress the payloads of stored events with PINAX_STRIPE_PAYLOAD_COMPRESSION, or train a dictionary for it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--recompress", action="store_true", help="Compress payloads that are compressed already again, e.g. with a new dictionary (list the old one in PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES).")
+        parser.add_argument("--decompress", action="store_true", help="Move compressed payloads back to the JSON column.")
+        parser.add_argument("--train", metavar="PATH", help="Write a dictionary trained from recent events to PATH instead.")
+        parser.add_argument("--samples", type=int, default=2000, help="Number of recent events to train the dictionary from.")
+        parser.add_argument("--dictionary-size", type=int, default=65536)
+
+    def handle(self, *args, **options):
+        if options["decompress"]:
+            self.stdout.write("Decompressed {} events.".format(self.decompress(options["batch_size"])))
+            return
+        path = settings.PINAX_STRIPE_PAYLOAD_COMPRESSION
+        if path is None:
+            raise CommandError("Set PINAX_STRIPE_PAYLOAD_COMPRESSION to the codec to compress payloads with.")
+        if options["train"]:
+            self.train(import_string(path), options["train"], options["samples"], options["dictionary_size"])
+            return
+        count = self.compress(options["batch_size"], options["recompress"])
+        self.stdout.write("Compressed {} events.".format(count))
+
+    def train(self, codec_class, path, samples, size):
+        events = list(Event.objects.exclude(message={}).order_by("-pk").only("pk", "message", "payload", "blob_key")[:samples])
+        data = [encode(event.message) for event in reversed(events)]
+        if not data:
+            raise CommandError("There are no events to train a dictionary from.")
+        dictionary = codec_class.train(data, size)
+        with open(path, "wb") as f:
+            f.write(dictionary)
+        self.stdout.write("Wrote a {} byte dictionary trained from {} events to {}.".format(len(dictionary), len(data), path))
+
+    def compress(self, batch_size, recompress):
+        # the empty message of a pruned stub stays in the JSON column, where
+        # retention looks for it, and offloaded payloads stay in the store
+        qs = Event.objects.exclude(message={}).filter(blob_key="")
+        if not recompress:
+            qs = qs.filter(payload__isnull=True)
+        qs = qs.order_by("pk").only("pk", "message", "payload", "blob_key")
+        codec = get_codec()
+        current = header(codec)
+        last_pk = 0
+        compressed = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            # rows compressed with the current codec and dictionary already
+            # are left as they are
+            batch = [
+                event for event in batch
+                if (event.payload is None or bytes(event.payload[:len(current)]) != current) and event.message is not None
+            ]
+            for event in batch:
+                event.payload = compress(event.message, codec)
+            with transaction.atomic():
+                Event.objects.bulk_update(batch, ["payload"])
+                Event.objects.filter(pk__in=[event.pk for event in batch]).update(message=None)
+            compressed += len(batch)
+        return compressed
+
+    def decompress(self, batch_size):
+        qs = Event.objects.filter(payload__isnull=False).order_by("pk").only("pk", "message", "payload", "blob_key")
+        last_pk = 0
+        decompressed = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            # bulk_update reads event.message, which decompresses it
+            with transaction.atomic():
+                Event.objects.bulk_update(batch, ["message"])
+                Event.objects.filter(pk__in=[event.pk for event in batch]).update(payload=None)
+            decompressed += len(batch)
+        return decompressed
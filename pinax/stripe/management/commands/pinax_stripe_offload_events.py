@@ -0,0 +1,90 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ... import blobs
+from ...compression import CODECS
+from ...conf import settings
+from ...models import Event
+from ...payloads import RawJSON, loads
+
+
+class Command(BaseCommand):
+
+    help = "Move the payloads of older events to the blob store named by PINAX_STRIPE_BLOB_STORE, or back with --restore."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--older-than", type=int, metavar="DAYS", help="Defaults to PINAX_STRIPE_BLOB_AFTER_DAYS.")
+        parser.add_argument("--all", action="store_true", help="Move the payloads of all events, whatever their age.")
+        parser.add_argument("--restore", action="store_true", help="Move offloaded payloads back to the database.")
+
+    def handle(self, *args, **options):
+        if blobs.get_store() is None:
+            raise CommandError("Set PINAX_STRIPE_BLOB_STORE to the store to move payloads to.")
+        if options["restore"]:
+            self.stdout.write("Restored {} events.".format(self.restore(options["batch_size"])))
+            return
+        days = 0 if options["all"] else options["older_than"]
+        if days is None:
+            days = settings.PINAX_STRIPE_BLOB_AFTER_DAYS
+        if days is None:
+            raise CommandError("Pass --older-than or --all, or set PINAX_STRIPE_BLOB_AFTER_DAYS.")
+        cutoff = timezone.now() - datetime.timedelta(days=days)
+        self.stdout.write("Offloaded {} events.".format(self.offload(options["batch_size"], cutoff)))
+
+    def offload(self, batch_size, cutoff):
+        # the empty message of a pruned stub stays in the JSON column, where
+        # retention looks for it
+        qs = Event.objects.filter(blob_key="", created_at__lt=cutoff).exclude(message={}).order_by("pk").only(
+            "pk", "message", "payload", "blob_key"
+        )
+        last_pk = 0
+        offloaded = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            batch = [event for event in batch if event.payload is not None or event.message is not None]
+            # written before the rows point at them, so a failure leaves at
+            # worst a blob nothing refers to
+            for event in batch:
+                event.blob_key = blobs.put(blobs.blob_for(event))
+            with transaction.atomic():
+                Event.objects.bulk_update(batch, ["blob_key"])
+                Event.objects.filter(pk__in=[event.pk for event in batch]).update(message=None, payload=None)
+            offloaded += len(batch)
+        return offloaded
+
+    def restore(self, batch_size):
+        store = blobs.get_store()
+        qs = Event.objects.exclude(blob_key="").order_by("pk").only("pk", "message", "payload", "blob_key")
+        last_pk = 0
+        restored = 0
+        while True:
+            batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            plain = []
+            compressed = []
+            for event in batch:
+                data = store.get(event.blob_key)
+                if data[:1] in CODECS:
+                    event.payload = data
+                    compressed.append(event)
+                else:
+                    text = data.decode("utf-8")
+                    event.message = RawJSON(loads(text), raw=text)
+                    plain.append(event)
+            with transaction.atomic():
+                Event.objects.bulk_update(plain, ["message"])
+                Event.objects.bulk_update(compressed, ["payload"])
+                Event.objects.filter(pk__in=[event.pk for event in batch]).update(blob_key="")
+            for event in batch:
+                blobs.delete(event.blob_key)
+            restored += len(batch)
+        return restored
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...conf import settings
+from ...models import Event
+from ...partitions import (
+    create_partitions,
+    expire_partitions,
+    get_connection,
+    setup,
+    supported
+)
+
+
+class Command(BaseCommand):
+
+    help = "Create the monthly partitions of the event tables ahead of time and detach or drop expired ones (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--setup", action="store_true", help="Partition the event tables first if they are not yet.")
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument("--detach", action="store_true", help="Detach partitions past the retention window.")
+        parser.add_argument("--drop", action="store_true", help="Drop partitions past the retention window.")
+
+    def handle(self, *args, **options):
+        if not supported(get_connection(Event)):
+            self.stdout.write("Partitioning needs PostgreSQL 11 or later; the event tables are left unpartitioned.")
+            return
+        now = timezone.now()
+        if options["setup"]:
+            if not settings.PINAX_STRIPE_EVENT_PARTITIONING:
+                raise CommandError("Set PINAX_STRIPE_EVENT_PARTITIONING = True before partitioning the event tables.")
+            for model in setup(months_ahead=options["months_ahead"], now=now):
+                self.stdout.write("Partitioned {}.".format(model._meta.db_table))
+        for name in create_partitions(months_ahead=options["months_ahead"], now=now):
+            self.stdout.write("Created {}.".format(name))
+        if options["detach"] or options["drop"]:
+            for name in expire_partitions(drop=options["drop"], now=now):
+                self.stdout.write("{} {}.".format("Dropped" if options["drop"] else "Detached", name))
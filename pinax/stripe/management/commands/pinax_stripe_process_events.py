@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from ...processing import BatchWorker, OrderedWorker, Worker
+
+
+class Command(BaseCommand):
+
+    help = "Process stored Stripe events that have not been processed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=1, help="Number of threads used to process a batch.")
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--ordered",
+            action="store_true",
+            help="Process events for the same Stripe object one at a time, in the order Stripe created them."
+        )
+        mode.add_argument(
+            "--batch",
+            action="store_true",
+            help="Hand the pending events of each type to the handler's process_batch together."
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new events instead of exiting once drained.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep between polls when idle.")
+
+    def handle(self, *args, **options):
+        worker_class = Worker
+        if options["ordered"]:
+            worker_class = OrderedWorker
+        elif options["batch"]:
+            worker_class = BatchWorker
+        worker = worker_class(batch_size=options["batch_size"], max_workers=options["workers"])
+        if options["loop"]:
+            worker.run_forever(interval=options["interval"])
+        processed, failed = worker.drain()
+        self.stdout.write("Processed {} events, {} failed.".format(processed, failed))
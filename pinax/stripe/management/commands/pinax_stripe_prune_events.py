@@ -0,0 +1,36 @@
+import functools
+import gzip
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...retention import prune_events, prune_exceptions
+
+
+class Command(BaseCommand):
+
+    help = "Delete or archive processed events that are past their retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--archive-dir", help="Write pruned events to a gzipped JSON lines file in this directory first.")
+        parser.add_argument("--keep-stub", action="store_true", help="Keep the event row without its payload so redeliveries are still recognised.")
+        parser.add_argument("--sleep", type=float, default=0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        pause = functools.partial(time.sleep, options["sleep"]) if options["sleep"] else None
+        kwargs = dict(batch_size=options["batch_size"], keep_stub=options["keep_stub"], now=now, pause=pause)
+
+        if options["archive_dir"]:
+            path = os.path.join(options["archive_dir"], "events-{}.jsonl.gz".format(now.strftime("%Y%m%dT%H%M%S")))
+            with gzip.open(path, "wt", encoding="utf-8") as archive:
+                events = prune_events(archive=archive, **kwargs)
+            self.stdout.write("Archived to {}".format(path))
+        else:
+            events = prune_events(**kwargs)
+
+        exceptions = prune_exceptions(batch_size=options["batch_size"], now=now, pause=pause)
+        self.stdout.write("Pruned {} events and {} processing exceptions.".format(events, exceptions))
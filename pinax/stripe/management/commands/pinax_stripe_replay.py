@@ -0,0 +1,60 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ...replay import Replay
+
+
+def parse_when(value):
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError("Invalid date: {}".format(value))
+        when = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+class Command(BaseCommand):
+
+    help = "Re-run webhook handlers for unprocessed and failed Stripe events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", action="append", dest="kinds", help="Only replay this event type (repeatable).")
+        parser.add_argument("--since", type=parse_when, help="Only replay events stored at or after this date/time.")
+        parser.add_argument("--until", type=parse_when, help="Only replay events stored before this date/time.")
+        parser.add_argument("--account", dest="account_id", help="Only replay events for this connected account.")
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument("--livemode", action="store_true", dest="livemode", default=None)
+        mode.add_argument("--testmode", action="store_false", dest="livemode")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+
+    def progress(self, stats):
+        for line in stats.lines():
+            self.stdout.write(line)
+        self.stdout.write("")
+
+    def handle(self, *args, **options):
+        replay = Replay(
+            kinds=options["kinds"],
+            since=options["since"],
+            until=options["until"],
+            livemode=options["livemode"],
+            account_id=options["account_id"],
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            pool=options["pool"],
+        )
+        stats = replay.run(progress=self.progress if options["verbosity"] else None)
+        self.stdout.write("Replayed {} events in {:.1f}s, {} failed, {} skipped.".format(
+            stats.total("processed"),
+            stats.elapsed,
+            stats.total("failed"),
+            stats.total("skipped"),
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from ...sync import EventSync
+from .pinax_stripe_replay import parse_when
+
+
+class Command(BaseCommand):
+
+    help = "Fetch events from the Stripe API that were missed by the webhook, store and process them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=parse_when, help="Only fetch events created at or after this date/time.")
+        parser.add_argument("--type", action="append", dest="types", help="Only fetch this event type (repeatable).")
+        parser.add_argument("--checkpoint", help="File used to resume an interrupted sync.")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=1, help="Number of threads used to process new events.")
+        parser.add_argument("--no-process", action="store_false", dest="dispatch", help="Only store the events.")
+
+    def progress(self, sync):
+        self.stdout.write("{} events fetched, {} new".format(sync.seen, sync.inserted))
+
+    def handle(self, *args, **options):
+        sync = EventSync(
+            since=options["since"],
+            types=options["types"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            checkpoint=options["checkpoint"],
+            dispatch=options["dispatch"],
+        )
+        sync.run(progress=self.progress if options["verbosity"] > 1 else None)
+        for line in sync.stats.lines():
+            self.stdout.write(line)
+        self.stdout.write("Fetched {} events, stored {} new, {} failed to process.".format(
+            sync.seen,
+            sync.inserted,
+            sync.stats.total("failed"),
+        ))
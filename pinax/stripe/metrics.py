@@ -0,0 +1,223 @@
+import bisect
+import collections
+import functools
+import socket
+import threading
+import time
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .conf import settings
+
+# upper bounds, in seconds, shared by every histogram
+BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60, 300, 900, 3600, float("inf"),
+)
+
+
+class Timer:
+
+    def __init__(self, sink, name, kind):
+        self.sink = sink
+        self.name = name
+        self.kind = kind
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.sink.observe(self.name, time.perf_counter() - self.start, kind=self.kind)
+
+
+class NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return
+
+
+NULL_TIMER = NullTimer()
+
+
+class Sink:
+    """
+    Base class for metric sinks.
+
+    Subclasses implement ``increment`` and ``observe``; overriding ``timer``
+    is the hook for tracing integrations that want to open a span around the
+    timed block instead of (or as well as) recording its duration.
+    """
+
+    def increment(self, name, kind=None, value=1):
+        raise NotImplementedError
+
+    def observe(self, name, seconds, kind=None):
+        raise NotImplementedError
+
+    def timer(self, name, kind=None):
+        return Timer(self, name, kind)
+
+
+class MemorySink(Sink):
+    """
+    Keeps counters and histograms in process, keyed by ``(name, kind)``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = collections.Counter()
+            self.histograms = {}
+
+    def increment(self, name, kind=None, value=1):
+        with self.lock:
+            self.counters[name, kind] += value
+
+    def observe(self, name, seconds, kind=None):
+        with self.lock:
+            histogram = self.histograms.get((name, kind))
+            if histogram is None:
+                histogram = self.histograms[name, kind] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            histogram["buckets"][bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+
+def prometheus_labels(kind, **extra):
+    labels = dict({"kind": kind} if kind is not None else {}, **extra)
+    if not labels:
+        return ""
+    return "{{{}}}".format(",".join('{}="{}"'.format(key, value) for key, value in labels.items()))
+
+
+def prometheus_le(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class PrometheusSink(MemorySink):
+    """
+    A ``MemorySink`` that can render itself in the Prometheus text exposition
+    format, see ``pinax.stripe.views.Metrics``.
+    """
+
+    def metric_name(self, name, suffix):
+        return "{}_{}_{}".format(settings.PINAX_STRIPE_METRICS_PREFIX, name.replace(".", "_"), suffix)
+
+    def render(self):
+        with self.lock:
+            counters = sorted(self.counters.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            histograms = sorted(self.histograms.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            histograms = [(key, dict(value, buckets=list(value["buckets"]))) for key, value in histograms]
+        lines = []
+        declared = set()
+        for (name, kind), value in counters:
+            metric = self.metric_name(name, "total")
+            if metric not in declared:
+                lines.append("# TYPE {} counter".format(metric))
+                declared.add(metric)
+            lines.append("{}{} {}".format(metric, prometheus_labels(kind), value))
+        for (name, kind), histogram in histograms:
+            metric = self.metric_name(name, "seconds")
+            if metric not in declared:
+                lines.append("# TYPE {} histogram".format(metric))
+                declared.add(metric)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(metric, prometheus_labels(kind, le=prometheus_le(bound)), cumulative))
+            lines.append("{}_sum{} {}".format(metric, prometheus_labels(kind), histogram["sum"]))
+            lines.append("{}_count{} {}".format(metric, prometheus_labels(kind), histogram["count"]))
+        return "\n".join(lines) + "\n"
+
+
+class StatsdSink(Sink):
+    """
+    Sends each measurement to a statsd server over UDP, e.g.
+    ``pinax_stripe.event.handler.invoice_paid:12.5|ms``.
+    """
+
+    def __init__(self, address=None):
+        self.address = tuple(address or settings.PINAX_STRIPE_STATSD_ADDRESS)
+        self.prefix = settings.PINAX_STRIPE_METRICS_PREFIX
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def stat(self, name, kind):
+        stat = "{}.{}".format(self.prefix, name)
+        if kind is not None:
+            stat = "{}.{}".format(stat, kind.replace(".", "_"))
+        return stat
+
+    def send(self, payload):
+        try:
+            self.socket.sendto(payload.encode("utf-8"), self.address)
+        except OSError:
+            pass
+
+    def increment(self, name, kind=None, value=1):
+        self.send("{}:{}|c".format(self.stat(name, kind), value))
+
+    def observe(self, name, seconds, kind=None):
+        self.send("{}:{:.3f}|ms".format(self.stat(name, kind), seconds * 1000))
+
+
+@functools.lru_cache(maxsize=None)
+def load_sink(path):
+    return import_string(path)()
+
+
+@functools.lru_cache(maxsize=None)
+def get_sink():
+    """
+    Return the configured sink, or ``None`` when metrics are disabled.
+
+    Cached, as it is called several times for every event and reading a
+    setting is not free; ``reset_sink`` clears it when the settings change.
+    """
+    path = settings.PINAX_STRIPE_METRICS_SINK
+    if path is None:
+        return None
+    return load_sink(path)
+
+
+@receiver(setting_changed)
+def reset_sink(setting, **kwargs):
+    if setting in ("PINAX_STRIPE_METRICS_SINK", "PINAX_STRIPE_METRICS_PREFIX", "PINAX_STRIPE_STATSD_ADDRESS"):
+        load_sink.cache_clear()
+        get_sink.cache_clear()
+
+
+def timer(name, kind=None):
+    sink = get_sink()
+    if sink is None:
+        return NULL_TIMER
+    return sink.timer(name, kind)
+
+
+def increment(name, kind=None, value=1):
+    sink = get_sink()
+    if sink is not None:
+        sink.increment(name, kind=kind, value=value)
+
+
+def observe(name, seconds, kind=None):
+    sink = get_sink()
+    if sink is not None:
+        sink.observe(name, seconds, kind=kind)
+
+
+def observe_lag(name, created, kind=None):
+    """
+    Record how long ago, in seconds, Stripe created an event.
+    """
+    sink = get_sink()
+    if sink is not None and created:
+        sink.observe(name, max(0.0, time.time() - created), kind=kind)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:39
+
+from django.db import migrations, models
+
+from ._operations import AddIndex
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pinax_stripe', '0003_auto_20211127_0119'),
+    ]
+
+    operations = [
+        AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['created_at'], name='pinax_stripe_evt_unproc_idx'),
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['kind', 'created_at'], name='pinax_stripe_evt_kind_idx'),
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['customer_id', 'created_at'], name='pinax_stripe_evt_customer_idx'),
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['account_id', 'created_at'], name='pinax_stripe_evt_account_idx'),
+        ),
+    ]
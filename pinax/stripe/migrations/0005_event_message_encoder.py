@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:55
+
+from django.db import migrations, models
+import pinax.stripe.payloads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0004_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='message',
+            field=models.JSONField(encoder=pinax.stripe.payloads.RawJSONEncoder),
+        ),
+    ]
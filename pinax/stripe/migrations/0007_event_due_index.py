@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:01
+
+from django.db import migrations, models
+
+from ._operations import AddIndex
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pinax_stripe', '0006_event_retries'),
+    ]
+
+    operations = [
+        AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('dead_letter', False), ('processed', False)), fields=['next_attempt_at'], name='pinax_stripe_evt_due_idx'),
+        ),
+    ]
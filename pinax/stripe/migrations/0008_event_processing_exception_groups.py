@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0007_event_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventProcessingExceptionGroup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('exception_type', models.CharField(max_length=250)),
+                ('message', models.CharField(max_length=500)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('sample_event_ids', models.JSONField(default=list)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='eventprocessingexception',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='pinax_stripe.eventprocessingexceptiongroup'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+from ._operations import AddIndex
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pinax_stripe', '0008_event_processing_exception_groups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='stripe_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['kind', 'stripe_created_at'], name='pinax_stripe_evt_kind_sc_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0009_event_stripe_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='receivers',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0010_event_receivers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventKey',
+            fields=[
+                ('stripe_id', models.CharField(max_length=191, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+import pinax.stripe.models
+
+
+def create_event_types(apps, schema_editor):
+    from pinax.stripe.webhooks import registry
+
+    Event = apps.get_model('pinax_stripe', 'Event')
+    EventType = apps.get_model('pinax_stripe', 'EventType')
+    db = schema_editor.connection.alias
+    names = set(registry.keys())
+    names.update(Event.objects.using(db).values_list('kind', flat=True).distinct())
+    EventType.objects.using(db).bulk_create([EventType(name=name) for name in sorted(names)], ignore_conflicts=True)
+
+
+def convert_kinds(apps, schema_editor):
+    # the migration is atomic, so batching the update would release no locks
+    Event = apps.get_model('pinax_stripe', 'Event')
+    EventType = apps.get_model('pinax_stripe', 'EventType')
+    db = schema_editor.connection.alias
+    code = Subquery(EventType.objects.using(db).filter(name=OuterRef('kind')).values('pk')[:1])
+    Event.objects.using(db).update(kind_code=code)
+
+
+def restore_kinds(apps, schema_editor):
+    Event = apps.get_model('pinax_stripe', 'Event')
+    EventType = apps.get_model('pinax_stripe', 'EventType')
+    db = schema_editor.connection.alias
+    name = Subquery(EventType.objects.using(db).filter(pk=OuterRef('kind_code')).values('name')[:1])
+    Event.objects.using(db).update(kind=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0011_eventkey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventType',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=250, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_event_types, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='event',
+            name='pinax_stripe_evt_kind_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='event',
+            name='pinax_stripe_evt_kind_sc_idx',
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='kind_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        # nullable while converting, so that migrating back can add the
+        # column to a filled table before restoring its values
+        migrations.AlterField(
+            model_name='event',
+            name='kind',
+            field=models.CharField(max_length=250, null=True),
+        ),
+        migrations.RunPython(convert_kinds, restore_kinds),
+        migrations.RemoveField(
+            model_name='event',
+            name='kind',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='kind_code',
+            new_name='kind',
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='kind',
+            field=pinax.stripe.models.EventKindField(),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['kind', 'created_at'], name='pinax_stripe_evt_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['kind', 'stripe_created_at'], name='pinax_stripe_evt_kind_sc_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:20
+
+from django.db import migrations, models
+import pinax.stripe.models
+import pinax.stripe.payloads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0012_event_kind_codes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='message',
+            field=pinax.stripe.models.MessageField(encoder=pinax.stripe.payloads.RawJSONEncoder, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='payload',
+            field=models.BinaryField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinax_stripe', '0013_event_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='blob_key',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
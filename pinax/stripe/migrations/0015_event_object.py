@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+from ._operations import AddIndex
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pinax_stripe', '0014_event_blob_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='object_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='object_type',
+            field=models.CharField(blank=True, default='', max_length=100),
+            preserve_default=False,
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['object_id', 'stripe_created_at'], name='pinax_stripe_evt_object_idx'),
+        ),
+        AddIndex(
+            model_name='event',
+            index=models.Index(fields=['object_type', 'stripe_created_at'], name='pinax_stripe_evt_obj_type_idx'),
+        ),
+    ]
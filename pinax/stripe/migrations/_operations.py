@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def concurrently(schema_editor, model):
+    # PostgreSQL cannot build or drop an index concurrently on a partitioned
+    # table, so those get a plain index on the parent, which cascades to the
+    # partitions
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE relname = %s AND pg_table_is_visible(oid)",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row is None or row[0] != 'p'
+
+
+class AddIndex(migrations.AddIndex):
+    """
+    Build the index without blocking writes on PostgreSQL, where the event
+    table can be very large, unless the table is partitioned.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if concurrently(schema_editor, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if concurrently(schema_editor, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
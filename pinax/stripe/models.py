@@ -1,6 +1,24 @@
-from django.db import models
+import collections
+import datetime
+import functools
+
+from django.core.exceptions import FieldError
+from django.db import IntegrityError, models, transaction
+from django.db.models.query_utils import DeferredAttribute
 from django.utils import timezone
 
+from asgiref.sync import sync_to_async
+
+from . import blobs, compression
+from .conf import settings
+from .payloads import RawJSONEncoder
+from .utils import (
+    convert_tstamp,
+    extract_customer_id,
+    extract_object,
+    retry_delay
+)
+
 
 class StripeObject(models.Model):
 
@@ -11,16 +29,307 @@ class StripeObject(models.Model):
         abstract = True
 
 
+class EventKindField(models.Field):
+    """
+    An event type such as ``invoice.paid``, stored as the id of its
+    ``EventType`` row but read, assigned and filtered on by name.
+
+    Pattern lookups such as ``startswith`` match names through ``EventType``;
+    ``gt``/``lt``/``range`` raise, and ordering by it sorts by code.
+    """
+
+    description = "Event type stored as a small integer"
+
+    def get_internal_type(self):
+        return "SmallIntegerField"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return EventType.objects.db_manager(connection.alias).name_for(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return EventType.objects.name_for(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or isinstance(value, int):
+            return value
+        # a type that was never stored matches nothing
+        return EventType.objects.code_for(value)
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, str):
+            value = EventType.objects.db_manager(connection.alias).code_for(value, create=True)
+        return super().get_db_prep_save(value, connection)
+
+
+class EventKindPatternLookup(models.Lookup):
+    """
+    Matches event types by name, e.g. ``kind__startswith="invoice."``, as
+    ``kind IN`` the codes of the ``EventType`` rows whose name matches.
+    """
+
+    # the pattern is matched against names, not turned into a code
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        codes = EventType._default_manager.filter(**{"name__{}".format(self.lookup_name): self.rhs}).values("pk")
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        codes_sql, codes_params = codes.query.get_compiler(connection=connection).as_sql()
+        return "{} IN ({})".format(lhs_sql, codes_sql), tuple(lhs_params) + tuple(codes_params)
+
+
+class EventKindComparisonLookup(models.Lookup):
+    """
+    Comparing codes would not compare event types by name, so refuse to.
+    """
+
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        raise FieldError("Event.kind cannot be compared with __{}, it is stored as a code".format(self.lookup_name))
+
+
+for name in ["iexact", "contains", "icontains", "startswith", "istartswith", "endswith", "iendswith", "regex", "iregex"]:
+    EventKindField.register_lookup(type("EventKind{}".format(name.title()), (EventKindPatternLookup,), {"lookup_name": name}))
+for name in ["gt", "gte", "lt", "lte", "range"]:
+    EventKindField.register_lookup(type("EventKind{}".format(name.title()), (EventKindComparisonLookup,), {"lookup_name": name}))
+
+
+class MessageDescriptor(DeferredAttribute):
+    """
+    Reads the message from ``payload`` or the blob store when the JSON
+    column is empty. Defines ``__set__`` so that the ``None`` loaded from
+    that column does not hide it.
+    """
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if value is None:
+            payload = instance.payload
+            if payload is not None:
+                value = compression.decompress(payload)
+                stored = payload
+            elif instance.blob_key:
+                value = blobs.fetch(instance.blob_key)
+                stored = instance.blob_key
+            else:
+                return None
+            # unchanged, so saving the event need not store it again
+            value.stored = stored
+            instance.__dict__[self.field.attname] = value
+        return value
+
+
+class MessageField(models.JSONField):
+    """
+    An event payload, stored in its own JSON column, compressed in
+    ``payload`` with ``PINAX_STRIPE_PAYLOAD_COMPRESSION``, or in the blob
+    store under ``blob_key`` once offloaded. It is decompressed or fetched
+    the first time it is read.
+    """
+
+    descriptor_class = MessageDescriptor
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        if value is None:
+            # not read since it was loaded from elsewhere, or there is none
+            return None
+        model_instance.fill_object(value)
+        stored = getattr(value, "stored", None)
+        if stored is not None and (stored is model_instance.payload or stored == model_instance.blob_key):
+            return None
+        model_instance.blob_key = ""
+        codec = compression.get_codec()
+        if codec is None:
+            model_instance.payload = None
+            return value
+        model_instance.payload = compression.compress(value, codec)
+        return None
+
+
+class EventTypeManager(models.Manager):
+
+    # name -> pk and pk -> name of the committed event types of each
+    # database, which never change once created
+    codes = collections.defaultdict(dict)
+    names = collections.defaultdict(dict)
+
+    def remember(self, using, pk, name):
+        self.codes[using][name] = pk
+        self.names[using][pk] = name
+
+    @classmethod
+    def forget(cls, using):
+        cls.codes.pop(using, None)
+        cls.names.pop(using, None)
+
+    def learn(self, pk, name):
+        # only once committed, a rolled back type may have its pk reused
+        transaction.on_commit(functools.partial(self.remember, self.db, pk, name), using=self.db)
+
+    def code_for(self, name, create=False):
+        pk = self.codes[self.db].get(name)
+        if pk is None:
+            if create:
+                pk = self.get_or_create(name=name)[0].pk
+            else:
+                pk = self.filter(name=name).values_list("pk", flat=True).first()
+            if pk is not None:
+                self.learn(pk, name)
+        return pk
+
+    def name_for(self, pk):
+        name = self.names[self.db].get(pk)
+        if name is None:
+            name = self.filter(pk=pk).values_list("name", flat=True).first()
+            if name is not None:
+                self.learn(pk, name)
+        return name
+
+
+class EventType(models.Model):
+    """
+    The event types stored in ``Event.kind``, created from the webhook
+    registry after ``migrate`` and whenever an unknown one is first stored.
+    """
+
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=250, unique=True)
+
+    objects = EventTypeManager()
+
+    def __str__(self):
+        return self.name
+
+
+class EventManager(models.Manager):
+
+    def build(self, data):
+        """
+        Return an unsaved event for a Stripe event payload.
+        """
+        obj = extract_object(data)
+        return self.model(
+            account_id=data.get("account") or "",
+            customer_id=extract_customer_id(data),
+            stripe_id=data["id"],
+            kind=data["type"],
+            livemode=data["livemode"],
+            stripe_created_at=convert_tstamp(data, "created"),
+            object_id=obj.get("id") or "",
+            object_type=obj.get("object") or "",
+            message=data,
+            api_version=data.get("api_version") or "",
+            pending_webhooks=data.get("pending_webhooks") or 0
+        )
+
+    def save_if_new(self, event):
+        """
+        Insert ``event`` unless one with the same ``stripe_id`` already exists.
+
+        Relies on the unique constraint rather than a prior lookup so that
+        concurrent deliveries of the same event cannot both get through.
+        Returns the event, or ``None`` if it was a duplicate.
+        """
+        # a partitioned table cannot enforce a unique stripe_id
+        keys = EventKey if settings.PINAX_STRIPE_EVENT_PARTITIONING else self.model
+        # look the kind's code up before the transaction, so that it starts
+        # with the insert: SQLite fails a transaction that read before writing
+        # at once rather than waiting for a concurrent writer
+        if isinstance(event.kind, str):
+            EventType.objects.db_manager(self.db).code_for(event.kind, create=True)
+        try:
+            with transaction.atomic(using=self.db):
+                if keys is EventKey:
+                    EventKey(stripe_id=event.stripe_id, created_at=event.created_at).save(force_insert=True, using=self.db)
+                event.save(force_insert=True, using=self.db)
+        except IntegrityError:
+            # any other violation, e.g. of a NOT NULL column, is an error
+            if not keys._default_manager.using(self.db).filter(stripe_id=event.stripe_id).exists():
+                raise
+            return None
+        return event
+
+    async def asave_if_new(self, event):
+        """
+        ``save_if_new`` for async callers, in one trip to the sync thread.
+        """
+        return await sync_to_async(self.save_if_new)(event)
+
+    def create_if_new(self, **kwargs):
+        return self.save_if_new(self.model(**kwargs))
+
+    def for_object(self, object_id):
+        """
+        The events about the Stripe object ``object_id`` (``sub_123``,
+        ``in_456``...), found through an index, oldest first by Stripe's
+        creation time. Events without one come first on every database.
+        """
+        return self.filter(object_id=object_id).order_by(models.F("stripe_created_at").asc(nulls_first=True), "pk")
+
+    def due(self, now=None):
+        """
+        Unprocessed events whose next attempt is due, served by a partial
+        index so that it stays cheap however many events are waiting.
+        """
+        return self.filter(
+            processed=False,
+            dead_letter=False,
+            next_attempt_at__lte=now or timezone.now()
+        )
+
+
 class Event(StripeObject):
 
-    kind = models.CharField(max_length=250)
+    kind = EventKindField()
     livemode = models.BooleanField(default=False)
     customer_id = models.CharField(max_length=200, blank=True)
     account_id = models.CharField(max_length=200, blank=True)
-    message = models.JSONField()
+    message = MessageField(encoder=RawJSONEncoder, null=True)
+    payload = models.BinaryField(null=True, editable=False)
+    blob_key = models.CharField(max_length=64, blank=True, editable=False)
     processed = models.BooleanField(default=False)
     pending_webhooks = models.PositiveIntegerField(default=0)
     api_version = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    dead_letter = models.BooleanField(default=False)
+    stripe_created_at = models.DateTimeField(null=True, blank=True)
+    receivers = models.JSONField(default=dict, blank=True)
+    object_id = models.CharField(max_length=255, blank=True)
+    object_type = models.CharField(max_length=100, blank=True)
+
+    objects = EventManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(processed=False),
+                name="pinax_stripe_evt_unproc_idx"
+            ),
+            models.Index(fields=["kind", "created_at"], name="pinax_stripe_evt_kind_idx"),
+            models.Index(fields=["customer_id", "created_at"], name="pinax_stripe_evt_customer_idx"),
+            models.Index(fields=["account_id", "created_at"], name="pinax_stripe_evt_account_idx"),
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(processed=False, dead_letter=False),
+                name="pinax_stripe_evt_due_idx"
+            ),
+            models.Index(fields=["kind", "stripe_created_at"], name="pinax_stripe_evt_kind_sc_idx"),
+            models.Index(fields=["object_id", "stripe_created_at"], name="pinax_stripe_evt_object_idx"),
+            models.Index(fields=["object_type", "stripe_created_at"], name="pinax_stripe_evt_obj_type_idx"),
+        ]
 
     def __str__(self):
         return "{} - {}".format(self.kind, self.stripe_id)
@@ -34,10 +343,131 @@ class Event(StripeObject):
             self.stripe_id,
         )
 
+    def fill_object(self, message):
+        """
+        Copy the id and type of ``data.object`` from ``message`` unless set
+        already, so that events created without ``build`` have them too.
+        """
+        if not self.object_id:
+            obj = extract_object(message)
+            self.object_id = obj.get("id") or ""
+            self.object_type = obj.get("object") or ""
+
+    def superseded(self):
+        """
+        Whether an event of the same kind for the same object, created later
+        by Stripe, has been processed already.
+        """
+        if self.stripe_created_at is None or not self.object_id:
+            return False
+        return Event.objects.filter(
+            object_id=self.object_id,
+            kind=self.kind,
+            stripe_created_at__gt=self.stripe_created_at,
+            processed=True
+        ).exists()
+
+    def record_failure(self, now=None):
+        """
+        Schedule the next attempt after a failed one, backing off
+        exponentially, or give up once ``PINAX_STRIPE_RETRY_MAX_ATTEMPTS``
+        attempts have failed.
+        """
+        if self.attempts >= settings.PINAX_STRIPE_RETRY_MAX_ATTEMPTS:
+            self.dead_letter = True
+        else:
+            delay = retry_delay(
+                self.attempts,
+                settings.PINAX_STRIPE_RETRY_BASE_DELAY,
+                settings.PINAX_STRIPE_RETRY_MAX_DELAY
+            )
+            self.next_attempt_at = (now or timezone.now()) + datetime.timedelta(seconds=delay)
+        self.save(update_fields=["attempts", "next_attempt_at", "dead_letter", "receivers"])
+
+
+class EventKey(models.Model):
+    """
+    The ``stripe_id`` of every stored event, so that events are still stored
+    once when ``Event`` is partitioned (see ``pinax.stripe.partitions``).
+    """
+
+    stripe_id = models.CharField(max_length=191, primary_key=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.stripe_id
+
+
+class EventProcessingExceptionGroupManager(models.Manager):
+
+    # fingerprint -> pk of the groups that have all the sample event ids they
+    # keep, so further occurrences only need their counters bumped
+    complete = {}
+
+    def record(self, fingerprint, exception, event=None, now=None):
+        """
+        Count an occurrence of the exception identified by ``fingerprint``,
+        creating its group on the first one. Returns ``(group_id, created)``.
+
+        The count is bumped with ``F()`` rather than under a row lock, so
+        concurrent failures only wait on each other for the ``UPDATE``
+        itself; a sample event id added at the same time as another may be
+        lost, the count is not.
+        """
+        now = now or timezone.now()
+        message = str(exception)[:500]
+        updates = {"count": models.F("count") + 1, "message": message, "last_seen": now}
+        pk = self.complete.get(fingerprint)
+        if pk is not None:
+            if self.filter(pk=pk, fingerprint=fingerprint).update(**updates):
+                return pk, False
+            del self.complete[fingerprint]
+
+        limit = settings.PINAX_STRIPE_EXCEPTION_SAMPLE_EVENTS
+        group, created = self.only("pk", "sample_event_ids").get_or_create(
+            fingerprint=fingerprint,
+            defaults={
+                "exception_type": "{}.{}".format(type(exception).__module__, type(exception).__qualname__)[:250],
+                "message": message,
+                "first_seen": now,
+                "last_seen": now,
+                "sample_event_ids": [event.stripe_id] if event is not None and limit else [],
+            }
+        )
+        samples = group.sample_event_ids
+        if not created:
+            if event is not None and event.stripe_id not in samples and len(samples) < limit:
+                samples = updates["sample_event_ids"] = samples + [event.stripe_id]
+            self.filter(pk=group.pk).update(**updates)
+        if len(samples) >= limit:
+            self.complete[fingerprint] = group.pk
+        return group.pk, created
+
+
+class EventProcessingExceptionGroup(models.Model):
+    """
+    Repeated processing exceptions, grouped by exception type and the
+    functions in their traceback.
+    """
+
+    fingerprint = models.CharField(max_length=64, unique=True)
+    exception_type = models.CharField(max_length=250)
+    message = models.CharField(max_length=500)
+    count = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now, db_index=True)
+    sample_event_ids = models.JSONField(default=list)
+
+    objects = EventProcessingExceptionGroupManager()
+
+    def __str__(self):
+        return "{}: {} ({})".format(self.exception_type, self.message, self.count)
+
 
 class EventProcessingException(models.Model):
 
     event = models.ForeignKey("Event", null=True, blank=True, on_delete=models.CASCADE)
+    group = models.ForeignKey("EventProcessingExceptionGroup", null=True, blank=True, on_delete=models.SET_NULL)
     data = models.TextField()
     message = models.CharField(max_length=500)
     traceback = models.TextField()
@@ -0,0 +1,266 @@
+"""
+Monthly range partitioning of the ``Event`` and ``EventProcessingException``
+tables on ``created_at``, for PostgreSQL 11 and later.
+
+Partitioning is opt-in: set ``PINAX_STRIPE_EVENT_PARTITIONING`` and run
+``pinax_stripe_partition_events --setup`` once. On other databases the
+tables are left as they are and the functions here do nothing.
+"""
+import datetime
+import re
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import blobs
+from .conf import settings
+from .models import Event, EventKey, EventProcessingException
+
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def get_connection(model):
+    return connections[router.db_for_write(model)]
+
+
+def supported(connection):
+    return connection.vendor == "postgresql" and connection.pg_version >= 110000
+
+
+def is_partitioned(model):
+    connection = get_connection(model)
+    if not supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(model):
+    """
+    Return a ``(name, upper_bound)`` tuple for each partition of the table
+    of ``model``, the bound being ``None`` for the default partition.
+    """
+    connection = get_connection(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid) ORDER BY c.relname",
+            [model._meta.db_table]
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        match = UPPER_BOUND.search(bound)
+        result.append((name, parse_datetime(match.group(1)) if match else None))
+    return result
+
+
+def partition_name(model, month):
+    return "{}_p{:%Y%m}".format(model._meta.db_table, month)
+
+
+def event_retention_days():
+    """
+    The age after which every processed event is past its retention window,
+    or ``None`` if some are kept forever.
+    """
+    days = [settings.PINAX_STRIPE_EVENT_RETENTION_DAYS, *settings.PINAX_STRIPE_EVENT_RETENTION_DAYS_BY_KIND.values()]
+    if None in days:
+        return None
+    return max(days)
+
+
+def create_partitions(months_ahead=3, now=None):
+    """
+    Create the monthly partitions from the current month up to
+    ``months_ahead`` months ahead that are not covered yet, returning their
+    names.
+    """
+    start = month_start(now or timezone.now())
+    created = []
+    for model in [Event, EventProcessingException]:
+        if not is_partitioned(model):
+            continue
+        connection = get_connection(model)
+        qn = connection.ops.quote_name
+        bounds = [upper for name, upper in partitions(model) if upper is not None]
+        covered = max(bounds) if bounds else None
+        for offset in range(months_ahead + 1):
+            month = add_months(start, offset)
+            if covered is not None and month < covered:
+                continue
+            name = partition_name(model, month)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)".format(qn(name), qn(model._meta.db_table)),
+                    [month, add_months(month, 1)]
+                )
+            created.append(name)
+    return created
+
+
+def expire_partitions(drop=False, now=None):
+    """
+    Detach, and with ``drop`` drop, the partitions whose rows are all past
+    the retention window (``PINAX_STRIPE_EVENT_RETENTION_DAYS`` and
+    ``PINAX_STRIPE_EXCEPTION_RETENTION_DAYS``), returning their names.
+
+    An event partition that still holds unprocessed events is kept, and the
+    processing exceptions and offloaded payloads of the events in a dropped
+    partition are deleted with it.
+    """
+    now = now or timezone.now()
+    expired = []
+    for model, days in [
+        (Event, event_retention_days()),
+        (EventProcessingException, settings.PINAX_STRIPE_EXCEPTION_RETENTION_DAYS)
+    ]:
+        if days is None or not is_partitioned(model):
+            continue
+        connection = get_connection(model)
+        qn = connection.ops.quote_name
+        table = model._meta.db_table
+        cutoff = now - datetime.timedelta(days=days)
+        for name, upper in partitions(model):
+            if upper is None or upper > cutoff:
+                continue
+            keys = []
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                if model is Event:
+                    cursor.execute("SELECT EXISTS (SELECT 1 FROM {} WHERE NOT processed)".format(qn(name)))
+                    if cursor.fetchone()[0]:
+                        continue
+                cursor.execute("ALTER TABLE {} DETACH PARTITION {}".format(qn(table), qn(name)))
+                if drop:
+                    if model is Event:
+                        cursor.execute("SELECT blob_key FROM {} WHERE blob_key <> ''".format(qn(name)))
+                        keys = [key for (key,) in cursor.fetchall()]
+                        cursor.execute("DELETE FROM {} WHERE event_id IN (SELECT id FROM {})".format(
+                            qn(EventProcessingException._meta.db_table),
+                            qn(name)
+                        ))
+                    cursor.execute("DROP TABLE {}".format(qn(name)))
+            for key in keys:
+                blobs.delete(key)
+            expired.append(name)
+    return expired
+
+
+def partition_table(model, now=None):
+    """
+    Turn the table of ``model`` into one partitioned by month on
+    ``created_at``, in a single transaction.
+
+    The existing table is renamed to ``<table>_legacy`` and attached as the
+    partition for everything before next month, so no rows are copied. A
+    default partition catches rows no monthly partition covers. Foreign keys
+    to and from the table are dropped, as PostgreSQL cannot point them at a
+    partitioned table (Django still cascades deletes itself), and unique
+    columns other than the primary key get a plain index instead.
+    """
+    connection = get_connection(model)
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    legacy = "{}_legacy".format(table)
+    boundary = add_months(month_start(now or timezone.now()), 1)
+
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            # settle deferred foreign key checks before their constraints go
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' AND (conrelid = %s::regclass OR confrelid = %s::regclass)",
+                [table, table]
+            )
+            for relation, constraint in cursor.fetchall():
+                cursor.execute("ALTER TABLE {} DROP CONSTRAINT {}".format(relation, qn(constraint)))
+
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s AND schemaname = current_schema()",
+                [table]
+            )
+            for (index,) in cursor.fetchall():
+                cursor.execute("ALTER INDEX {} RENAME TO {}".format(qn(index), qn("{}_legacy".format(index[:55]))))
+
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id'), (SELECT MAX(id) FROM {})".format(qn(table)), [table])
+            sequence, max_id = cursor.fetchone()
+            cursor.execute(
+                "SELECT is_identity FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'id'",
+                [table]
+            )
+            identity = cursor.fetchone()[0] == "YES"
+
+            cursor.execute("ALTER TABLE {} RENAME TO {}".format(qn(table), qn(legacy)))
+            if identity:
+                # partitions cannot have identity columns of their own
+                cursor.execute("ALTER TABLE {} ALTER COLUMN id DROP IDENTITY".format(qn(legacy)))
+                cursor.execute("CREATE SEQUENCE {}".format(sequence))
+                cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, max_id is not None])
+            cursor.execute("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)".format(
+                qn(table),
+                qn(legacy)
+            ))
+            cursor.execute("ALTER TABLE {} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)".format(qn(table)), [sequence])
+            cursor.execute("ALTER SEQUENCE {} OWNED BY {}.id".format(sequence, qn(table)))
+            cursor.execute("ALTER TABLE {} ADD PRIMARY KEY (id, created_at)".format(qn(table)))
+
+        with connection.schema_editor(atomic=False) as editor:
+            for sql in editor._model_indexes_sql(model):
+                editor.execute(sql)
+            for field in model._meta.local_fields:
+                if field.unique and not field.primary_key:
+                    editor.execute(editor._create_index_sql(model, fields=[field], suffix="_part"))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE {} ADD CONSTRAINT {} CHECK (created_at < %s) NOT VALID".format(
+                    qn(legacy),
+                    qn("{}_bound".format(legacy))
+                ),
+                [boundary]
+            )
+            cursor.execute("ALTER TABLE {} VALIDATE CONSTRAINT {}".format(qn(legacy), qn("{}_bound".format(legacy))))
+            cursor.execute(
+                "ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (MINVALUE) TO (%s)".format(qn(table), qn(legacy)),
+                [boundary]
+            )
+            cursor.execute("CREATE TABLE {} PARTITION OF {} DEFAULT".format(qn("{}_default".format(table)), qn(table)))
+            if model is Event:
+                cursor.execute(
+                    "INSERT INTO {} (stripe_id, created_at) SELECT stripe_id, created_at FROM {} ON CONFLICT DO NOTHING".format(
+                        qn(EventKey._meta.db_table),
+                        qn(legacy)
+                    )
+                )
+
+
+def setup(months_ahead=3, now=None):
+    """
+    Partition the event tables that are not partitioned yet and create
+    their partitions for the coming months. Returns the models converted.
+    """
+    converted = []
+    for model in [Event, EventProcessingException]:
+        if supported(get_connection(model)) and not is_partitioned(model):
+            partition_table(model, now=now)
+            converted.append(model)
+    create_partitions(months_ahead=months_ahead, now=now)
+    return converted
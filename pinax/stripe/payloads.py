@@ -0,0 +1,102 @@
+import functools
+import json
+
+from django.utils.module_loading import import_string
+
+import stripe
+
+from .conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class RawJSON(dict):
+    """
+    A parsed payload that remembers the text it was parsed from, so storing
+    it in a ``JSONField`` (see ``RawJSONEncoder``) writes that text as is
+    rather than serializing the dict again.
+
+    Setting or removing a key forgets the text, so the changed dict is
+    serialized instead. Changes inside nested values are not noticed: set
+    the top level key again for them to be saved.
+    """
+
+    def __init__(self, data, raw):
+        super().__init__(data)
+        self.raw = raw
+
+    def __setitem__(self, key, value):
+        self.raw = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.raw = None
+        super().__delitem__(key)
+
+    def clear(self):
+        self.raw = None
+        super().clear()
+
+    def pop(self, *args):
+        self.raw = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self.raw = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.raw = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.raw = None
+        super().update(*args, **kwargs)
+
+
+class RawJSONEncoder(json.JSONEncoder):
+
+    def encode(self, o):
+        if isinstance(o, RawJSON) and o.raw is not None:
+            return o.raw
+        return super().encode(o)
+
+
+@functools.lru_cache(maxsize=None)
+def load_loads(path):
+    if path is not None:
+        return import_string(path)
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+def loads(payload):
+    return load_loads(settings.PINAX_STRIPE_JSON_LOADS)(payload)
+
+
+def verify_signature(payload, header, secret, tolerance=stripe.Webhook.DEFAULT_TOLERANCE):
+    """
+    Check the ``Stripe-Signature`` header against the raw request body with
+    ``stripe.WebhookSignature.verify_header``, without parsing the body.
+
+    Raises ``stripe.error.SignatureVerificationError`` like ``stripe.Webhook``,
+    or ``ValueError`` if the body is not valid UTF-8.
+    """
+    stripe.WebhookSignature.verify_header(payload.decode("utf-8"), header, secret, tolerance)
+
+
+def parse(payload):
+    """
+    Parse a verified event body once, keeping the original text for storage.
+
+    Raises ``ValueError`` if the body is not valid UTF-8 encoded JSON.
+    """
+    data = loads(payload)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return RawJSON(data, raw=payload.decode("utf-8"))
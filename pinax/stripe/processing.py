@@ -0,0 +1,359 @@
+import collections
+import functools
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils.module_loading import import_string
+
+from asgiref.sync import sync_to_async
+
+from .conf import settings
+from .models import Event
+from .webhooks import registry
+
+logger = logging.getLogger(__name__)
+
+
+def process_event(event, coalesced=None):
+    """
+    Run the registered handler for ``event``, if there is one.
+    """
+    WebhookClass = registry.resolve(event.kind).webhook
+    if WebhookClass is not None:
+        WebhookClass(event, coalesced=coalesced).process()
+
+
+def coalesce(event):
+    """
+    Lock the other pending events of the same kind for the same object as
+    ``event`` and return ``(newest, older)``, ordered by Stripe's creation
+    time. Events locked by another worker are left out.
+    """
+    if not event.object_id:
+        return event, []
+    siblings = Event.objects.select_for_update(skip_locked=True).filter(
+        object_id=event.object_id,
+        kind=event.kind,
+        processed=False,
+        dead_letter=False
+    ).exclude(pk=event.pk)
+    events = sorted(
+        [event, *siblings],
+        key=lambda e: (e.stripe_created_at.timestamp() if e.stripe_created_at else 0, e.pk)
+    )
+    return events[-1], events[:-1]
+
+
+def process_locked(pk, due=False):
+    """
+    Lock the unprocessed event ``pk`` and run its handler.
+
+    Events locked by another worker, or already processed (or, with ``due``,
+    not due any more), are skipped so several workers can drain the same
+    table. With
+    ``PINAX_STRIPE_COALESCE_WINDOW`` set, events of a
+    ``PINAX_STRIPE_LATEST_WINS_KINDS`` kind are handled together with the
+    other pending events for their object, in a single run for the newest.
+    Returns an ``(event, succeeded)`` tuple where ``event`` is ``None`` if it
+    was skipped.
+    """
+    with transaction.atomic():
+        qs = Event.objects.due() if due else Event.objects.filter(processed=False)
+        event = qs.select_for_update(skip_locked=True).filter(pk=pk).first()
+        if event is None:
+            return None, False
+        coalesced = []
+        if settings.PINAX_STRIPE_COALESCE_WINDOW and event.kind in settings.PINAX_STRIPE_LATEST_WINS_KINDS:
+            event, coalesced = coalesce(event)
+        try:
+            process_event(event, coalesced)
+        except Exception:
+            logger.exception("Processing of %r failed", event)
+            return event, False
+    return event, True
+
+
+def process_batch_locked(pks):
+    """
+    Lock the due events among ``pks``, all of one type, and process them
+    together through their handler's ``process_batch``.
+
+    Events locked by another worker or no longer due are left out. Returns a
+    list of ``(event, succeeded)`` tuples.
+    """
+    with transaction.atomic():
+        events = list(Event.objects.due().select_for_update(skip_locked=True).filter(pk__in=pks).order_by("pk"))
+        if not events:
+            return []
+        return registry.resolve(events[0].kind).webhook.process_many(events)
+
+
+class InlineBackend:
+    """
+    Processes the webhook inside the request that delivered it.
+    """
+
+    processes_immediately = True
+
+    def enqueue(self, webhook):
+        # the event is stored, failures are retried by the worker
+        try:
+            webhook.process()
+        except Exception:
+            logger.exception("Processing of %r failed", webhook.event)
+
+    async def aenqueue(self, webhook):
+        try:
+            await webhook.aprocess()
+        except Exception:
+            logger.exception("Processing of %r failed", webhook.event)
+
+
+class ThreadPoolBackend:
+    """
+    Hands the webhook to an in-process thread pool once the transaction that
+    stored the event has been committed, so the view can respond right away.
+    """
+
+    processes_immediately = True
+
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.PINAX_STRIPE_PROCESSING_MAX_WORKERS,
+            thread_name_prefix="pinax-stripe"
+        )
+
+    def run(self, webhook):
+        try:
+            webhook.process()
+        except Exception:
+            logger.exception("Processing of %r failed", webhook.event)
+        finally:
+            close_old_connections()
+
+    def enqueue(self, webhook):
+        transaction.on_commit(lambda: self.executor.submit(self.run, webhook))
+
+    async def aenqueue(self, webhook):
+        await sync_to_async(self.enqueue)(webhook)
+
+
+class DatabaseBackend:
+    """
+    Leaves the stored event unprocessed so that the
+    ``pinax_stripe_process_events`` management command can pick it up.
+    """
+
+    processes_immediately = False
+
+    def enqueue(self, webhook):
+        return
+
+    async def aenqueue(self, webhook):
+        return
+
+
+@functools.lru_cache(maxsize=None)
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return load_backend(settings.PINAX_STRIPE_PROCESSING_BACKEND)
+
+
+class Worker:
+    """
+    Drains unprocessed events whose next attempt is due, in the order they
+    became due.
+
+    Failed events are scheduled for a later attempt by the handler (see
+    ``Event.record_failure``); they are also remembered until the end of the
+    ``drain`` pass so that a broken handler is never retried within one pass,
+    and retried by a later pass once their next attempt is due.
+    """
+
+    def __init__(self, batch_size=100, max_workers=1):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the events that failed in the previous pass.
+        """
+        self.failed = set()
+
+    def pending(self):
+        return Event.objects.due().filter(
+            kind__in=list(registry.keys())
+        ).exclude(pk__in=self.failed).order_by("next_attempt_at", "pk").values_list("pk", flat=True)
+
+    def run_one(self, pk):
+        try:
+            event, succeeded = process_locked(pk, due=True)
+        finally:
+            if self.max_workers > 1:
+                close_old_connections()
+        if event is None:
+            return None
+        if not succeeded:
+            self.failed.add(pk)
+        return succeeded
+
+    def run_batch(self):
+        """
+        Process the next batch of pending events, returning a list with the
+        outcome of each one (see ``run_one``).
+        """
+        batch = list(self.pending()[:self.batch_size])
+        if self.max_workers > 1 and batch:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(self.run_one, batch))
+        return [self.run_one(pk) for pk in batch]
+
+    def drain(self):
+        """
+        Process everything that is currently pending and return a
+        ``(processed, failed)`` tuple of counts.
+        """
+        self.reset()
+        processed = failed = 0
+        while True:
+            results = self.run_batch()
+            if not results:
+                break
+            processed += results.count(True)
+            failed += results.count(False)
+            if results.count(None) == len(results):
+                # everything left is locked by other workers
+                break
+        return processed, failed
+
+    def run_forever(self, interval=1.0):
+        while True:
+            processed, failed = self.drain()
+            if not processed and not failed:
+                time.sleep(interval)
+
+
+class OrderedWorker(Worker):
+    """
+    Processes events for different Stripe objects in parallel, and events for
+    the same object one at a time in the order Stripe created them.
+
+    Each batch is split into partitions by the id of ``data.object``, falling
+    back to the customer and then the account the event belongs to, and the
+    partitions are spread over ``max_workers`` threads. A partition stops at
+    the first event that fails or is locked by another worker, so a later
+    update never overtakes an earlier one; after a failure the object's
+    remaining events are held back until the end of the pass, like the
+    failed event itself. Across workers and runs, an event is not picked up
+    while an older one for the same object, of a type with a handler, is
+    still unprocessed and not dead-lettered, whether or not that one is due.
+    """
+
+    def __init__(self, batch_size=100, max_workers=4):
+        super().__init__(batch_size=batch_size, max_workers=max_workers)
+
+    def reset(self):
+        super().reset()
+        self.blocked = set()
+        self.held = set()
+
+    def pending(self):
+        # e.g. waiting out its retry delay, or not in this batch; events of
+        # a type without a handler are never processed, so they hold nothing
+        # back
+        kinds = list(registry.keys())
+        older = Event.objects.filter(
+            object_id=OuterRef("object_id"),
+            stripe_created_at__lt=OuterRef("stripe_created_at"),
+            kind__in=kinds,
+            processed=False,
+            dead_letter=False
+        ).exclude(object_id="")
+        return Event.objects.due().filter(
+            ~Exists(older),
+            kind__in=kinds
+        ).exclude(pk__in=self.failed | self.held).order_by("next_attempt_at", "pk").values_list(
+            "pk", "object_id", "stripe_created_at", "message__created", "customer_id", "account_id"
+        )
+
+    def partitions(self, rows):
+        """
+        Group ``(pk, object_id, stripe_created_at, created, customer_id,
+        account_id)`` rows by object, each partition being a list of
+        ``(key, pk)`` in Stripe ``created`` order. Rows of blocked objects are
+        left out.
+        """
+        partitions = collections.defaultdict(list)
+        for pk, object_id, stripe_created_at, created, customer_id, account_id in rows:
+            key = object_id or customer_id or account_id or pk
+            if key in self.blocked:
+                self.held.add(pk)
+                continue
+            # the message's own timestamp covers rows stored before
+            # stripe_created_at was filled in
+            if stripe_created_at is not None:
+                created = stripe_created_at.timestamp()
+            partitions[key].append((created or 0, pk))
+        return [[(key, pk) for _, pk in sorted(events)] for key, events in partitions.items()]
+
+    def run_partition(self, partition):
+        results = []
+        for key, pk in partition:
+            succeeded = self.run_one(pk)
+            results.append(succeeded)
+            if succeeded is False:
+                self.blocked.add(key)
+            if not succeeded:
+                break
+        return results
+
+    def run_batch(self):
+        while True:
+            rows = list(self.pending()[:self.batch_size])
+            if not rows:
+                return []
+            partitions = self.partitions(rows)
+            if partitions:
+                break
+        if self.max_workers > 1 and len(partitions) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(itertools.chain.from_iterable(executor.map(self.run_partition, partitions)))
+        return list(itertools.chain.from_iterable(self.run_partition(partition) for partition in partitions))
+
+
+class BatchWorker(Worker):
+    """
+    Groups each batch of pending events by type and hands every group to
+    the handler's ``process_batch`` at once (see ``Webhook.process_many``),
+    with up to ``max_workers`` types processed in parallel.
+    """
+
+    def pending(self):
+        return super().pending().values_list("pk", "kind")
+
+    def run_group(self, pks):
+        try:
+            results = {event.pk: succeeded for event, succeeded in process_batch_locked(pks)}
+        finally:
+            if self.max_workers > 1:
+                close_old_connections()
+        self.failed.update(pk for pk, succeeded in results.items() if not succeeded)
+        return [results.get(pk) for pk in pks]
+
+    def run_batch(self):
+        groups = collections.defaultdict(list)
+        for pk, kind in self.pending()[:self.batch_size]:
+            groups[kind].append(pk)
+        groups = list(groups.values())
+        if self.max_workers > 1 and len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(itertools.chain.from_iterable(executor.map(self.run_group, groups)))
+        return list(itertools.chain.from_iterable(self.run_group(pks) for pks in groups))
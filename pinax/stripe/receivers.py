@@ -0,0 +1,157 @@
+import collections
+import functools
+import inspect
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+from asgiref.sync import async_to_sync
+
+from . import metrics
+from .conf import settings
+
+
+def independent(receiver):
+    """
+    Mark a signal receiver as not depending on the others, so that with
+    ``PINAX_STRIPE_ROBUST_RECEIVERS`` it may run alongside them on a thread
+    pool. Apply it below ``@receiver``.
+    """
+    receiver.pinax_stripe_independent = True
+    return receiver
+
+
+def receiver_name(receiver):
+    return "{}.{}".format(
+        getattr(receiver, "__module__", None) or type(receiver).__module__,
+        getattr(receiver, "__qualname__", None) or type(receiver).__qualname__
+    )
+
+
+def live_receivers(signal, sender):
+    """
+    Return ``(dispatch_uid, receiver)`` pairs for the receivers of ``signal``
+    connected for ``sender``, with ``None`` for receivers connected without
+    a string ``dispatch_uid``.
+
+    ``Signal`` has no public way to list them, so this reads its private
+    state; ``LiveReceiversTests`` pins what it relies on, and CI runs it
+    against a Django release from either side of the 5.0 change to it.
+    """
+    receivers = signal._live_receivers(sender)
+    if isinstance(receivers, tuple):
+        # Django 5.0 and later return the sync and async receivers apart
+        receivers = [*receivers[0], *receivers[1]]
+    uids = []
+    for entry in list(signal.receivers):
+        (uid, _), target = entry[0], entry[1]
+        if isinstance(uid, str):
+            if isinstance(target, weakref.ReferenceType):
+                target = target()
+            uids.append((uid, target))
+    pairs = []
+    for receiver in receivers:
+        # the same receiver may be connected under several uids
+        match = next((pair for pair in uids if pair[1] == receiver), None)
+        if match is not None:
+            uids.remove(match)
+        pairs.append((match and match[0], receiver))
+    return pairs
+
+
+def receiver_keys(name, signal, sender):
+    """
+    Return ``(key, receiver)`` pairs for the receivers of ``signal``, which
+    is sent for the event type or wildcard pattern ``name``.
+
+    A key is ``name`` and the receiver's ``dispatch_uid``, or its dotted name
+    when it has none, so it stays the same from one process to the next.
+    Receivers that would share a key, like bound methods of two instances of
+    a class, are numbered in the order they were connected.
+    """
+    counts = collections.Counter()
+    keys = []
+    for uid, receiver in live_receivers(signal, sender):
+        key = "{}:{}".format(name, uid or receiver_name(receiver))
+        counts[key] += 1
+        if counts[key] > 1:
+            key = "{}#{}".format(key, counts[key])
+        keys.append((key, receiver))
+    return keys
+
+
+@functools.lru_cache(maxsize=None)
+def get_executor(max_workers):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pinax-stripe-receiver")
+
+
+def call(receiver, kind, kwargs):
+    """
+    Call ``receiver`` in a savepoint of its own and return a
+    ``(response, exception, seconds)`` tuple.
+    """
+    start = time.perf_counter()
+    exception = None
+    try:
+        with transaction.atomic():
+            if inspect.iscoroutinefunction(receiver):
+                # its sync_to_async calls come back to this thread, and so
+                # to the savepoint
+                response = async_to_sync(receiver)(**kwargs)
+            else:
+                response = receiver(**kwargs)
+    except Exception as e:
+        response = exception = e
+    seconds = time.perf_counter() - start
+    metrics.observe("event.receiver", seconds, kind=kind)
+    return response, exception, seconds
+
+
+def call_in_thread(receiver, kind, kwargs):
+    try:
+        return call(receiver, kind, kwargs)
+    finally:
+        close_old_connections()
+
+
+def send(signals, sender, outcomes, kind, **named):
+    """
+    Send ``signals``, ``(name, signal)`` pairs of the event type or wildcard
+    pattern each is sent for, like ``Signal.send_robust``, skipping the
+    receivers that ``outcomes`` says have succeeded for the event already.
+
+    The outcome of each receiver that runs is recorded in ``outcomes`` under
+    its key (see ``receiver_keys``). Receivers marked ``independent`` run on a thread pool of
+    ``PINAX_STRIPE_RECEIVER_MAX_WORKERS`` threads while the others run in
+    turn on this one. Returns the ``(receiver, response)`` pairs and the list
+    of exceptions raised.
+    """
+    pending = []
+    for signal_name, signal in signals:
+        for name, receiver in receiver_keys(signal_name, signal, sender):
+            if not outcomes.get(name, {}).get("succeeded"):
+                pending.append((name, receiver, dict(named, signal=signal, sender=sender)))
+
+    threaded = len(pending) > 1 and any(getattr(receiver, "pinax_stripe_independent", False) for _, receiver, _ in pending)
+    results = []
+    for name, receiver, kwargs in pending:
+        if threaded and getattr(receiver, "pinax_stripe_independent", False):
+            executor = get_executor(settings.PINAX_STRIPE_RECEIVER_MAX_WORKERS)
+            results.append(executor.submit(call_in_thread, receiver, kind, kwargs))
+        else:
+            results.append(call(receiver, kind, kwargs))
+
+    responses = []
+    exceptions = []
+    for (name, receiver, _), result in zip(pending, results):
+        response, exception, seconds = result if isinstance(result, tuple) else result.result()
+        outcome = {"succeeded": exception is None, "seconds": round(seconds, 6)}
+        if exception is not None:
+            outcome["error"] = "{}: {}".format(type(exception).__name__, exception)[:500]
+            exceptions.append(exception)
+            metrics.increment("event.receiver_failed", kind=kind)
+        outcomes[name] = outcome
+        responses.append((receiver, response))
+    return responses, exceptions
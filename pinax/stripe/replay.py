@@ -0,0 +1,146 @@
+import collections
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+
+import django
+from django.db import close_old_connections
+
+from .models import Event
+from .processing import process_locked
+
+
+def replay_chunk(pks):
+    """
+    Process a chunk of events, returning ``{kind: Counter}`` of outcomes.
+    """
+    results = collections.defaultdict(collections.Counter)
+    for pk in pks:
+        event, succeeded = process_locked(pk)
+        if event is None:
+            results[None]["skipped"] += 1
+        else:
+            results[event.kind]["processed" if succeeded else "failed"] += 1
+    return dict(results)
+
+
+def pooled_replay_chunk(pks):
+    try:
+        return replay_chunk(pks)
+    finally:
+        close_old_connections()
+
+
+class ReplayStats:
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.kinds = collections.defaultdict(collections.Counter)
+
+    def add(self, results):
+        for kind, counts in results.items():
+            self.kinds[kind].update(counts)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def total(self, outcome):
+        return sum(counts[outcome] for counts in self.kinds.values())
+
+    def lines(self):
+        elapsed = max(self.elapsed, 1e-9)
+        for kind in sorted(kind for kind in self.kinds if kind is not None):
+            counts = self.kinds[kind]
+            yield "{}: {} processed ({:.1f}/s), {} failed".format(
+                kind,
+                counts["processed"],
+                counts["processed"] / elapsed,
+                counts["failed"],
+            )
+
+
+class Replay:
+    """
+    Re-run handlers for unprocessed (including previously failed) events.
+
+    Event ids are streamed from the database and handed out in chunks to a
+    thread or process pool. Each event is locked while it is processed, so
+    several replays can safely run against the same table.
+    """
+
+    def __init__(self, kinds=None, since=None, until=None, livemode=None, account_id=None,
+                 chunk_size=500, workers=1, pool="thread"):
+        self.kinds = kinds
+        self.since = since
+        self.until = until
+        self.livemode = livemode
+        self.account_id = account_id
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.pool = pool
+
+    def queryset(self):
+        qs = Event.objects.filter(processed=False)
+        if self.kinds:
+            qs = qs.filter(kind__in=self.kinds)
+        if self.since is not None:
+            qs = qs.filter(created_at__gte=self.since)
+        if self.until is not None:
+            qs = qs.filter(created_at__lt=self.until)
+        if self.livemode is not None:
+            qs = qs.filter(livemode=self.livemode)
+        if self.account_id is not None:
+            qs = qs.filter(account_id=self.account_id)
+        return qs.order_by("created_at", "pk")
+
+    def chunks(self):
+        pks = self.queryset().values_list("pk", flat=True).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(itertools.islice(pks, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def executor(self):
+        if self.pool == "process":
+            # spawn rather than fork so that children never share the
+            # parent's database connections; django.setup() has to run before
+            # this module can be imported in the child
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup
+            )
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def run(self, progress=None):
+        stats = ReplayStats()
+
+        def collect(results):
+            stats.add(results)
+            if progress is not None:
+                progress(stats)
+
+        if self.workers <= 1:
+            for chunk in self.chunks():
+                collect(replay_chunk(chunk))
+            return stats
+
+        with self.executor() as executor:
+            pending = set()
+            for chunk in self.chunks():
+                pending.add(executor.submit(pooled_replay_chunk, chunk))
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            for future in pending:
+                collect(future.result())
+        return stats
@@ -0,0 +1,113 @@
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import blobs
+from .conf import settings
+from .models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
+
+
+def expired_events(now=None):
+    """
+    Processed events that are past the retention window for their kind.
+
+    Events already reduced to a stub are not included.
+    """
+    now = now or timezone.now()
+    by_kind = settings.PINAX_STRIPE_EVENT_RETENTION_DAYS_BY_KIND
+    default = settings.PINAX_STRIPE_EVENT_RETENTION_DAYS
+
+    expired = Q(pk__in=[])
+    for kind, days in by_kind.items():
+        if days is not None:
+            expired |= Q(kind=kind, created_at__lt=now - datetime.timedelta(days=days))
+    if default is not None:
+        expired |= Q(created_at__lt=now - datetime.timedelta(days=default)) & ~Q(kind__in=list(by_kind))
+
+    return Event.objects.filter(expired, processed=True).exclude(message={})
+
+
+def archive_record(event):
+    return {
+        "stripe_id": event.stripe_id,
+        "kind": event.kind,
+        "created_at": event.created_at,
+        "livemode": event.livemode,
+        "customer_id": event.customer_id,
+        "account_id": event.account_id,
+        "api_version": event.api_version,
+        "message": event.message,
+    }
+
+
+def prune_events(batch_size=1000, archive=None, keep_stub=False, now=None, pause=None):
+    """
+    Delete (or reduce to a stub) expired events in batches of ``batch_size``,
+    each in its own short transaction.
+
+    If ``archive`` is a text file object, every event is written to it as a
+    line of JSON before it is removed. With ``keep_stub`` the row itself is
+    kept, with an empty message, so that ``stripe_id`` still deduplicates
+    redeliveries. Payloads offloaded to the blob store are deleted from it
+    too. Returns the number of events pruned.
+    """
+    qs = expired_events(now=now).order_by("pk")
+    if archive is None:
+        qs = qs.only("pk", "blob_key")
+    last_pk = 0
+    pruned = 0
+    while True:
+        batch = list(qs.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        if archive is not None:
+            for event in batch:
+                archive.write(json.dumps(archive_record(event), cls=DjangoJSONEncoder))
+                archive.write("\n")
+            archive.flush()
+        pks = [event.pk for event in batch]
+        with transaction.atomic():
+            if keep_stub:
+                EventProcessingException.objects.filter(event_id__in=pks).delete()
+                Event.objects.filter(pk__in=pks).update(message={}, payload=None, blob_key="")
+            else:
+                Event.objects.filter(pk__in=pks).delete()
+        for event in batch:
+            if event.blob_key:
+                blobs.delete(event.blob_key)
+        pruned += len(pks)
+        if pause:
+            pause()
+    return pruned
+
+
+def prune_exceptions(batch_size=1000, now=None, pause=None):
+    """
+    Delete processing exceptions older than ``PINAX_STRIPE_EXCEPTION_RETENTION_DAYS``,
+    and the groups of exceptions not seen since.
+    """
+    days = settings.PINAX_STRIPE_EXCEPTION_RETENTION_DAYS
+    if days is None:
+        return 0
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    qs = EventProcessingException.objects.filter(created_at__lt=cutoff).order_by("pk").values_list("pk", flat=True)
+    pruned = 0
+    while True:
+        pks = list(qs[:batch_size])
+        if not pks:
+            break
+        EventProcessingException.objects.filter(pk__in=pks).delete()
+        pruned += len(pks)
+        if pause:
+            pause()
+    EventProcessingExceptionGroup.objects.filter(last_seen__lt=cutoff).delete()
+    return pruned
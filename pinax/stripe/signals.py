@@ -1,3 +1,38 @@
+from collections.abc import Mapping
+
 from .webhooks import registry
 
-WEBHOOK_SIGNALS = registry.signals()
+
+class WebhookSignals(Mapping):
+    """
+    Read-only mapping of event type to signal that only creates the signals
+    that are looked up.
+    """
+
+    def __getitem__(self, name):
+        signal = registry.get_signal(name)
+        if signal is None:
+            raise KeyError(name)
+        return signal
+
+    def __iter__(self):
+        return iter(list(registry.keys()))
+
+    def __len__(self):
+        return len(registry.keys())
+
+
+class WebhookBatchSignals(WebhookSignals):
+    """
+    Read-only mapping of event type to the signal sent for each batch of
+    events processed together.
+    """
+
+    def __getitem__(self, name):
+        if name not in registry.keys():
+            raise KeyError(name)
+        return registry.get_batch_signal(name)
+
+
+WEBHOOK_SIGNALS = WebhookSignals()
+WEBHOOK_BATCH_SIGNALS = WebhookBatchSignals()
@@ -0,0 +1,127 @@
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+
+from .conf import settings
+from .models import Event
+from .replay import ReplayStats, pooled_replay_chunk, replay_chunk
+
+
+class Checkpoint:
+    """
+    Remembers the last event id that was fully stored, in a JSON file, so an
+    interrupted sync can continue with ``starting_after``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        with open(self.path) as fp:
+            return json.load(fp).get("starting_after")
+
+    def save(self, starting_after):
+        if self.path is None:
+            return
+        tmp = "{}.tmp".format(self.path)
+        with open(tmp, "w") as fp:
+            json.dump({"starting_after": starting_after}, fp)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class EventSync:
+    """
+    Pull events from Stripe's Events list API and store the ones we do not
+    have yet, the same way the webhook view would.
+
+    Stripe lists events newest first, so every page is stored before any
+    event is dispatched, and the events are then dispatched oldest first.
+    The checkpoint follows the pages as they are stored; events stored by a
+    run that is interrupted before dispatching them are left unprocessed
+    for ``pinax_stripe_replay``.
+    """
+
+    def __init__(self, since=None, types=None, batch_size=100, workers=1, checkpoint=None, dispatch=True):
+        self.since = since
+        self.types = types
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint = Checkpoint(checkpoint)
+        self.dispatch = dispatch
+        self.seen = 0
+        self.inserted = 0
+        self.stats = ReplayStats()
+
+    def list_params(self):
+        params = {"limit": 100}
+        if self.since is not None:
+            params["created"] = {"gte": int(self.since.timestamp())}
+        if self.types:
+            params["types"] = self.types
+        starting_after = self.checkpoint.load()
+        if starting_after:
+            params["starting_after"] = starting_after
+        return params
+
+    def batches(self):
+        events = stripe.Event.list(**self.list_params()).auto_paging_iter()
+        while True:
+            batch = [event.to_dict_recursive() for event in itertools.islice(events, self.batch_size)]
+            if not batch:
+                return
+            yield batch
+
+    def insert(self, batch):
+        """
+        Store a batch of event payloads, returning the pks of the new rows in
+        Stripe ``created`` order.
+        """
+        stripe_ids = [data["id"] for data in batch]
+        existing = set(Event.objects.filter(stripe_id__in=stripe_ids).values_list("stripe_id", flat=True))
+        new = [data for data in batch if data["id"] not in existing]
+        events = [Event.objects.build(data) for data in new]
+        if settings.PINAX_STRIPE_EVENT_PARTITIONING:
+            # there is no unique stripe_id for ignore_conflicts to rely on
+            for event in events:
+                Event.objects.save_if_new(event)
+        else:
+            Event.objects.bulk_create(events, ignore_conflicts=True)
+        order = {data["id"]: (data["created"], index) for index, data in enumerate(reversed(new))}
+        rows = Event.objects.filter(stripe_id__in=list(order), processed=False).values_list("stripe_id", "pk")
+        return [pk for stripe_id, pk in sorted(rows, key=lambda row: order[row[0]])]
+
+    def process(self, pks):
+        if self.workers <= 1:
+            self.stats.add(replay_chunk(pks))
+            return
+        size = max(1, len(pks) // self.workers)
+        chunks = [pks[i:i + size] for i in range(0, len(pks), size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for results in executor.map(pooled_replay_chunk, chunks):
+                self.stats.add(results)
+
+    def run(self, progress=None):
+        stored = []
+        for batch in self.batches():
+            pks = self.insert(batch)
+            self.seen += len(batch)
+            self.inserted += len(pks)
+            stored.append(pks)
+            self.checkpoint.save(batch[-1]["id"])
+            if progress is not None:
+                progress(self)
+        # each batch is in created order and older than the one before it
+        pks = [pk for batch in reversed(stored) for pk in batch]
+        if self.dispatch and pks:
+            self.process(pks)
+        self.checkpoint.clear()
+        return self
@@ -1,3 +1,8 @@
+import hashlib
+import hmac
+import json
+import time
+
 TRANSFER_CREATED_TEST_DATA = {
     "created": 1348360173,
     "data": {
@@ -158,3 +163,28 @@ PLAN_CREATED_TEST_DATA = {
     "pending_webhooks": 1,
     "created": 1326853478
 }
+
+
+def signed(data, secret="foo", timestamp=None):
+    """
+    Request arguments for delivering ``data`` to the webhook view, signed the
+    way Stripe signs it.
+    """
+    body = data if isinstance(data, bytes) else json.dumps(data).encode("utf-8")
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode("utf-8"), b"%d." % timestamp + body, hashlib.sha256).hexdigest()
+    return {
+        "data": body,
+        "content_type": "application/json",
+        "HTTP_STRIPE_SIGNATURE": "t={},v1={}".format(timestamp, signature),
+    }
+
+
+def asgi_signed(data, secret="foo", timestamp=None):
+    """
+    ``signed`` for ``AsyncRequestFactory``, which takes headers by their
+    ASGI name rather than their ``META`` key.
+    """
+    kwargs = signed(data, secret=secret, timestamp=timestamp)
+    kwargs["stripe-signature"] = kwargs.pop("HTTP_STRIPE_SIGNATURE")
+    return kwargs
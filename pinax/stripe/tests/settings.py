@@ -9,6 +9,9 @@ DATABASES = {
         "USER": os.environ.get("PINAX_STRIPE_DATABASE_USER", ""),
     }
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # a file rather than memory, so that the concurrency tests can run
+    DATABASES["default"]["TEST"] = {"NAME": "test_pinax_stripe.sqlite3"}
 ROOT_URLCONF = "pinax.stripe.tests.urls"
 MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -0,0 +1,76 @@
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import stripe
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    # http.server only has one from Python 3.7 on
+    daemon_threads = True
+
+
+class StripeStub:
+    """
+    A local stand-in for the Stripe Events list endpoint.
+
+    ``events`` are payload dicts, newest first, as Stripe returns them.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.requests = []
+
+    def list_events(self, params):
+        self.requests.append(params)
+        events = self.events
+        if "created[gte]" in params:
+            events = [event for event in events if event["created"] >= int(params["created[gte]"])]
+        types = [value for key, value in params.items() if key.startswith("types[")]
+        if types:
+            events = [event for event in events if event["type"] in types]
+        if "starting_after" in params:
+            ids = [event["id"] for event in events]
+            events = events[ids.index(params["starting_after"]) + 1:]
+        limit = int(params.get("limit", 10))
+        return {
+            "object": "list",
+            "url": "/v1/events",
+            "has_more": len(events) > limit,
+            "data": events[:limit],
+        }
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/v1/events":
+                    status, body = 200, stub.list_events(dict(parse_qsl(url.query)))
+                else:
+                    status, body = 404, {"error": {"message": "Unknown path {}".format(url.path)}}
+                content = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        self.api_base = stripe.api_base
+        stripe.api_base = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        return self
+
+    def __exit__(self, *exc):
+        stripe.api_base = self.api_base
+        self.server.shutdown()
+        self.server.server_close()
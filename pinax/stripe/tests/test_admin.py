@@ -2,8 +2,16 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.test import RequestFactory, TestCase
 
-from ..admin import EventAdmin, EventProcessingExceptionAdmin
-from ..models import Event, EventProcessingException
+from ..admin import (
+    EventAdmin,
+    EventProcessingExceptionAdmin,
+    EventProcessingExceptionGroupAdmin
+)
+from ..models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
 
 
 class TestEventProcessingExceptionAdmin(TestCase):
@@ -79,3 +87,41 @@ class TestEventAdmin(TestCase):
             response.context_data["title"],
             "View event"
         )
+
+    def test_changelist_kind_filter(self):
+        request = self.factory.get("/admin/pinax_stripe/event/", {"kind": "invoice.paid"})
+        request.user = get_user_model().objects.create_user(
+            username="staff",
+            email="staff@staff.com",
+            is_staff=True,
+            is_superuser=True
+        )
+        Event.objects.create(kind="invoice.paid", message={}, stripe_id="evt_1")
+        Event.objects.create(kind="customer.deleted", message={}, stripe_id="evt_2")
+        instance = EventAdmin(Event, admin.site)
+        response = instance.changelist_view(request)
+        cl = response.context_data["cl"]
+        self.assertEqual(list(cl.result_list.values_list("stripe_id", flat=True)), ["evt_1"])
+        kinds = [choice["display"] for choice in cl.filter_specs[0].choices(cl)]
+        self.assertIn("invoice.paid", kinds)
+        self.assertIn("customer.deleted", kinds)
+
+
+class TestEventProcessingExceptionGroupAdmin(TestCase):
+
+    def test_no_add_permission(self):
+        instance = EventProcessingExceptionGroupAdmin(EventProcessingExceptionGroup, admin.site)
+        self.assertFalse(instance.has_add_permission(None))
+
+    def test_changelist(self):
+        request = RequestFactory().get("/admin/pinax_stripe/eventprocessingexceptiongroup/")
+        request.user = get_user_model().objects.create_user(
+            username="staff",
+            email="staff@staff.com",
+            is_staff=True,
+            is_superuser=True
+        )
+        EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"))
+        instance = EventProcessingExceptionGroupAdmin(EventProcessingExceptionGroup, admin.site)
+        response = instance.changelist_view(request)
+        self.assertEqual(list(response.context_data["cl"].result_list.values_list("message", flat=True)), ["boom"])
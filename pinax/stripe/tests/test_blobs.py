@@ -0,0 +1,166 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import blobs
+from ..models import Event
+from ..retention import prune_events
+from . import PLAN_CREATED_TEST_DATA
+
+FILE_SYSTEM = "pinax.stripe.blobs.FileSystemBlobStore"
+
+
+class FakeS3Client:
+    """
+    Stands in for a boto3 S3 client, keeping objects in memory.
+    """
+
+    class exceptions:
+
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Bucket, Key] = Body
+
+    def get_object(self, Bucket, Key):
+        try:
+            return {"Body": BytesIO(self.objects[Bucket, Key])}
+        except KeyError:
+            raise self.exceptions.NoSuchKey(Key)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+class BlobStoreTests(TestCase):
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+
+    def test_file_system(self):
+        store = blobs.FileSystemBlobStore(location=self.location)
+        key = blobs.key_for(b"hello")
+        store.put(key, b"hello")
+        self.assertTrue(os.path.exists(os.path.join(self.location, key[:2], key[2:4], key)))
+        self.assertEqual(store.get(key), b"hello")
+        store.put(key, b"hello")
+        store.delete(key)
+        with self.assertRaises(KeyError):
+            store.get(key)
+        store.delete(key)
+
+    def test_s3(self):
+        client = FakeS3Client()
+        store = blobs.S3BlobStore(bucket="stripe", prefix="events/", client=client)
+        store.put("abc", b"hello")
+        self.assertEqual(client.objects, {("stripe", "events/abc"): b"hello"})
+        self.assertEqual(store.get("abc"), b"hello")
+        store.delete("abc")
+        with self.assertRaises(KeyError):
+            store.get("abc")
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = blobs.BlobCache(max_size=2)
+        cache.add("a", b"1")
+        cache.add("b", b"2")
+        cache.get("a")
+        cache.add("c", b"3")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), b"1")
+        self.assertIsNone(cache.get("b"))
+
+
+class OffloadTests(TestCase):
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        overrides = override_settings(PINAX_STRIPE_BLOB_STORE=FILE_SYSTEM, PINAX_STRIPE_BLOB_LOCATION=self.location)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        old = timezone.now() - datetime.timedelta(days=40)
+        Event.objects.create(stripe_id="evt_old", kind="plan.created", message=PLAN_CREATED_TEST_DATA, created_at=old, processed=True)
+        Event.objects.create(stripe_id="evt_new", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+
+    def offload(self, *args):
+        out = StringIO()
+        call_command("pinax_stripe_offload_events", *args, stdout=out)
+        return out.getvalue()
+
+    def test_needs_store(self):
+        with override_settings(PINAX_STRIPE_BLOB_STORE=None):
+            with self.assertRaises(CommandError):
+                self.offload("--all")
+        with self.assertRaises(CommandError):
+            self.offload()
+
+    def test_offload_older_than(self):
+        self.assertIn("Offloaded 1 events.", self.offload("--older-than", "30"))
+        message, payload, key = Event.objects.values_list("message", "payload", "blob_key").get(stripe_id="evt_old")
+        self.assertIsNone(message)
+        self.assertIsNone(payload)
+        self.assertEqual(len(key), 64)
+        self.assertEqual(Event.objects.get(stripe_id="evt_new").blob_key, "")
+
+    def test_fetches_lazily(self):
+        self.offload("--all")
+        event = Event.objects.get(stripe_id="evt_old")
+        self.assertIsNone(event.__dict__["message"])
+        self.assertEqual(event.message, PLAN_CREATED_TEST_DATA)
+        event.processed = False
+        event.save()
+        self.assertEqual(Event.objects.values_list("message", "blob_key").get(pk=event.pk), (None, event.blob_key))
+
+        # served from the cache once read
+        blobs.get_store().delete(event.blob_key)
+        self.assertEqual(Event.objects.get(pk=event.pk).message, PLAN_CREATED_TEST_DATA)
+
+    def test_new_message_moves_back(self):
+        self.offload("--all")
+        event = Event.objects.get(stripe_id="evt_old")
+        event.message = {"id": "evt_old"}
+        event.save()
+        self.assertEqual(Event.objects.values_list("message", "blob_key").get(pk=event.pk), ({"id": "evt_old"}, ""))
+
+    def test_restore(self):
+        self.offload("--all")
+        keys = list(Event.objects.values_list("blob_key", flat=True))
+        self.assertIn("Restored 2 events.", self.offload("--restore"))
+        self.assertEqual(
+            list(Event.objects.values_list("message", "blob_key")),
+            [(PLAN_CREATED_TEST_DATA, ""), (PLAN_CREATED_TEST_DATA, "")]
+        )
+        for key in keys:
+            with self.assertRaises(KeyError):
+                blobs.get_store().get(key)
+
+    @override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION="pinax.stripe.compression.ZlibCodec")
+    def test_compressed(self):
+        Event.objects.create(stripe_id="evt_compressed", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        self.offload("--all")
+        event = Event.objects.get(stripe_id="evt_compressed")
+        self.assertEqual(blobs.get_store().get(event.blob_key)[:1], b"\x01")
+        self.assertEqual(event.message, PLAN_CREATED_TEST_DATA)
+        self.offload("--restore")
+        self.assertIsNotNone(Event.objects.get(stripe_id="evt_compressed").payload)
+
+    @override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS=30)
+    def test_prune_deletes_blobs(self):
+        self.offload("--all")
+        key = Event.objects.get(stripe_id="evt_old").blob_key
+        self.assertEqual(prune_events(keep_stub=True), 1)
+        self.assertEqual(Event.objects.values_list("message", "blob_key").get(stripe_id="evt_old"), ({}, ""))
+        with self.assertRaises(KeyError):
+            blobs.get_store().get(key)
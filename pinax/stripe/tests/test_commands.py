@@ -0,0 +1,92 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Event
+
+
+class BackfillCreatedCommandTests(TestCase):
+
+    def test_backfill(self):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+        Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message={"created": 1600000000})
+        Event.objects.create(stripe_id="evt_2", kind="invoice.paid", message={"created": 1600000001})
+        Event.objects.create(stripe_id="evt_3", kind="invoice.paid", message={})
+        Event.objects.create(stripe_id="evt_4", kind="invoice.paid", message={"created": 1}, stripe_created_at=created)
+        out = StringIO()
+        call_command("pinax_stripe_backfill_created", "--batch-size", "2", stdout=out)
+        self.assertIn("Scanned 3 events, set stripe_created_at on 2.", out.getvalue())
+        self.assertEqual(
+            dict(Event.objects.values_list("stripe_id", "stripe_created_at")),
+            {
+                "evt_1": datetime.datetime(2020, 9, 13, 12, 26, 40, tzinfo=datetime.timezone.utc),
+                "evt_2": datetime.datetime(2020, 9, 13, 12, 26, 41, tzinfo=datetime.timezone.utc),
+                "evt_3": None,
+                "evt_4": created,
+            }
+        )
+
+    def test_backfill_without_message(self):
+        Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message=None)
+        Event.objects.create(stripe_id="evt_2", kind="invoice.paid", message={"created": 1600000000})
+        out = StringIO()
+        call_command("pinax_stripe_backfill_created", stdout=out)
+        self.assertIn("Scanned 2 events, set stripe_created_at on 1.", out.getvalue())
+
+
+class BackfillCustomersCommandTests(TestCase):
+
+    def test_backfill(self):
+        Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message={
+            "type": "invoice.paid",
+            "data": {"object": {"id": "in_1", "customer": "cus_1"}}
+        })
+        Event.objects.create(stripe_id="evt_2", kind="customer.deleted", message={
+            "type": "customer.deleted",
+            "data": {"object": {"id": "cus_2"}}
+        })
+        Event.objects.create(stripe_id="evt_3", kind="plan.updated", message={
+            "type": "plan.updated",
+            "data": {"object": {"id": "gold"}}
+        })
+        out = StringIO()
+        call_command("pinax_stripe_backfill_customers", "--batch-size", "2", stdout=out)
+        self.assertIn("Scanned 3 events, set customer_id on 2.", out.getvalue())
+        self.assertEqual(
+            dict(Event.objects.values_list("stripe_id", "customer_id")),
+            {"evt_1": "cus_1", "evt_2": "cus_2", "evt_3": ""}
+        )
+
+    def test_backfill_without_message(self):
+        Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message=None)
+        Event.objects.create(stripe_id="evt_2", kind="invoice.paid", message={
+            "type": "invoice.paid",
+            "data": {"object": {"id": "in_2", "customer": "cus_2"}}
+        })
+        out = StringIO()
+        call_command("pinax_stripe_backfill_customers", stdout=out)
+        self.assertIn("Scanned 2 events, set customer_id on 1.", out.getvalue())
+
+
+class BackfillObjectsCommandTests(TestCase):
+
+    def test_backfill(self):
+        Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message={
+            "data": {"object": {"id": "in_1", "object": "invoice"}}
+        })
+        Event.objects.create(stripe_id="evt_2", kind="customer.deleted", message={
+            "data": {"object": {"id": "cus_2", "object": "customer"}}
+        })
+        Event.objects.create(stripe_id="evt_3", kind="ping", message={"data": {}})
+        Event.objects.create(stripe_id="evt_4", kind="plan.updated", message={})
+        # as stored before the columns were added
+        Event.objects.update(object_id="", object_type="")
+        out = StringIO()
+        call_command("pinax_stripe_backfill_objects", "--batch-size", "2", stdout=out)
+        self.assertIn("Scanned 3 events, set object_id on 2.", out.getvalue())
+        self.assertEqual(
+            {stripe_id: (object_id, object_type) for stripe_id, object_id, object_type in Event.objects.values_list("stripe_id", "object_id", "object_type")},
+            {"evt_1": ("in_1", "invoice"), "evt_2": ("cus_2", "customer"), "evt_3": ("", ""), "evt_4": ("", "")}
+        )
@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipIf
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from .. import compression
+from ..models import Event
+from ..payloads import parse
+from ..retention import prune_events
+from . import PLAN_CREATED_TEST_DATA
+
+ZLIB = "pinax.stripe.compression.ZlibCodec"
+ZSTD = "pinax.stripe.compression.ZstdCodec"
+
+
+class CodecTests(TestCase):
+
+    def setUp(self):
+        self.data = json.dumps(PLAN_CREATED_TEST_DATA).encode("utf-8")
+
+    def dictionary(self, codec_class):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec_class.train([self.data] * 20, 4096))
+        return path
+
+    def test_zlib(self):
+        codec = compression.ZlibCodec()
+        compressed = codec.compress(self.data)
+        self.assertLess(len(compressed), len(self.data))
+        self.assertEqual(codec.decompress(compressed), self.data)
+
+    def test_zlib_dictionary(self):
+        codec = compression.ZlibCodec(dictionary=self.dictionary(compression.ZlibCodec))
+        compressed = codec.compress(self.data)
+        self.assertLess(len(compressed), len(compression.ZlibCodec().compress(self.data)))
+        self.assertEqual(codec.decompress(compressed), self.data)
+
+    @skipIf(compression.zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        codec = compression.ZstdCodec(level=5)
+        self.assertEqual(codec.decompress(codec.compress(self.data)), self.data)
+
+    @override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB)
+    def test_compress_keeps_raw_text(self):
+        message = parse(b'{"id": "evt_1",  "type": "plan.created"}')
+        payload = compression.compress(message)
+        self.assertEqual(payload[:5], compression.ZlibCodec.tag + compression.NO_DICTIONARY)
+        decompressed = compression.decompress(payload)
+        self.assertEqual(decompressed, {"id": "evt_1", "type": "plan.created"})
+        self.assertEqual(decompressed.raw, '{"id": "evt_1",  "type": "plan.created"}')
+
+    def test_dictionary_id_in_header(self):
+        path = self.dictionary(compression.ZlibCodec)
+        codec = compression.ZlibCodec(dictionary=path)
+        payload = compression.compress({"id": "evt_1"}, codec)
+        with open(path, "rb") as f:
+            self.assertEqual(payload[1:5], compression.dictionary_id(f.read()))
+        with override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB):
+            with self.assertRaises(ValueError):
+                compression.decompress(payload)
+            with override_settings(PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES=[path]):
+                self.assertEqual(compression.decompress(payload), {"id": "evt_1"})
+
+    def test_decompress_with_other_codec(self):
+        with override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB):
+            payload = compression.compress({"id": "evt_1"})
+        with override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=None):
+            self.assertEqual(compression.decompress(payload), {"id": "evt_1"})
+
+
+@override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB)
+class CompressedEventTests(TestCase):
+
+    def test_save_compresses(self):
+        event = Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        message, payload = Event.objects.values_list("message", "payload").get(pk=event.pk)
+        self.assertIsNone(message)
+        self.assertIsNotNone(payload)
+        self.assertEqual(Event.objects.get(pk=event.pk).message, PLAN_CREATED_TEST_DATA)
+
+    def test_decompresses_lazily(self):
+        Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        event = Event.objects.get(stripe_id="evt_1")
+        self.assertIsNone(event.__dict__["message"])
+        self.assertEqual(event.message, PLAN_CREATED_TEST_DATA)
+        self.assertEqual(event.__dict__["message"], PLAN_CREATED_TEST_DATA)
+
+    def test_save_keeps_payload(self):
+        Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        event = Event.objects.get(stripe_id="evt_1")
+        payload = event.payload
+        event.message
+        event.processed = True
+        event.save()
+        self.assertIs(event.payload, payload)
+        event = Event.objects.get(stripe_id="evt_1")
+        self.assertTrue(event.processed)
+        self.assertEqual(event.message, PLAN_CREATED_TEST_DATA)
+
+    def test_read_without_setting(self):
+        Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        with override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=None):
+            self.assertEqual(Event.objects.get(stripe_id="evt_1").message, PLAN_CREATED_TEST_DATA)
+
+    @override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS=0)
+    def test_prune_keep_stub(self):
+        Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA, processed=True)
+        self.assertEqual(prune_events(keep_stub=True), 1)
+        self.assertEqual(Event.objects.values_list("message", "payload").get(), ({}, None))
+        self.assertEqual(prune_events(keep_stub=True), 0)
+
+    @override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS=0)
+    def test_prune_archive(self):
+        Event.objects.create(stripe_id="evt_1", kind="plan.created", message=PLAN_CREATED_TEST_DATA, processed=True)
+        archive = StringIO()
+        self.assertEqual(prune_events(archive=archive), 1)
+        self.assertEqual(json.loads(archive.getvalue())["message"], PLAN_CREATED_TEST_DATA)
+
+
+class CompressCommandTests(TestCase):
+
+    def setUp(self):
+        for index in range(3):
+            Event.objects.create(stripe_id="evt_{}".format(index), kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+        Event.objects.create(stripe_id="evt_stub", kind="plan.created", message={})
+
+    def test_needs_setting(self):
+        with self.assertRaises(CommandError):
+            call_command("pinax_stripe_compress_events", stdout=StringIO())
+
+    @override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB)
+    def test_compress_and_decompress(self):
+        out = StringIO()
+        call_command("pinax_stripe_compress_events", "--batch-size", "2", stdout=out)
+        self.assertIn("Compressed 3 events.", out.getvalue())
+        self.assertEqual(Event.objects.filter(message__isnull=True, payload__isnull=False).count(), 3)
+        self.assertEqual(Event.objects.get(stripe_id="evt_0").message, PLAN_CREATED_TEST_DATA)
+        self.assertEqual(Event.objects.values_list("message", flat=True).get(stripe_id="evt_stub"), {})
+
+        out = StringIO()
+        call_command("pinax_stripe_compress_events", "--decompress", stdout=out)
+        self.assertIn("Decompressed 3 events.", out.getvalue())
+        self.assertFalse(Event.objects.filter(payload__isnull=False).exists())
+        self.assertEqual(Event.objects.values_list("message", flat=True).get(stripe_id="evt_0"), PLAN_CREATED_TEST_DATA)
+
+    @override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB)
+    def test_train(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        call_command("pinax_stripe_compress_events", "--train", path, "--dictionary-size", "1024", stdout=out)
+        self.assertIn("trained from 3 events", out.getvalue())
+        with open(path, "rb") as f:
+            self.assertEqual(len(f.read()), 1024)
+        with override_settings(PINAX_STRIPE_PAYLOAD_DICTIONARY=path):
+            call_command("pinax_stripe_compress_events", stdout=StringIO())
+            self.assertEqual(Event.objects.get(stripe_id="evt_1").message, PLAN_CREATED_TEST_DATA)
+
+    @override_settings(PINAX_STRIPE_PAYLOAD_COMPRESSION=ZLIB)
+    def test_rotate_dictionary(self):
+        def train(path, data):
+            with open(path, "wb") as f:
+                f.write(compression.ZlibCodec.train([json.dumps(data).encode("utf-8")] * 20, 1024))
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        old, new = os.path.join(tmpdir, "old.dict"), os.path.join(tmpdir, "new.dict")
+        train(old, PLAN_CREATED_TEST_DATA)
+        train(new, dict(PLAN_CREATED_TEST_DATA, id="evt_other"))
+        with override_settings(PINAX_STRIPE_PAYLOAD_DICTIONARY=old):
+            call_command("pinax_stripe_compress_events", stdout=StringIO())
+
+        with override_settings(PINAX_STRIPE_PAYLOAD_DICTIONARY=new, PINAX_STRIPE_PAYLOAD_PREVIOUS_DICTIONARIES=[old]):
+            self.assertEqual(Event.objects.get(stripe_id="evt_0").message, PLAN_CREATED_TEST_DATA)
+            Event.objects.create(stripe_id="evt_new", kind="plan.created", message=PLAN_CREATED_TEST_DATA)
+            out = StringIO()
+            call_command("pinax_stripe_compress_events", "--recompress", "--batch-size", "2", stdout=out)
+            self.assertIn("Compressed 3 events.", out.getvalue())
+
+        with override_settings(PINAX_STRIPE_PAYLOAD_DICTIONARY=new):
+            for event in Event.objects.exclude(stripe_id="evt_stub"):
+                self.assertEqual(event.message, PLAN_CREATED_TEST_DATA)
+        with override_settings(PINAX_STRIPE_PAYLOAD_DICTIONARY=old):
+            with self.assertRaises(ValueError):
+                Event.objects.get(stripe_id="evt_0").message
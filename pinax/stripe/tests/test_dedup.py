@@ -0,0 +1,136 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..dedup import CacheSeenFilter, LocalSeenFilter, SeenStats, get_filter
+from ..models import Event
+from ..views import Webhook
+from . import PLAN_CREATED_TEST_DATA, signed
+
+
+class LocalSeenFilterTest(TestCase):
+
+    def test_add(self):
+        seen = LocalSeenFilter()
+        self.assertFalse(seen.seen("evt_1"))
+        seen.add("evt_1")
+        self.assertTrue(seen.seen("evt_1"))
+        self.assertEqual(seen.stats(), SeenStats(lookups=2, hits=1))
+        self.assertEqual(seen.stats().hit_rate, 0.5)
+
+    def test_evicts_least_recently_added(self):
+        seen = LocalSeenFilter(max_size=2)
+        self.assertTrue(seen.add("evt_1"))
+        seen.add("evt_2")
+        self.assertFalse(seen.add("evt_1"))
+        seen.add("evt_3")
+        self.assertEqual(len(seen), 2)
+        self.assertTrue(seen.contains("evt_1"))
+        self.assertFalse(seen.contains("evt_2"))
+        self.assertTrue(seen.contains("evt_3"))
+
+    @patch("pinax.stripe.dedup.time.monotonic")
+    def test_expires(self, MonotonicMock):
+        MonotonicMock.return_value = 1000
+        seen = LocalSeenFilter(timeout=60)
+        seen.add("evt_1")
+        MonotonicMock.return_value = 1059
+        self.assertTrue(seen.contains("evt_1"))
+        MonotonicMock.return_value = 1061
+        self.assertFalse(seen.contains("evt_1"))
+        self.assertEqual(len(seen), 0)
+
+    def test_reset_stats(self):
+        seen = LocalSeenFilter()
+        seen.seen("evt_1")
+        seen.reset_stats()
+        self.assertEqual(seen.stats(), SeenStats(0, 0))
+        self.assertEqual(seen.stats().hit_rate, 0.0)
+
+    def test_remember_on_commit(self):
+        seen = LocalSeenFilter()
+        with self.captureOnCommitCallbacks(execute=True):
+            seen.remember("evt_1")
+            self.assertFalse(seen.contains("evt_1"))
+        self.assertTrue(seen.contains("evt_1"))
+
+    def test_remember_rolled_back(self):
+        seen = LocalSeenFilter()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    seen.remember("evt_1")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(seen.contains("evt_1"))
+
+
+class CacheSeenFilterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_add(self):
+        seen = CacheSeenFilter()
+        self.assertFalse(seen.seen("evt_1"))
+        seen.add("evt_1")
+        self.assertTrue(seen.seen("evt_1"))
+        self.assertTrue(CacheSeenFilter().contains("evt_1"))
+        self.assertEqual(cache.get("pinax-stripe:seen:evt_1"), True)
+        self.assertEqual(seen.stats(), SeenStats(2, 1))
+
+    def test_timeout(self):
+        with patch.object(cache, "add") as AddMock:
+            CacheSeenFilter(timeout=60).add("evt_1")
+        AddMock.assert_called_once_with("pinax-stripe:seen:evt_1", True, 60)
+
+    def test_add_returns_whether_new(self):
+        seen = CacheSeenFilter()
+        self.assertTrue(seen.add("evt_1"))
+        self.assertFalse(seen.add("evt_1"))
+
+
+class SeenFilterViewTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def post(self):
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
+        return Webhook.as_view()(request)
+
+    def test_disabled(self):
+        self.assertIsNone(get_filter())
+
+    @override_settings(PINAX_STRIPE_SEEN_FILTER="pinax.stripe.dedup.LocalSeenFilter")
+    def test_duplicate_skips_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post().status_code, 200)
+        self.assertTrue(get_filter().contains(PLAN_CREATED_TEST_DATA["id"]))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(get_filter().stats(), SeenStats(2, 1))
+
+    @override_settings(PINAX_STRIPE_SEEN_FILTER="pinax.stripe.dedup.LocalSeenFilter")
+    def test_failed_insert_not_remembered(self):
+        with patch("pinax.stripe.models.EventManager.save_if_new", side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.post()
+        self.assertFalse(get_filter().contains(PLAN_CREATED_TEST_DATA["id"]))
+        # Stripe's retry is stored
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(Event.objects.count(), 1)
+
+    @override_settings(PINAX_STRIPE_SEEN_FILTER="pinax.stripe.dedup.LocalSeenFilter")
+    def test_miss_falls_back_to_database(self):
+        Event.objects.create(stripe_id=PLAN_CREATED_TEST_DATA["id"], message={})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertTrue(get_filter().contains(PLAN_CREATED_TEST_DATA["id"]))
@@ -0,0 +1,185 @@
+import socket
+import time
+from unittest.mock import patch
+
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+
+from .. import metrics
+from ..models import Event
+from ..views import Metrics, Webhook
+from ..webhooks import registry
+from . import PLAN_CREATED_TEST_DATA, signed
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        metrics.reset_sink("PINAX_STRIPE_METRICS_SINK")
+        self.addCleanup(metrics.reset_sink, "PINAX_STRIPE_METRICS_SINK")
+
+
+class MemorySinkTest(MetricsTestCase):
+
+    def test_increment(self):
+        sink = metrics.MemorySink()
+        sink.increment("event.processed", kind="invoice.paid")
+        sink.increment("event.processed", kind="invoice.paid", value=2)
+        self.assertEqual(sink.counters["event.processed", "invoice.paid"], 3)
+
+    def test_timer(self):
+        sink = metrics.MemorySink()
+        with sink.timer("event.handler", kind="invoice.paid"):
+            pass
+        histogram = sink.histograms["event.handler", "invoice.paid"]
+        self.assertEqual(histogram["count"], 1)
+        self.assertEqual(histogram["buckets"][0], 1)
+
+    def test_observe_buckets(self):
+        sink = metrics.MemorySink()
+        sink.observe("event.lag", 0.03)
+        sink.observe("event.lag", 10000)
+        histogram = sink.histograms["event.lag", None]
+        self.assertEqual(histogram["buckets"][metrics.BUCKETS.index(0.05)], 1)
+        self.assertEqual(histogram["buckets"][-1], 1)
+        self.assertEqual(histogram["sum"], 10000.03)
+
+    def test_reset(self):
+        sink = metrics.MemorySink()
+        sink.increment("event.processed")
+        sink.reset()
+        self.assertEqual(sink.counters, {})
+
+
+class PrometheusSinkTest(MetricsTestCase):
+
+    def test_render(self):
+        sink = metrics.PrometheusSink()
+        sink.increment("event.processed", kind="invoice.paid")
+        sink.increment("event.processed", kind="customer.created")
+        sink.observe("event.handler", 0.002, kind="invoice.paid")
+        lines = sink.render().splitlines()
+        self.assertEqual(lines.count("# TYPE pinax_stripe_event_processed_total counter"), 1)
+        self.assertIn('pinax_stripe_event_processed_total{kind="invoice.paid"} 1', lines)
+        self.assertIn('pinax_stripe_event_processed_total{kind="customer.created"} 1', lines)
+        self.assertIn("# TYPE pinax_stripe_event_handler_seconds histogram", lines)
+        self.assertIn('pinax_stripe_event_handler_seconds_bucket{kind="invoice.paid",le="0.001"} 0', lines)
+        self.assertIn('pinax_stripe_event_handler_seconds_bucket{kind="invoice.paid",le="0.005"} 1', lines)
+        self.assertIn('pinax_stripe_event_handler_seconds_bucket{kind="invoice.paid",le="+Inf"} 1', lines)
+        self.assertIn('pinax_stripe_event_handler_seconds_count{kind="invoice.paid"} 1', lines)
+
+    @override_settings(PINAX_STRIPE_METRICS_PREFIX="shop")
+    def test_render_prefix(self):
+        sink = metrics.PrometheusSink()
+        sink.increment("webhook.invalid")
+        self.assertIn("shop_webhook_invalid_total 1", sink.render().splitlines())
+
+
+class StatsdSinkTest(MetricsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.settimeout(1)
+        self.addCleanup(self.server.close)
+        self.sink = metrics.StatsdSink(self.server.getsockname())
+
+    def test_increment(self):
+        self.sink.increment("event.processed", kind="invoice.paid")
+        self.assertEqual(self.server.recv(1024), b"pinax_stripe.event.processed.invoice_paid:1|c")
+
+    def test_observe(self):
+        self.sink.observe("webhook.request", 0.0125)
+        self.assertEqual(self.server.recv(1024), b"pinax_stripe.webhook.request:12.500|ms")
+
+    def test_send_error_ignored(self):
+        with patch.object(self.sink, "socket") as mock_socket:
+            mock_socket.sendto.side_effect = OSError
+            self.sink.increment("event.processed")
+        self.assertTrue(mock_socket.sendto.called)
+
+
+class HelpersTest(MetricsTestCase):
+
+    def test_reset_on_setting_changed(self):
+        self.assertIsNone(metrics.get_sink())
+        with override_settings(PINAX_STRIPE_METRICS_SINK="pinax.stripe.metrics.MemorySink"):
+            self.assertIsInstance(metrics.get_sink(), metrics.MemorySink)
+        self.assertIsNone(metrics.get_sink())
+
+    def test_disabled(self):
+        self.assertIsNone(metrics.get_sink())
+        self.assertIs(metrics.timer("event.handler"), metrics.NULL_TIMER)
+        metrics.increment("event.processed")
+        metrics.observe("event.handler", 1)
+        metrics.observe_lag("event.lag", time.time())
+
+    @override_settings(PINAX_STRIPE_METRICS_SINK="pinax.stripe.metrics.MemorySink")
+    def test_enabled(self):
+        sink = metrics.get_sink()
+        self.assertIs(metrics.get_sink(), sink)
+        metrics.increment("event.processed", kind="invoice.paid")
+        with metrics.timer("event.handler", kind="invoice.paid"):
+            pass
+        metrics.observe_lag("event.lag", time.time() - 60)
+        metrics.observe_lag("event.lag", None)
+        self.assertEqual(sink.counters["event.processed", "invoice.paid"], 1)
+        self.assertEqual(sink.histograms["event.handler", "invoice.paid"]["count"], 1)
+        self.assertEqual(sink.histograms["event.lag", None]["count"], 1)
+        self.assertGreaterEqual(sink.histograms["event.lag", None]["sum"], 60)
+
+
+@override_settings(PINAX_STRIPE_METRICS_SINK="pinax.stripe.metrics.PrometheusSink")
+class InstrumentationTest(MetricsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.sink = metrics.get_sink()
+
+    def post(self, data):
+        request = self.factory.post("/webhook", **signed(data))
+        return Webhook.as_view()(request)
+
+    def test_webhook(self):
+        self.post(PLAN_CREATED_TEST_DATA)
+        self.post(PLAN_CREATED_TEST_DATA)
+        kind = PLAN_CREATED_TEST_DATA["type"]
+        self.assertEqual(self.sink.counters["event.received", kind], 1)
+        self.assertEqual(self.sink.counters["event.duplicate", kind], 1)
+        self.assertEqual(self.sink.counters["event.processed", kind], 1)
+        self.assertEqual(self.sink.histograms["webhook.request", None]["count"], 2)
+        self.assertEqual(self.sink.histograms["webhook.verify", None]["count"], 2)
+        self.assertEqual(self.sink.histograms["event.insert", kind]["count"], 2)
+        self.assertEqual(self.sink.histograms["event.handler", kind]["count"], 1)
+        self.assertEqual(self.sink.histograms["event.signal", kind]["count"], 1)
+        self.assertEqual(self.sink.histograms["event.delivery_lag", kind]["count"], 1)
+        self.assertEqual(self.sink.histograms["event.processing_lag", kind]["count"], 1)
+
+    def test_webhook_invalid(self):
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA, secret="bar"))
+        self.assertEqual(Webhook.as_view()(request).status_code, 400)
+        self.assertEqual(self.sink.counters["webhook.invalid", None], 1)
+
+    def test_handler_failure(self):
+        event = Event.objects.create(kind="account.application.deauthorized", message={})
+        WebhookClass = registry.get(event.kind)
+        with patch.object(WebhookClass, "process_webhook", side_effect=ValueError("boom")):
+            with self.assertRaises(ValueError):
+                WebhookClass(event).process()
+        self.assertEqual(self.sink.counters["event.failed", event.kind], 1)
+        self.assertEqual(self.sink.counters["event.processed", event.kind], 0)
+        self.assertEqual(self.sink.histograms["event.handler", event.kind]["count"], 1)
+
+    def test_metrics_view(self):
+        metrics.increment("event.processed", kind="invoice.paid")
+        response = Metrics.as_view()(self.factory.get("/metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b'pinax_stripe_event_processed_total{kind="invoice.paid"} 1', response.content)
+
+    @override_settings(PINAX_STRIPE_METRICS_SINK="pinax.stripe.metrics.MemorySink")
+    def test_metrics_view_not_prometheus(self):
+        with self.assertRaises(Http404):
+            Metrics.as_view()(self.factory.get("/metrics"))
@@ -1,7 +1,18 @@
-from django.test import TestCase
+import datetime
+
+from django.core.exceptions import FieldError
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
-from ..models import Event, EventProcessingException
+from ..apps import create_event_types
+from ..models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup,
+    EventType,
+    EventTypeManager
+)
 
 
 class ModelTests(TestCase):
@@ -26,3 +37,197 @@ class ModelTests(TestCase):
             repr(e),
             f"Event(pk=None, kind='customer.deleted', customer='{e.customer_id}', created_at={created_at_iso}, stripe_id='evt_X')"
         )
+
+    def test_event_create_if_new(self):
+        event = Event.objects.create_if_new(stripe_id="evt_X", kind="customer.deleted", message={})
+        self.assertIsNotNone(event.pk)
+        self.assertIsNone(Event.objects.create_if_new(stripe_id="evt_X", kind="customer.deleted", message={}))
+        self.assertEqual(Event.objects.filter(stripe_id="evt_X").count(), 1)
+
+    def test_event_save_if_new_other_integrity_error(self):
+        with self.assertRaises(IntegrityError):
+            Event.objects.save_if_new(Event(stripe_id="evt_X", kind="customer.deleted", message={}, api_version=None))
+        self.assertFalse(Event.objects.exists())
+
+    def test_event_kind_codes(self):
+        self.assertTrue(EventType.objects.filter(name="invoice.paid").exists())
+        event = Event.objects.create(stripe_id="evt_X", kind="made.up", message={})
+        code = EventType.objects.get(name="made.up").pk
+        self.assertEqual(Event.objects.filter(pk=event.pk).values_list("kind", flat=True).get(), "made.up")
+        self.assertEqual(Event.objects.get(pk=event.pk).kind, "made.up")
+        self.assertEqual(Event.objects.filter(kind="made.up").get(), event)
+        self.assertEqual(list(Event.objects.filter(kind__in=["made.up", "never.stored"])), [event])
+        self.assertFalse(Event.objects.filter(kind="never.stored").exists())
+        self.assertFalse(EventType.objects.filter(name="never.stored").exists())
+        Event.objects.filter(pk=event.pk).update(kind="invoice.paid")
+        self.assertEqual(Event.objects.get(kind="invoice.paid").pk, event.pk)
+        self.assertEqual(EventType.objects.code_for("made.up"), code)
+        self.assertEqual(EventType.objects.name_for(code), "made.up")
+
+    def test_event_kind_pattern_lookups(self):
+        paid = Event.objects.create(stripe_id="evt_1", kind="invoice.paid", message={})
+        created = Event.objects.create(stripe_id="evt_2", kind="invoice.created", message={})
+        Event.objects.create(stripe_id="evt_3", kind="charge.succeeded", message={})
+        self.assertEqual(set(Event.objects.filter(kind__startswith="invoice.")), {paid, created})
+        self.assertEqual(list(Event.objects.filter(kind__endswith=".paid")), [paid])
+        self.assertEqual(list(Event.objects.filter(kind__contains="created")), [created])
+        self.assertEqual(list(Event.objects.filter(kind__icontains="CREATED")), [created])
+        self.assertEqual(list(Event.objects.filter(kind__iexact="Invoice.Paid")), [paid])
+        self.assertEqual(list(Event.objects.exclude(kind__startswith="invoice.").values_list("stripe_id", flat=True)), ["evt_3"])
+        self.assertFalse(Event.objects.filter(kind__startswith="never.").exists())
+
+    def test_event_kind_comparison_lookups_raise(self):
+        for lookup in ["gt", "gte", "lt", "lte"]:
+            with self.assertRaises(FieldError):
+                list(Event.objects.filter(**{"kind__{}".format(lookup): "invoice.paid"}))
+        with self.assertRaises(FieldError):
+            list(Event.objects.filter(kind__range=("a", "b")))
+
+    def test_event_kind_codes_per_database(self):
+        code = EventType.objects.code_for("invoice.paid")
+        EventType.objects.remember("other", code + 1, "invoice.paid")
+        self.addCleanup(EventTypeManager.forget, "other")
+        self.assertEqual(EventType.objects.code_for("invoice.paid"), code)
+        self.assertEqual(EventType.objects.db_manager("other").code_for("invoice.paid"), code + 1)
+
+    def test_create_event_types_after_flush(self):
+        EventType.objects.all().delete()
+        # flush sends post_migrate without apps
+        create_event_types(sender=None, using="default")
+        self.assertTrue(EventType.objects.filter(name="invoice.paid").exists())
+        self.assertEqual(EventType.objects.code_for("invoice.paid"), EventType.objects.get(name="invoice.paid").pk)
+
+    def test_event_build(self):
+        event = Event.objects.build({
+            "id": "evt_1",
+            "type": "customer.updated",
+            "livemode": False,
+            "created": 1600000000,
+            "data": {"object": {"id": "cus_1", "object": "customer"}},
+        })
+        self.assertEqual(event.stripe_created_at, datetime.datetime(2020, 9, 13, 12, 26, 40, tzinfo=datetime.timezone.utc))
+        self.assertEqual((event.object_id, event.object_type), ("cus_1", "customer"))
+        event = Event.objects.build({"id": "evt_2", "type": "x", "livemode": False})
+        self.assertIsNone(event.stripe_created_at)
+        self.assertEqual((event.object_id, event.object_type), ("", ""))
+
+    def test_event_object_filled_on_save(self):
+        event = Event.objects.create(stripe_id="evt_1", message={"data": {"object": {"id": "sub_1", "object": "subscription"}}})
+        self.assertEqual(
+            Event.objects.values_list("object_id", "object_type").get(pk=event.pk),
+            ("sub_1", "subscription")
+        )
+        Event.objects.create(stripe_id="evt_2", message={})
+        self.assertEqual(Event.objects.get(stripe_id="evt_2").object_id, "")
+
+    def test_for_object(self):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+        for stripe_id, seconds, object_id in [("evt_1", 20, "sub_1"), ("evt_2", 10, "sub_1"), ("evt_3", 0, "sub_2")]:
+            Event.objects.create(
+                stripe_id=stripe_id,
+                stripe_created_at=created + datetime.timedelta(seconds=seconds),
+                message={"data": {"object": {"id": object_id, "object": "subscription"}}}
+            )
+        self.assertEqual(list(Event.objects.for_object("sub_1").values_list("stripe_id", flat=True)), ["evt_2", "evt_1"])
+        self.assertFalse(Event.objects.for_object("sub_3").exists())
+
+    def test_for_object_without_created(self):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+        for stripe_id, stripe_created_at in [("evt_1", created), ("evt_2", None), ("evt_3", None)]:
+            Event.objects.create(
+                stripe_id=stripe_id,
+                stripe_created_at=stripe_created_at,
+                message={"data": {"object": {"id": "sub_1", "object": "subscription"}}}
+            )
+        self.assertEqual(list(Event.objects.for_object("sub_1").values_list("stripe_id", flat=True)), ["evt_2", "evt_3", "evt_1"])
+
+    def test_event_superseded(self):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+
+        def event(stripe_id, seconds, object_id="sub_1", **kwargs):
+            return Event.objects.create(
+                stripe_id=stripe_id,
+                kind=kwargs.pop("kind", "customer.subscription.updated"),
+                stripe_created_at=created + datetime.timedelta(seconds=seconds),
+                message={"data": {"object": {"id": object_id}}},
+                **kwargs
+            )
+
+        late = event("evt_1", 0)
+        self.assertFalse(late.superseded())
+        event("evt_2", 10, processed=False)
+        event("evt_3", 10, object_id="sub_2", processed=True)
+        event("evt_4", 10, kind="customer.subscription.deleted", processed=True)
+        event("evt_5", 0, processed=True)
+        self.assertFalse(late.superseded())
+        event("evt_6", 5, processed=True)
+        self.assertTrue(late.superseded())
+        late.stripe_created_at = None
+        self.assertFalse(late.superseded())
+
+    def test_event_due(self):
+        now = timezone.now()
+        due = Event.objects.create(stripe_id="evt_1", message={}, next_attempt_at=now)
+        Event.objects.create(stripe_id="evt_2", message={}, next_attempt_at=now + datetime.timedelta(seconds=1))
+        Event.objects.create(stripe_id="evt_3", message={}, next_attempt_at=now, processed=True)
+        Event.objects.create(stripe_id="evt_4", message={}, next_attempt_at=now, dead_letter=True)
+        self.assertEqual(list(Event.objects.due(now)), [due])
+
+    @override_settings(PINAX_STRIPE_RETRY_MAX_ATTEMPTS=3, PINAX_STRIPE_RETRY_BASE_DELAY=60)
+    def test_event_record_failure(self):
+        now = timezone.now()
+        event = Event.objects.create(stripe_id="evt_1", message={}, attempts=2)
+        event.record_failure(now=now)
+        event.refresh_from_db()
+        self.assertFalse(event.dead_letter)
+        self.assertGreaterEqual(event.next_attempt_at, now + datetime.timedelta(seconds=60))
+        self.assertLessEqual(event.next_attempt_at, now + datetime.timedelta(seconds=120))
+
+        event.attempts = 3
+        event.record_failure(now=now)
+        event.refresh_from_db()
+        self.assertTrue(event.dead_letter)
+        self.assertEqual(event.attempts, 3)
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_EVENTS=2)
+    def test_exception_group_record(self):
+        events = [Event.objects.create(stripe_id="evt_{}".format(index), message={}) for index in range(3)]
+        first = timezone.now()
+        group_id, created = EventProcessingExceptionGroup.objects.record("abc", ValueError("x" * 600), event=events[0], now=first)
+        self.assertTrue(created)
+        group = EventProcessingExceptionGroup.objects.get(pk=group_id)
+        self.assertEqual(group.exception_type, "builtins.ValueError")
+        self.assertEqual(len(group.message), 500)
+        last = first + datetime.timedelta(minutes=1)
+        for event in [events[0], events[1], events[2], events[2]]:
+            self.assertEqual(
+                EventProcessingExceptionGroup.objects.record("abc", ValueError("later"), event=event, now=last),
+                (group_id, False)
+            )
+        self.assertEqual(EventProcessingExceptionGroup.objects.complete["abc"], group_id)
+        group.refresh_from_db()
+        self.assertEqual(group.count, 5)
+        self.assertEqual(group.message, "later")
+        self.assertEqual(group.first_seen, first)
+        self.assertEqual(group.last_seen, last)
+        self.assertEqual(group.sample_event_ids, ["evt_0", "evt_1"])
+        self.assertIn("builtins.ValueError: later (5)", str(group))
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_EVENTS=2)
+    def test_exception_group_record_queries(self):
+        events = [Event.objects.create(stripe_id="evt_{}".format(index), message={}) for index in range(3)]
+        group_id, _ = EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"), event=events[0])
+        # counted by a single UPDATE each, without locking the group first
+        with self.assertNumQueries(2):
+            EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"), event=events[1])
+        with self.assertNumQueries(1):
+            EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"), event=events[2])
+        self.assertEqual(EventProcessingExceptionGroup.objects.get(pk=group_id).count, 3)
+
+    def test_exception_group_record_deleted(self):
+        group_id, _ = EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"))
+        EventProcessingExceptionGroup.objects.complete["abc"] = group_id
+        EventProcessingExceptionGroup.objects.filter(pk=group_id).delete()
+        new_id, created = EventProcessingExceptionGroup.objects.record("abc", ValueError("boom"))
+        self.assertTrue(created)
+        self.assertNotIn("abc", EventProcessingExceptionGroup.objects.complete)
@@ -0,0 +1,155 @@
+import datetime
+from io import StringIO
+from unittest import skipUnless
+
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, models
+from django.db.migrations.state import ProjectState
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import partitions
+from ..migrations._operations import AddIndex
+from ..models import Event, EventKey, EventProcessingException
+
+NOW = datetime.datetime(2021, 11, 15, 12, tzinfo=datetime.timezone.utc)
+
+
+class PartitionHelperTests(TestCase):
+
+    def test_add_months(self):
+        start = partitions.month_start(NOW)
+        self.assertEqual(start, datetime.datetime(2021, 11, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partitions.add_months(start, 1), datetime.datetime(2021, 12, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partitions.add_months(start, 2), datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partitions.add_months(start, 14), datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc))
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name(Event, NOW), "pinax_stripe_event_p202111")
+
+    @override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS=30, PINAX_STRIPE_EVENT_RETENTION_DAYS_BY_KIND={"invoice.paid": 365})
+    def test_event_retention_days(self):
+        self.assertEqual(partitions.event_retention_days(), 365)
+        with override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS_BY_KIND={"invoice.paid": None}):
+            self.assertIsNone(partitions.event_retention_days())
+
+    @override_settings(PINAX_STRIPE_EVENT_PARTITIONING=True)
+    def test_save_if_new_uses_keys(self):
+        first = Event.objects.create_if_new(stripe_id="evt_1", kind="invoice.paid", message={})
+        self.assertIsNotNone(first)
+        self.assertTrue(EventKey.objects.filter(stripe_id="evt_1").exists())
+        self.assertIsNone(Event.objects.create_if_new(stripe_id="evt_1", kind="invoice.paid", message={}))
+        self.assertEqual(Event.objects.filter(stripe_id="evt_1").count(), 1)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite fallback")
+    def test_command_without_postgresql(self):
+        out = StringIO()
+        call_command("pinax_stripe_partition_events", "--setup", stdout=out)
+        self.assertIn("left unpartitioned", out.getvalue())
+        self.assertFalse(partitions.is_partitioned(Event))
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+@override_settings(
+    PINAX_STRIPE_EVENT_PARTITIONING=True,
+    PINAX_STRIPE_EVENT_RETENTION_DAYS=30,
+    PINAX_STRIPE_EXCEPTION_RETENTION_DAYS=30
+)
+class PostgresPartitionTests(TestCase):
+    # DDL is transactional in PostgreSQL, so every test leaves the tables as
+    # it found them
+
+    def setUp(self):
+        self.old = Event.objects.create(stripe_id="evt_old", kind="invoice.paid", message={}, processed=True, created_at=NOW)
+
+    def test_setup(self):
+        converted = partitions.setup(months_ahead=2, now=NOW)
+        self.assertEqual(converted, [Event, EventProcessingException])
+        self.assertTrue(partitions.is_partitioned(Event))
+        self.assertEqual(
+            [name for name, upper in partitions.partitions(Event)],
+            [
+                "pinax_stripe_event_default",
+                "pinax_stripe_event_legacy",
+                "pinax_stripe_event_p202112",
+                "pinax_stripe_event_p202201",
+            ]
+        )
+        self.assertTrue(EventKey.objects.filter(stripe_id="evt_old").exists())
+
+        event = Event.objects.create_if_new(stripe_id="evt_new", kind="invoice.paid", message={}, created_at=NOW + datetime.timedelta(days=30))
+        self.assertIsNotNone(event)
+        self.assertIsNone(Event.objects.create_if_new(stripe_id="evt_old", kind="invoice.paid", message={}))
+        self.assertGreater(event.pk, self.old.pk)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT stripe_id FROM pinax_stripe_event_p202112")
+            self.assertEqual(cursor.fetchall(), [("evt_new",)])
+        self.assertEqual(list(Event.objects.order_by("pk").values_list("stripe_id", flat=True)), ["evt_old", "evt_new"])
+        self.assertEqual(partitions.setup(now=NOW), [])
+
+    def test_create_partitions(self):
+        partitions.setup(months_ahead=0, now=NOW)
+        self.assertEqual(
+            partitions.create_partitions(months_ahead=1, now=NOW + datetime.timedelta(days=30)),
+            [
+                "pinax_stripe_event_p202112",
+                "pinax_stripe_event_p202201",
+                "pinax_stripe_eventprocessingexception_p202112",
+                "pinax_stripe_eventprocessingexception_p202201",
+            ]
+        )
+        self.assertEqual(partitions.create_partitions(months_ahead=1, now=NOW + datetime.timedelta(days=30)), [])
+
+    def test_expire_partitions(self):
+        EventProcessingException.objects.create(event=self.old, message="boom", traceback="", created_at=NOW)
+        partitions.setup(months_ahead=1, now=NOW)
+        later = NOW + datetime.timedelta(days=60)
+        self.assertEqual(partitions.expire_partitions(drop=True, now=later), [
+            "pinax_stripe_event_legacy",
+            "pinax_stripe_eventprocessingexception_legacy",
+        ])
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(EventProcessingException.objects.exists())
+        self.assertTrue(EventKey.objects.filter(stripe_id="evt_old").exists())
+
+    def test_expire_keeps_unprocessed(self):
+        Event.objects.filter(pk=self.old.pk).update(processed=False)
+        partitions.setup(months_ahead=1, now=NOW)
+        self.assertEqual(partitions.expire_partitions(now=NOW + datetime.timedelta(days=60)), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("pinax_stripe_partition_events", "--setup", "--months-ahead", "1", stdout=out)
+        self.assertIn("Partitioned pinax_stripe_event.", out.getvalue())
+        self.assertTrue(partitions.is_partitioned(EventProcessingException))
+        self.assertIn(partitions.partition_name(Event, partitions.add_months(partitions.month_start(timezone.now()), 1)), out.getvalue())
+
+    def test_add_index_on_partitioned_table(self):
+        # CREATE INDEX CONCURRENTLY is rejected on partitioned tables
+        partitions.setup(months_ahead=1, now=NOW)
+        operation = AddIndex(
+            model_name="event",
+            index=models.Index(fields=["kind", "created_at"], name="pinax_stripe_evt_test_idx"),
+        )
+        state = ProjectState.from_apps(apps)
+        new_state = state.clone()
+        operation.state_forwards("pinax_stripe", new_state)
+
+        def indexes():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT tablename FROM pg_indexes WHERE indexname = 'pinax_stripe_evt_test_idx'")
+                return cursor.fetchall()
+
+        with connection.schema_editor() as editor:
+            operation.database_forwards("pinax_stripe", editor, state, new_state)
+        self.assertEqual(indexes(), [("pinax_stripe_event",)])
+        with connection.schema_editor() as editor:
+            operation.database_backwards("pinax_stripe", editor, new_state, state)
+        self.assertEqual(indexes(), [])
+
+    @override_settings(PINAX_STRIPE_EVENT_PARTITIONING=False)
+    def test_command_needs_setting(self):
+        with self.assertRaises(CommandError):
+            call_command("pinax_stripe_partition_events", "--setup", stdout=StringIO())
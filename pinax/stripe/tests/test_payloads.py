@@ -0,0 +1,117 @@
+import json
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+import stripe
+
+from ..payloads import (
+    RawJSON,
+    RawJSONEncoder,
+    load_loads,
+    parse,
+    verify_signature
+)
+from . import signed
+
+
+class VerifySignatureTest(TestCase):
+
+    def setUp(self):
+        self.body = b'{"id": "evt_1"}'
+
+    def test_valid(self):
+        verify_signature(self.body, signed(self.body)["HTTP_STRIPE_SIGNATURE"], "foo")
+
+    def test_any_signature_matches(self):
+        header = signed(self.body)["HTTP_STRIPE_SIGNATURE"]
+        verify_signature(self.body, header.replace("v1=", "v1=0000,v1="), "foo")
+
+    def test_wrong_secret(self):
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            verify_signature(self.body, signed(self.body, secret="bar")["HTTP_STRIPE_SIGNATURE"], "foo")
+
+    def test_tampered_body(self):
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            verify_signature(b'{"id": "evt_2"}', signed(self.body)["HTTP_STRIPE_SIGNATURE"], "foo")
+
+    def test_malformed_header(self):
+        for header in ["", "foo", "t=abc,v1=00", "v1=00"]:
+            with self.assertRaises(stripe.error.SignatureVerificationError):
+                verify_signature(self.body, header, "foo")
+
+    def test_no_v1_signature(self):
+        header = signed(self.body)["HTTP_STRIPE_SIGNATURE"].replace("v1=", "v0=")
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            verify_signature(self.body, header, "foo")
+
+    def test_outside_tolerance(self):
+        header = signed(self.body, timestamp=time.time() - 600)["HTTP_STRIPE_SIGNATURE"]
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            verify_signature(self.body, header, "foo")
+        verify_signature(self.body, header, "foo", tolerance=None)
+
+    def test_invalid_utf8(self):
+        body = b'{"id": "\xff"}'
+        with self.assertRaises(ValueError):
+            verify_signature(body, signed(body)["HTTP_STRIPE_SIGNATURE"], "foo")
+
+
+class ParseTest(TestCase):
+
+    def test_parse(self):
+        data = parse(b'{"id": "evt_1", "amount": 1.50}')
+        self.assertEqual(data, {"id": "evt_1", "amount": 1.5})
+        self.assertEqual(data.raw, '{"id": "evt_1", "amount": 1.50}')
+
+    def test_parse_invalid(self):
+        for body in [b"not json", b"[1, 2]", b'"evt"', b'{"id": "\xff"}']:
+            with self.assertRaises(ValueError):
+                parse(body)
+
+    @override_settings(PINAX_STRIPE_JSON_LOADS="json.loads")
+    def test_loads_setting(self):
+        with patch("json.loads", wraps=json.loads) as loads:
+            load_loads.cache_clear()
+            self.addCleanup(load_loads.cache_clear)
+            self.assertEqual(parse(b'{"id": "evt_1"}'), {"id": "evt_1"})
+        self.assertTrue(loads.called)
+
+    def test_default_loads(self):
+        try:
+            import orjson
+        except ImportError:
+            self.assertIs(load_loads(None), json.loads)
+        else:
+            self.assertIs(load_loads(None), orjson.loads)
+
+
+class RawJSONEncoderTest(TestCase):
+
+    def test_raw(self):
+        self.assertEqual(json.dumps(RawJSON({"a": 1}, raw='{"a":  1}'), cls=RawJSONEncoder), '{"a":  1}')
+
+    def test_changed(self):
+        data = RawJSON({"a": 1, "b": {"c": 2}}, raw='{"a":  1, "b": {"c": 2}}')
+        data["a"] = 2
+        self.assertEqual(json.loads(json.dumps(data, cls=RawJSONEncoder)), {"a": 2, "b": {"c": 2}})
+        for change in [
+            lambda data: data.pop("a"),
+            lambda data: data.update(d=3),
+            lambda data: data.setdefault("d", 3),
+            lambda data: data.__delitem__("a"),
+            lambda data: data.clear(),
+            lambda data: data.popitem(),
+        ]:
+            data = RawJSON({"a": 1}, raw='{"a":  1}')
+            change(data)
+            self.assertEqual(json.loads(json.dumps(data, cls=RawJSONEncoder)), data)
+
+    def test_unchanged_setdefault(self):
+        data = RawJSON({"a": 1}, raw='{"a":  1}')
+        data.setdefault("a", 2)
+        self.assertEqual(json.dumps(data, cls=RawJSONEncoder), '{"a":  1}')
+
+    def test_plain(self):
+        self.assertEqual(json.dumps({"a": 1}, cls=RawJSONEncoder), '{"a": 1}')
@@ -0,0 +1,504 @@
+import datetime
+import random
+import threading
+import time
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from .. import metrics
+from ..models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
+from ..processing import (
+    BatchWorker,
+    DatabaseBackend,
+    InlineBackend,
+    OrderedWorker,
+    ThreadPoolBackend,
+    Worker,
+    coalesce,
+    get_backend,
+    process_batch_locked,
+    process_event
+)
+from ..views import Webhook
+from ..webhooks import registry
+from . import PLAN_CREATED_TEST_DATA, signed
+
+
+class BackendTests(TestCase):
+
+    def test_inline_backend(self):
+        webhook = Mock()
+        InlineBackend().enqueue(webhook)
+        self.assertTrue(webhook.process.called)
+
+    def test_inline_backend_swallows_errors(self):
+        webhook = Mock()
+        webhook.process.side_effect = Exception("boom")
+        InlineBackend().enqueue(webhook)
+        self.assertTrue(webhook.process.called)
+
+    def test_database_backend(self):
+        webhook = Mock()
+        DatabaseBackend().enqueue(webhook)
+        self.assertFalse(webhook.process.called)
+
+    def test_thread_pool_backend_waits_for_commit(self):
+        webhook = Mock()
+        backend = ThreadPoolBackend(max_workers=1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            backend.enqueue(webhook)
+            self.assertFalse(webhook.process.called)
+        for callback in callbacks:
+            callback()
+        backend.executor.shutdown(wait=True)
+        self.assertTrue(webhook.process.called)
+
+    def test_thread_pool_backend_swallows_errors(self):
+        webhook = Mock()
+        webhook.process.side_effect = Exception("boom")
+        ThreadPoolBackend(max_workers=1).run(webhook)
+        self.assertTrue(webhook.process.called)
+
+    @override_settings(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+    def test_get_backend(self):
+        self.assertIsInstance(get_backend(), DatabaseBackend)
+        self.assertIs(get_backend(), get_backend())
+
+    def test_get_backend_default(self):
+        self.assertIsInstance(get_backend(), InlineBackend)
+
+
+class DeferredWebhookViewTest(TestCase):
+
+    @override_settings(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_send_webhook_deferred(self, ProcessWebhookMock):
+        request = RequestFactory().post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
+        response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        event = Event.objects.get(stripe_id=PLAN_CREATED_TEST_DATA["id"])
+        self.assertFalse(event.processed)
+        self.assertFalse(ProcessWebhookMock.called)
+
+        Worker().drain()
+        event.refresh_from_db()
+        self.assertTrue(event.processed)
+        self.assertTrue(ProcessWebhookMock.called)
+
+
+@override_settings(
+    PINAX_STRIPE_COALESCE_WINDOW=30,
+    PINAX_STRIPE_LATEST_WINS_KINDS=["customer.updated"],
+    PINAX_STRIPE_METRICS_SINK="pinax.stripe.metrics.MemorySink"
+)
+class CoalesceTests(TestCase):
+
+    def setUp(self):
+        metrics.reset_sink("PINAX_STRIPE_METRICS_SINK")
+        self.addCleanup(metrics.reset_sink, "PINAX_STRIPE_METRICS_SINK")
+        self.created = timezone.now() - datetime.timedelta(minutes=1)
+        # a burst delivered out of order
+        for seconds in [3, 1, 4, 2]:
+            self.event("evt_cus_1_{}".format(seconds), "cus_1", seconds)
+        self.event("evt_cus_2_1", "cus_2", 1)
+        self.event("evt_sub_1_1", "cus_1", 1, kind="customer.subscription.updated")
+        self.event("evt_sub_1_2", "cus_1", 2, kind="customer.subscription.updated")
+
+    def event(self, stripe_id, object_id, seconds, kind="customer.updated"):
+        return Event.objects.create(
+            stripe_id=stripe_id,
+            kind=kind,
+            stripe_created_at=self.created + datetime.timedelta(seconds=seconds),
+            message={"data": {"object": {"id": object_id}}}
+        )
+
+    def test_coalesce(self):
+        event = Event.objects.get(stripe_id="evt_cus_1_2")
+        newest, older = coalesce(event)
+        self.assertEqual(newest.stripe_id, "evt_cus_1_4")
+        self.assertEqual([e.stripe_id for e in older], ["evt_cus_1_1", "evt_cus_1_2", "evt_cus_1_3"])
+        event = Event(kind="customer.updated", message={})
+        self.assertEqual(coalesce(event), (event, []))
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook", autospec=True)
+    def test_drain(self, ProcessWebhookMock):
+        runs = []
+        ProcessWebhookMock.side_effect = lambda webhook: runs.append(
+            (webhook.event.stripe_id, [event.stripe_id for event in webhook.coalesced])
+        )
+        self.assertEqual(Worker().drain(), (4, 0))
+        self.assertEqual(sorted(runs), [
+            ("evt_cus_1_4", ["evt_cus_1_1", "evt_cus_1_2", "evt_cus_1_3"]),
+            ("evt_cus_2_1", []),
+            ("evt_sub_1_1", []),
+            ("evt_sub_1_2", []),
+        ])
+        self.assertFalse(Event.objects.filter(processed=False).exists())
+        self.assertEqual(metrics.get_sink().counters["event.coalesced", "customer.updated"], 3)
+        self.assertEqual(metrics.get_sink().counters["event.processed", "customer.updated"], 2)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_drain_failure(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        Event.objects.exclude(stripe_id__startswith="evt_cus_1").delete()
+        self.assertEqual(Worker().drain(), (0, 1))
+        newest = Event.objects.get(stripe_id="evt_cus_1_4")
+        self.assertEqual(newest.attempts, 1)
+        self.assertEqual(
+            set(Event.objects.filter(processed=False).values_list("next_attempt_at", flat=True)),
+            {newest.next_attempt_at}
+        )
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_newest_superseded(self, ProcessWebhookMock):
+        Event.objects.filter(stripe_id="evt_cus_1_4").update(processed=True)
+        Worker().drain()
+        self.assertFalse(Event.objects.filter(processed=False).exists())
+        self.assertEqual(metrics.get_sink().counters["event.superseded", "customer.updated"], 1)
+        self.assertEqual(metrics.get_sink().counters["event.coalesced", "customer.updated"], 2)
+
+    @override_settings(PINAX_STRIPE_COALESCE_WINDOW=None)
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_disabled(self, ProcessWebhookMock):
+        self.assertEqual(Worker().drain(), (7, 0))
+
+    @override_settings(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+    def test_view_waits_for_window(self):
+        data = dict(PLAN_CREATED_TEST_DATA, id="evt_window")
+        with override_settings(PINAX_STRIPE_LATEST_WINS_KINDS=[data["type"]]):
+            Webhook.as_view()(RequestFactory().post("/webhook", **signed(data)))
+        event = Event.objects.get(stripe_id="evt_window")
+        self.assertGreater(event.next_attempt_at, timezone.now() + datetime.timedelta(seconds=25))
+        Webhook.as_view()(RequestFactory().post("/webhook", **signed(PLAN_CREATED_TEST_DATA)))
+        self.assertTrue(Event.objects.due().filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).exists())
+
+
+class WebhookViewRetryTest(TestCase):
+
+    def post(self):
+        request = RequestFactory().post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
+        return Webhook.as_view()(request)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_failure_is_stored_and_acknowledged(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        self.assertEqual(self.post().status_code, 200)
+        event = Event.objects.get(stripe_id=PLAN_CREATED_TEST_DATA["id"])
+        self.assertFalse(event.processed)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertTrue(EventProcessingException.objects.filter(event=event).exists())
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_worker_waits_while_processed_inline(self, ProcessWebhookMock):
+        with patch("pinax.stripe.processing.InlineBackend.enqueue"):
+            self.post()
+        self.assertFalse(Event.objects.due().exists())
+
+    @override_settings(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+    def test_deferred_is_due(self):
+        self.post()
+        self.assertTrue(Event.objects.due().filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).exists())
+
+
+class WorkerTests(TestCase):
+
+    def setUp(self):
+        self.first = Event.objects.create(stripe_id="evt_1", kind="plan.updated", message={})
+        self.second = Event.objects.create(stripe_id="evt_2", kind="plan.created", message={})
+        Event.objects.create(stripe_id="evt_3", kind="plan.deleted", message={}, processed=True)
+        Event.objects.create(stripe_id="evt_4", kind="not.a.webhook", message={})
+
+    def test_process_event_unknown_kind(self):
+        self.assertIsNone(process_event(Event(kind="not.a.webhook")))
+
+    def test_drain(self):
+        self.assertEqual(Worker(batch_size=1).drain(), (2, 0))
+        self.assertEqual(Event.objects.filter(processed=False).count(), 1)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_drain_remembers_failures(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        worker = Worker()
+        self.assertEqual(worker.drain(), (0, 2))
+        self.assertEqual(worker.failed, {self.first.pk, self.second.pk})
+        self.assertEqual(worker.drain(), (0, 0))
+        self.assertEqual(EventProcessingException.objects.count(), 2)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_same_worker_retries_once_due(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        worker = Worker()
+        self.assertEqual(worker.drain(), (0, 2))
+        ProcessWebhookMock.side_effect = None
+        later = timezone.now() + datetime.timedelta(days=1)
+        with patch("pinax.stripe.models.timezone.now", return_value=later):
+            self.assertEqual(worker.drain(), (2, 0))
+        self.assertEqual(worker.failed, set())
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_drain_retries_with_backoff(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        self.assertEqual(Worker().drain(), (0, 2))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.attempts, 1)
+        self.assertGreater(self.first.next_attempt_at, timezone.now())
+        self.assertEqual(Worker().drain(), (0, 0))
+
+        ProcessWebhookMock.side_effect = None
+        later = timezone.now() + datetime.timedelta(days=1)
+        with patch("pinax.stripe.models.timezone.now", return_value=later):
+            self.assertEqual(Worker().drain(), (2, 0))
+        self.first.refresh_from_db()
+        self.assertTrue(self.first.processed)
+        self.assertEqual(self.first.attempts, 2)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_drain_records_database_errors(self, ProcessWebhookMock):
+        # the handler breaks the transaction the worker processes it in
+        ProcessWebhookMock.side_effect = lambda: Event.objects.create(stripe_id="evt_3", message={})
+        self.assertEqual(Worker().drain(), (0, 2))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.attempts, 1)
+        self.assertGreater(self.first.next_attempt_at, timezone.now())
+        # both failures are counted, only the first of the group is stored
+        self.assertEqual(EventProcessingExceptionGroup.objects.get().count, 2)
+        self.assertEqual(EventProcessingException.objects.filter(message__icontains="unique").count(), 1)
+
+    def test_drain_records_receiver_database_errors(self):
+        def receiver(sender, event, **kwargs):
+            Event.objects.create(stripe_id="evt_3", message={})
+
+        signal = registry.get_signal("plan.updated")
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        self.assertEqual(Worker().drain(), (1, 1))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.attempts, 1)
+        self.assertFalse(self.first.processed)
+        self.assertEqual(EventProcessingException.objects.get().event, self.first)
+
+    @override_settings(PINAX_STRIPE_RETRY_MAX_ATTEMPTS=1)
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_drain_dead_letters(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        self.assertEqual(Worker().drain(), (0, 2))
+        self.assertEqual(Event.objects.filter(dead_letter=True).count(), 2)
+        later = timezone.now() + datetime.timedelta(days=1)
+        with patch("pinax.stripe.models.timezone.now", return_value=later):
+            self.assertEqual(Worker().drain(), (0, 0))
+
+    def test_command(self):
+        out = StringIO()
+        call_command("pinax_stripe_process_events", stdout=out)
+        self.assertIn("Processed 2 events, 0 failed.", out.getvalue())
+        self.assertFalse(Event.objects.filter(kind="plan.updated", processed=False).exists())
+
+
+class BatchWorkerTests(TestCase):
+
+    def setUp(self):
+        for index in range(5):
+            Event.objects.create(stripe_id="evt_paid_{}".format(index), kind="invoice.paid", message={})
+        for index in range(3):
+            Event.objects.create(stripe_id="evt_created_{}".format(index), kind="invoice.created", message={})
+        Event.objects.create(stripe_id="evt_done", kind="invoice.paid", message={}, processed=True)
+        Event.objects.create(stripe_id="evt_later", kind="invoice.paid", message={}, next_attempt_at=timezone.now() + datetime.timedelta(hours=1))
+
+    @patch("pinax.stripe.webhooks.Webhook.process_batch")
+    def test_drain(self, ProcessBatchMock):
+        batches = []
+        ProcessBatchMock.side_effect = lambda events: batches.append([event.stripe_id for event in events])
+        self.assertEqual(BatchWorker(batch_size=4).drain(), (8, 0))
+        self.assertEqual(sorted(batches), [
+            ["evt_created_0", "evt_created_1", "evt_created_2"],
+            ["evt_paid_0", "evt_paid_1", "evt_paid_2", "evt_paid_3"],
+            ["evt_paid_4"],
+        ])
+
+    @patch("pinax.stripe.webhooks.Webhook.process_batch")
+    def test_drain_failures(self, ProcessBatchMock):
+        ProcessBatchMock.side_effect = lambda events: {event: ValueError("boom") for event in events if event.stripe_id.endswith("_1")}
+        worker = BatchWorker()
+        self.assertEqual(worker.drain(), (6, 2))
+        self.assertEqual(
+            set(Event.objects.filter(pk__in=worker.failed).values_list("stripe_id", flat=True)),
+            {"evt_paid_1", "evt_created_1"}
+        )
+        self.assertEqual(worker.drain(), (0, 0))
+
+    def test_process_batch_locked_skips_not_due(self):
+        pks = list(Event.objects.filter(kind="invoice.paid").values_list("pk", flat=True))
+        results = process_batch_locked(pks)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(process_batch_locked(pks), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("pinax_stripe_process_events", "--batch", stdout=out)
+        self.assertIn("Processed 8 events, 0 failed.", out.getvalue())
+
+
+class OrderedWorkerTests(TestCase):
+
+    def setUp(self):
+        self.random = random.Random(15)
+        self.expected = {}
+        events = []
+        for index in range(5):
+            object_id = "sub_{}".format(index)
+            created = [1600000000 + self.random.randrange(1000) for _ in range(8)]
+            self.expected[object_id] = []
+            for position, stamp in enumerate(sorted(created)):
+                stripe_id = "evt_{}_{}".format(index, position)
+                self.expected[object_id].append(stripe_id)
+                events.append(Event(
+                    stripe_id=stripe_id,
+                    kind="customer.subscription.updated",
+                    message={"created": stamp, "data": {"object": {"id": object_id}}}
+                ))
+        # delivered in any order
+        self.random.shuffle(events)
+        Event.objects.bulk_create(events)
+        self.order = {pk: stripe_id for pk, stripe_id in Event.objects.values_list("pk", "stripe_id")}
+        self.objects = {pk: stripe_id.rsplit("_", 1)[0].replace("evt", "sub") for pk, stripe_id in self.order.items()}
+
+    def seen(self, calls):
+        seen = {}
+        for pk in calls:
+            seen.setdefault(self.objects[pk], []).append(self.order[pk])
+        return seen
+
+    def test_partitions(self):
+        worker = OrderedWorker()
+        partitions = worker.partitions([
+            (1, "sub_1", None, 30, "cus_1", ""),
+            (2, "", None, 10, "cus_1", ""),
+            (3, "sub_1", datetime.datetime.fromtimestamp(20, tz=datetime.timezone.utc), 40, "cus_1", ""),
+            (4, "", None, 5, "", "acct_1"),
+            (5, "", None, None, "", ""),
+            (6, "", None, 20, "cus_1", ""),
+        ])
+        self.assertEqual(partitions, [
+            [("sub_1", 3), ("sub_1", 1)],
+            [("cus_1", 2), ("cus_1", 6)],
+            [("acct_1", 4)],
+            [(5, 5)],
+        ])
+
+    def test_drain_in_created_order(self):
+        calls = []
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook", autospec=True) as ProcessWebhookMock:
+            ProcessWebhookMock.side_effect = lambda webhook: calls.append(webhook.event.pk)
+            self.assertEqual(OrderedWorker(batch_size=7, max_workers=1).drain(), (40, 0))
+        self.assertEqual(self.seen(calls), self.expected)
+
+    @patch("pinax.stripe.processing.process_locked")
+    def test_drain_threads(self, ProcessLockedMock):
+        calls = []
+        running = {}
+        overlapped = threading.Event()
+        lock = threading.Lock()
+
+        def process(pk, due=False):
+            with lock:
+                self.assertNotIn(self.objects[pk], running, "two events for one object at once")
+                running[self.objects[pk]] = pk
+                if len(running) > 1:
+                    overlapped.set()
+            time.sleep(self.random.random() / 1000)
+            with lock:
+                calls.append(pk)
+                del running[self.objects[pk]]
+            return Mock(), True
+
+        ProcessLockedMock.side_effect = process
+        worker = OrderedWorker(batch_size=40, max_workers=4)
+        self.assertEqual(worker.run_batch(), [True] * 40)
+        self.assertEqual(self.seen(calls), self.expected)
+        self.assertTrue(overlapped.is_set())
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook", autospec=True)
+    def test_failure_holds_back_later_events(self, ProcessWebhookMock):
+        failing = self.expected["sub_2"][3]
+        calls = []
+
+        def process(webhook):
+            calls.append(webhook.event.pk)
+            if webhook.event.stripe_id == failing:
+                raise Exception("boom")
+
+        ProcessWebhookMock.side_effect = process
+        worker = OrderedWorker(batch_size=10, max_workers=1)
+        self.assertEqual(worker.drain(), (35, 1))
+        self.assertEqual(self.seen(calls)["sub_2"], self.expected["sub_2"][:4])
+        self.assertEqual(worker.blocked, {"sub_2"})
+        self.assertEqual(
+            set(Event.objects.filter(processed=False).values_list("stripe_id", flat=True)),
+            set(self.expected["sub_2"][3:])
+        )
+
+    def test_waits_for_older_event_in_backoff(self):
+        for pk, stamp in Event.objects.values_list("pk", "message__created"):
+            Event.objects.filter(pk=pk).update(
+                stripe_created_at=datetime.datetime.fromtimestamp(stamp, tz=datetime.timezone.utc)
+            )
+        # failed in an earlier run and not due again yet
+        oldest = self.expected["sub_1"][0]
+        Event.objects.filter(stripe_id=oldest).update(attempts=1, next_attempt_at=timezone.now() + datetime.timedelta(minutes=5))
+        calls = []
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook", autospec=True) as ProcessWebhookMock:
+            ProcessWebhookMock.side_effect = lambda webhook: calls.append(webhook.event.pk)
+            self.assertEqual(OrderedWorker(batch_size=7, max_workers=1).drain(), (32, 0))
+            self.assertNotIn("sub_1", self.seen(calls))
+            self.assertEqual(Event.objects.filter(processed=False).count(), 8)
+
+            Event.objects.filter(stripe_id=oldest).update(next_attempt_at=timezone.now())
+            self.assertEqual(OrderedWorker(batch_size=7, max_workers=1).drain(), (8, 0))
+        self.assertEqual(self.seen(calls), self.expected)
+
+    def test_dead_letter_does_not_hold_back(self):
+        Event.objects.filter(stripe_id=self.expected["sub_1"][0]).update(
+            dead_letter=True,
+            stripe_created_at=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        Event.objects.filter(stripe_id=self.expected["sub_1"][1]).update(
+            stripe_created_at=datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        self.assertEqual(OrderedWorker(batch_size=40, max_workers=1).drain(), (39, 0))
+
+    def test_unhandled_type_does_not_hold_back(self):
+        Event.objects.create(
+            stripe_id="evt_unhandled",
+            kind="not.a.webhook",
+            message={"data": {"object": {"id": "sub_1", "object": "subscription"}}},
+            stripe_created_at=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        Event.objects.exclude(stripe_id="evt_unhandled").update(
+            stripe_created_at=datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        self.assertEqual(OrderedWorker(batch_size=40, max_workers=1).drain(), (40, 0))
+        self.assertEqual(list(Event.objects.filter(processed=False).values_list("stripe_id", flat=True)), ["evt_unhandled"])
+
+    @patch("pinax.stripe.processing.process_locked")
+    def test_locked_event_stops_partition(self, ProcessLockedMock):
+        locked = Event.objects.get(stripe_id=self.expected["sub_0"][0]).pk
+        ProcessLockedMock.side_effect = lambda pk, due: (None, False) if pk == locked else (Mock(), True)
+        results = OrderedWorker(batch_size=40, max_workers=1).run_batch()
+        self.assertEqual(results.count(None), 1)
+        self.assertEqual(results.count(True), 32)
+        attempted = [call[0][0] for call in ProcessLockedMock.call_args_list]
+        self.assertEqual(self.seen(attempted)["sub_0"], [self.order[locked]])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("pinax_stripe_process_events", "--ordered", stdout=out)
+        self.assertIn("Processed 40 events, 0 failed.", out.getvalue())
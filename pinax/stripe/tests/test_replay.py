@@ -0,0 +1,84 @@
+import datetime
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from ..management.commands.pinax_stripe_replay import parse_when
+from ..models import Event, EventProcessingException
+from ..replay import Replay, ReplayStats, replay_chunk
+
+
+class ReplayTests(TestCase):
+
+    def setUp(self):
+        self.old = Event.objects.create(
+            stripe_id="evt_old",
+            kind="plan.updated",
+            message={},
+            created_at=timezone.now() - datetime.timedelta(days=10)
+        )
+        self.live = Event.objects.create(stripe_id="evt_live", kind="plan.updated", message={}, livemode=True)
+        self.account = Event.objects.create(stripe_id="evt_acct", kind="plan.created", message={}, account_id="acct_1")
+        Event.objects.create(stripe_id="evt_done", kind="plan.created", message={}, processed=True)
+
+    def test_queryset_filters(self):
+        self.assertEqual(list(Replay().queryset()), [self.old, self.live, self.account])
+        self.assertEqual(list(Replay(kinds=["plan.created"]).queryset()), [self.account])
+        self.assertEqual(list(Replay(livemode=True).queryset()), [self.live])
+        self.assertEqual(list(Replay(account_id="acct_1").queryset()), [self.account])
+        since = timezone.now() - datetime.timedelta(days=1)
+        self.assertEqual(list(Replay(until=since).queryset()), [self.old])
+        self.assertEqual(list(Replay(since=since).queryset()), [self.live, self.account])
+
+    def test_chunks(self):
+        self.assertEqual(list(Replay(chunk_size=2).chunks()), [[self.old.pk, self.live.pk], [self.account.pk]])
+
+    def test_run(self):
+        stats = Replay(chunk_size=2).run()
+        self.assertEqual(stats.total("processed"), 3)
+        self.assertEqual(stats.kinds["plan.updated"]["processed"], 2)
+        self.assertFalse(Event.objects.filter(processed=False).exists())
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_run_counts_failures(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        stats = Replay(kinds=["plan.updated"]).run()
+        self.assertEqual(stats.kinds["plan.updated"]["failed"], 2)
+        self.assertEqual(EventProcessingException.objects.count(), 2)
+        self.assertIn("plan.updated: 0 processed (0.0/s), 2 failed", list(stats.lines()))
+
+    @patch("pinax.stripe.replay.pooled_replay_chunk")
+    def test_run_thread_pool(self, ReplayChunkMock):
+        ReplayChunkMock.side_effect = lambda pks: {"plan.updated": {"processed": len(pks)}}
+        progress = []
+        stats = Replay(chunk_size=1, workers=2).run(progress=progress.append)
+        self.assertEqual(ReplayChunkMock.call_count, 3)
+        self.assertEqual(stats.total("processed"), 3)
+        self.assertEqual(len(progress), 3)
+
+    def test_replay_chunk_skips_processed(self):
+        done = Event.objects.get(stripe_id="evt_done")
+        self.assertEqual(replay_chunk([done.pk]), {None: {"skipped": 1}})
+
+    def test_stats(self):
+        stats = ReplayStats()
+        stats.add({"plan.updated": {"processed": 2, "failed": 1}, None: {"skipped": 3}})
+        self.assertEqual(stats.total("skipped"), 3)
+        self.assertEqual(len(list(stats.lines())), 1)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("pinax_stripe_replay", "--kind", "plan.updated", "--testmode", stdout=out)
+        self.assertIn("plan.updated: 1 processed", out.getvalue())
+        self.assertIn("Replayed 1 events", out.getvalue())
+        self.assertTrue(Event.objects.filter(pk=self.live.pk, processed=False).exists())
+
+    def test_parse_when(self):
+        self.assertEqual(parse_when("2021-11-27").date(), datetime.date(2021, 11, 27))
+        self.assertTrue(timezone.is_aware(parse_when("2021-11-27T10:00:00")))
+        with self.assertRaises(CommandError):
+            parse_when("yesterday")
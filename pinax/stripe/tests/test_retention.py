@@ -0,0 +1,92 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
+from ..retention import expired_events, prune_events, prune_exceptions
+
+
+def days_ago(days):
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+@override_settings(
+    PINAX_STRIPE_EVENT_RETENTION_DAYS=30,
+    PINAX_STRIPE_EVENT_RETENTION_DAYS_BY_KIND={"invoice.paid": 365, "charge.succeeded": None}
+)
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        self.old = Event.objects.create(stripe_id="evt_old", kind="plan.updated", message={"id": "evt_old"}, processed=True, created_at=days_ago(60))
+        self.unprocessed = Event.objects.create(stripe_id="evt_unprocessed", kind="plan.updated", message={"id": "evt_unprocessed"}, created_at=days_ago(60))
+        self.recent = Event.objects.create(stripe_id="evt_recent", kind="plan.updated", message={"id": "evt_recent"}, processed=True, created_at=days_ago(1))
+        self.invoice = Event.objects.create(stripe_id="evt_invoice", kind="invoice.paid", message={"id": "evt_invoice"}, processed=True, created_at=days_ago(60))
+        self.old_invoice = Event.objects.create(stripe_id="evt_old_invoice", kind="invoice.paid", message={"id": "evt_old_invoice"}, processed=True, created_at=days_ago(400))
+        self.charge = Event.objects.create(stripe_id="evt_charge", kind="charge.succeeded", message={"id": "evt_charge"}, processed=True, created_at=days_ago(400))
+        EventProcessingException.objects.create(event=self.old, data="", message="boom", traceback="")
+
+    def test_expired_events(self):
+        self.assertEqual(set(expired_events()), {self.old, self.old_invoice})
+
+    @override_settings(PINAX_STRIPE_EVENT_RETENTION_DAYS=None)
+    def test_expired_events_by_kind_only(self):
+        self.assertEqual(set(expired_events()), {self.old_invoice})
+
+    def test_prune_events(self):
+        self.assertEqual(prune_events(batch_size=1), 2)
+        self.assertFalse(Event.objects.filter(pk__in=[self.old.pk, self.old_invoice.pk]).exists())
+        self.assertEqual(Event.objects.count(), 4)
+        self.assertFalse(EventProcessingException.objects.exists())
+
+    def test_prune_events_keep_stub(self):
+        self.assertEqual(prune_events(keep_stub=True), 2)
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.message, {})
+        self.assertFalse(EventProcessingException.objects.exists())
+        self.assertEqual(prune_events(keep_stub=True), 0)
+        self.assertIsNone(Event.objects.create_if_new(stripe_id="evt_old", kind="plan.updated", message={}))
+
+    def test_prune_events_archive(self):
+        archive = StringIO()
+        prune_events(archive=archive)
+        records = [json.loads(line) for line in archive.getvalue().splitlines()]
+        self.assertEqual([record["stripe_id"] for record in records], ["evt_old", "evt_old_invoice"])
+        self.assertEqual(records[0]["message"], {"id": "evt_old"})
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_RETENTION_DAYS=7)
+    def test_prune_exceptions(self):
+        EventProcessingException.objects.create(event=self.recent, data="", message="old", traceback="", created_at=days_ago(8))
+        self.assertEqual(prune_exceptions(), 1)
+        self.assertEqual(EventProcessingException.objects.count(), 1)
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_RETENTION_DAYS=7)
+    def test_prune_exception_groups(self):
+        EventProcessingExceptionGroup.objects.record("old", ValueError("old"), now=days_ago(8))
+        EventProcessingExceptionGroup.objects.record("recent", ValueError("recent"), now=days_ago(6))
+        prune_exceptions()
+        self.assertEqual(list(EventProcessingExceptionGroup.objects.values_list("fingerprint", flat=True)), ["recent"])
+
+    def test_prune_exceptions_disabled(self):
+        self.assertEqual(prune_exceptions(), 0)
+
+    def test_command(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        out = StringIO()
+        call_command("pinax_stripe_prune_events", "--archive-dir", archive_dir, stdout=out)
+        self.assertIn("Pruned 2 events and 0 processing exceptions.", out.getvalue())
+        [name] = os.listdir(archive_dir)
+        with gzip.open(os.path.join(archive_dir, name), "rt") as archive:
+            self.assertEqual(len(archive.readlines()), 2)
@@ -1,8 +1,22 @@
 from django.test import TestCase
 
-from ..signals import WEBHOOK_SIGNALS
+from ..signals import WEBHOOK_BATCH_SIGNALS, WEBHOOK_SIGNALS
+from ..webhooks import registry
 
 
 class TestSignals(TestCase):
     def test_signals(self):
         self.assertGreater(len(WEBHOOK_SIGNALS.keys()), 100)
+
+    def test_signals_lookup(self):
+        self.assertIs(WEBHOOK_SIGNALS["invoice.paid"], registry.get_signal("invoice.paid"))
+        self.assertIn("invoice.paid", WEBHOOK_SIGNALS)
+        with self.assertRaises(KeyError):
+            WEBHOOK_SIGNALS["not a webhook"]
+
+    def test_batch_signals_lookup(self):
+        self.assertIs(WEBHOOK_BATCH_SIGNALS["invoice.paid"], registry.get_batch_signal("invoice.paid"))
+        self.assertIsNot(WEBHOOK_BATCH_SIGNALS["invoice.paid"], WEBHOOK_SIGNALS["invoice.paid"])
+        self.assertIsNone(registry.get_batch_signal("invoice.created", create=False))
+        with self.assertRaises(KeyError):
+            WEBHOOK_BATCH_SIGNALS["not a webhook"]
@@ -0,0 +1,115 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Event
+from ..sync import Checkpoint, EventSync
+from .stripe_stub import StripeStub
+
+
+def stripe_event(index, kind="plan.updated"):
+    return {
+        "id": "evt_{:03d}".format(index),
+        "object": "event",
+        "api_version": "2020-08-27",
+        "created": 1600000000 + index,
+        "livemode": False,
+        "pending_webhooks": 0,
+        "type": kind,
+        "data": {"object": {"id": "gold", "object": "plan"}},
+    }
+
+
+class EventSyncTests(TestCase):
+
+    def setUp(self):
+        # newest first, like the API
+        self.events = [stripe_event(index) for index in reversed(range(250))]
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.checkpoint = os.path.join(self.tmpdir, "checkpoint.json")
+
+    def test_run(self):
+        Event.objects.create(stripe_id="evt_010", kind="plan.updated", message={}, processed=True)
+        with StripeStub(self.events) as stub:
+            sync = EventSync(batch_size=60, checkpoint=self.checkpoint).run()
+        self.assertEqual(sync.seen, 250)
+        self.assertEqual(sync.inserted, 249)
+        self.assertEqual(sync.stats.total("processed"), 249)
+        self.assertEqual(Event.objects.count(), 250)
+        self.assertFalse(Event.objects.filter(processed=False).exists())
+        self.assertEqual(len(stub.requests), 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    @patch("pinax.stripe.sync.replay_chunk")
+    def test_run_dispatches_oldest_first_after_storing(self, ReplayChunkMock):
+        def replay(pks):
+            # every page is stored before anything is dispatched
+            self.assertEqual(Event.objects.count(), 250)
+            return {}
+        ReplayChunkMock.side_effect = replay
+        with StripeStub(self.events):
+            EventSync(batch_size=60).run()
+        self.assertEqual(ReplayChunkMock.call_count, 1)
+        pks = ReplayChunkMock.call_args[0][0]
+        self.assertEqual(
+            [Event.objects.get(pk=pk).stripe_id for pk in pks],
+            ["evt_{:03d}".format(index) for index in range(250)]
+        )
+
+    def test_run_without_dispatch(self):
+        with StripeStub(self.events[:5]):
+            EventSync(dispatch=False).run()
+        self.assertEqual(Event.objects.filter(processed=False).count(), 5)
+
+    def test_resume_from_checkpoint(self):
+        Checkpoint(self.checkpoint).save("evt_100")
+        with StripeStub(self.events) as stub:
+            sync = EventSync(checkpoint=self.checkpoint).run()
+        self.assertEqual(sync.inserted, 100)
+        self.assertEqual(stub.requests[0]["starting_after"], "evt_100")
+        self.assertFalse(Event.objects.filter(stripe_id="evt_100").exists())
+
+    def test_checkpoint_saved_per_batch(self):
+        with StripeStub(self.events), patch.object(Checkpoint, "clear"):
+            EventSync(batch_size=100, checkpoint=self.checkpoint).run()
+        with open(self.checkpoint) as fp:
+            self.assertEqual(json.load(fp), {"starting_after": "evt_000"})
+
+    def test_filters(self):
+        events = [stripe_event(2, kind="invoice.paid"), stripe_event(1), stripe_event(0, kind="invoice.paid")]
+        since = datetime.datetime.fromtimestamp(1600000001, tz=datetime.timezone.utc)
+        with StripeStub(events):
+            sync = EventSync(since=since, types=["invoice.paid"]).run()
+        self.assertEqual(list(Event.objects.values_list("stripe_id", flat=True)), ["evt_002"])
+        self.assertEqual(sync.inserted, 1)
+
+    def test_insert_orders_by_created(self):
+        pks = EventSync().insert([stripe_event(2), stripe_event(1), stripe_event(0)])
+        self.assertEqual(
+            [Event.objects.get(pk=pk).stripe_id for pk in pks],
+            ["evt_000", "evt_001", "evt_002"]
+        )
+        self.assertEqual(EventSync().insert([stripe_event(1)]), [])
+
+    @patch("pinax.stripe.sync.pooled_replay_chunk")
+    def test_process_in_parallel(self, ReplayChunkMock):
+        ReplayChunkMock.side_effect = lambda pks: {"plan.updated": {"processed": len(pks)}}
+        sync = EventSync(workers=2)
+        sync.process([1, 2, 3, 4])
+        self.assertEqual(ReplayChunkMock.call_count, 2)
+        self.assertEqual(sync.stats.total("processed"), 4)
+
+    def test_command(self):
+        out = StringIO()
+        with StripeStub(self.events[:3]):
+            call_command("pinax_stripe_sync_events", "-v", "2", stdout=out)
+        self.assertIn("3 events fetched, 3 new", out.getvalue())
+        self.assertIn("Fetched 3 events, stored 3 new, 0 failed to process.", out.getvalue())
@@ -2,13 +2,15 @@ import datetime
 import decimal
 
 from django.test import TestCase
-from django.utils import timezone
 
 from ..utils import (
     convert_amount_for_api,
     convert_amount_for_db,
     convert_tstamp,
-    obfuscate_secret_key
+    exception_fingerprint,
+    extract_customer_id,
+    obfuscate_secret_key,
+    retry_delay
 )
 
 
@@ -18,14 +20,14 @@ class TestTimestampConversion(TestCase):
         stamp = convert_tstamp(1365567407)
         self.assertEqual(
             stamp,
-            datetime.datetime(2013, 4, 10, 4, 16, 47, tzinfo=timezone.utc)
+            datetime.datetime(2013, 4, 10, 4, 16, 47, tzinfo=datetime.timezone.utc)
         )
 
     def test_conversion_with_field_name(self):
         stamp = convert_tstamp({"my_date": 1365567407}, "my_date")
         self.assertEqual(
             stamp,
-            datetime.datetime(2013, 4, 10, 4, 16, 47, tzinfo=timezone.utc)
+            datetime.datetime(2013, 4, 10, 4, 16, 47, tzinfo=datetime.timezone.utc)
         )
 
     def test_conversion_with_invalid_field_name(self):
@@ -83,3 +85,84 @@ class OtherUtilTests(TestCase):
     def test_obfuscate_secret_key(self):
         val = obfuscate_secret_key("foobar")
         self.assertEqual(val, "********************obar")
+
+
+class ExtractCustomerIdTests(TestCase):
+
+    def test_customer_field(self):
+        data = {"type": "invoice.paid", "data": {"object": {"id": "in_1", "customer": "cus_1"}}}
+        self.assertEqual(extract_customer_id(data), "cus_1")
+
+    def test_expanded_customer_field(self):
+        data = {"type": "charge.succeeded", "data": {"object": {"id": "ch_1", "customer": {"id": "cus_1"}}}}
+        self.assertEqual(extract_customer_id(data), "cus_1")
+
+    def test_customer_event(self):
+        data = {"type": "customer.updated", "data": {"object": {"id": "cus_1", "object": "customer"}}}
+        self.assertEqual(extract_customer_id(data), "cus_1")
+
+    def test_customer_subscription_event(self):
+        data = {"type": "customer.subscription.updated", "data": {"object": {"id": "sub_1", "customer": "cus_1"}}}
+        self.assertEqual(extract_customer_id(data), "cus_1")
+
+    def test_no_customer(self):
+        self.assertEqual(extract_customer_id({"type": "plan.updated", "data": {"object": {"id": "gold"}}}), "")
+
+    def test_no_message(self):
+        self.assertEqual(extract_customer_id(None), "")
+        self.assertEqual(extract_customer_id({}), "")
+        self.assertEqual(extract_customer_id({"type": "charge.succeeded", "data": {"object": {"customer": None}}}), "")
+        self.assertEqual(extract_customer_id({"data": {}}), "")
+
+
+class RetryDelayTests(TestCase):
+
+    def test_doubles(self):
+        for attempts, delay in [(1, 60), (2, 120), (3, 240), (4, 480)]:
+            for _ in range(20):
+                self.assertTrue(delay / 2 <= retry_delay(attempts, 60, 3600) <= delay)
+
+    def test_capped(self):
+        for _ in range(20):
+            self.assertTrue(1800 <= retry_delay(30, 60, 3600) <= 3600)
+
+    def test_jittered(self):
+        self.assertGreater(len({retry_delay(3, 60, 3600) for _ in range(20)}), 1)
+
+
+def fail(message, exception=ValueError):
+    raise exception(message)
+
+
+def fail_elsewhere(message):
+    raise ValueError(message)
+
+
+class ExceptionFingerprintTests(TestCase):
+
+    def catch(self, func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            return e
+
+    def test_ignores_message(self):
+        self.assertEqual(
+            exception_fingerprint(self.catch(fail, "evt_1 failed")),
+            exception_fingerprint(self.catch(fail, "evt_2 failed"))
+        )
+
+    def test_type(self):
+        self.assertNotEqual(
+            exception_fingerprint(self.catch(fail, "boom")),
+            exception_fingerprint(self.catch(fail, "boom", KeyError))
+        )
+
+    def test_frames(self):
+        self.assertNotEqual(
+            exception_fingerprint(self.catch(fail, "boom")),
+            exception_fingerprint(self.catch(fail_elsewhere, "boom"))
+        )
+
+    def test_not_raised(self):
+        self.assertEqual(exception_fingerprint(ValueError("a")), exception_fingerprint(ValueError("b")))
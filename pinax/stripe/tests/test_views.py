@@ -1,23 +1,31 @@
+import asyncio
+import threading
 from unittest.mock import patch
 
-from django.test import RequestFactory, TestCase
+from django.db import close_old_connections, connection
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
 
-import stripe
+from asgiref.sync import sync_to_async
 
 from ..models import Event
-from ..views import Webhook
-from . import PLAN_CREATED_TEST_DATA
+from ..views import AsyncWebhook, Webhook
+from ..webhooks import registry
+from . import PLAN_CREATED_TEST_DATA, asgi_signed, signed
 
 
 class WebhookViewTest(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
 
-    @patch("pinax.stripe.views.stripe.Webhook.construct_event")
     @patch("pinax.stripe.views.registry")
-    def test_send_webhook(self, mock_registry, mock_event):
-        mock_event.return_value.to_dict_recursive.return_value = PLAN_CREATED_TEST_DATA
-        request = self.factory.post("/webhook", data=PLAN_CREATED_TEST_DATA, content_type="application/json", HTTP_STRIPE_SIGNATURE="foo")
+    def test_send_webhook(self, mock_registry):
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
         response = Webhook.as_view()(request)
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Event.objects.filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).exists())
@@ -25,43 +33,161 @@ class WebhookViewTest(TestCase):
             mock_registry.get.return_value.return_value.process.called
         )
 
-    @patch("pinax.stripe.views.stripe.Webhook.construct_event")
     @patch("pinax.stripe.views.registry")
-    def test_send_webhook_dupe(self, mock_registry, mock_event):
+    def test_send_webhook_dupe(self, mock_registry):
         Event.objects.create(stripe_id=PLAN_CREATED_TEST_DATA["id"], message=PLAN_CREATED_TEST_DATA)
-        mock_event.return_value.to_dict_recursive.return_value = PLAN_CREATED_TEST_DATA
-        mock_event.return_value.id = PLAN_CREATED_TEST_DATA["id"]
-        request = self.factory.post("/webhook", data=PLAN_CREATED_TEST_DATA, content_type="application/json", HTTP_STRIPE_SIGNATURE="foo")
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
         response = Webhook.as_view()(request)
         self.assertEqual(response.status_code, 200)
         self.assertFalse(
             mock_registry.get.return_value.return_value.process.called
         )
 
-    @patch("pinax.stripe.views.stripe.Webhook.construct_event")
     @patch("pinax.stripe.views.registry")
-    def test_send_webhook_no_handler(self, mock_registry, mock_event):
+    def test_send_webhook_dupe_inserted_concurrently(self, mock_registry):
+        # the other delivery commits between the lookup and the insert, so
+        # only the unique constraint catches it
+        build_event = Webhook.build_event
+
+        def build_and_race(view, data, backend):
+            Event.objects.create(stripe_id=data["id"], message=data)
+            return build_event(view, data, backend)
+
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
+        with patch.object(Webhook, "build_event", build_and_race):
+            response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Event.objects.filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).count(), 1)
+        self.assertFalse(
+            mock_registry.get.return_value.return_value.process.called
+        )
+
+    @patch("pinax.stripe.views.registry")
+    def test_send_webhook_no_handler(self, mock_registry):
         mock_registry.get.return_value = None
-        mock_event.return_value.to_dict_recursive.return_value = PLAN_CREATED_TEST_DATA
-        request = self.factory.post("/webhook", data=PLAN_CREATED_TEST_DATA, content_type="application/json", HTTP_STRIPE_SIGNATURE="foo")
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
         response = Webhook.as_view()(request)
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Event.objects.filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).exists())
 
-    @patch("pinax.stripe.views.stripe.Webhook.construct_event")
+    def test_send_webhook_unknown_kind(self):
+        data = dict(PLAN_CREATED_TEST_DATA, type="not.a.webhook")
+        request = self.factory.post("/webhook", **signed(data))
+        response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Event.objects.filter(kind="not.a.webhook").exists())
+
     @patch("pinax.stripe.views.registry")
-    def test_send_webhook_value_error(self, mock_registry, mock_event):
+    def test_send_webhook_value_error(self, mock_registry):
         mock_registry.get.return_value = None
-        mock_event.side_effect = ValueError
-        request = self.factory.post("/webhook", data=PLAN_CREATED_TEST_DATA, content_type="application/json", HTTP_STRIPE_SIGNATURE="foo")
+        request = self.factory.post("/webhook", **signed(b"not json"))
         response = Webhook.as_view()(request)
         self.assertEqual(response.status_code, 400)
 
-    @patch("pinax.stripe.views.stripe.Webhook.construct_event")
     @patch("pinax.stripe.views.registry")
-    def test_send_webhook_stripe_error(self, mock_registry, mock_event):
+    def test_send_webhook_stripe_error(self, mock_registry):
         mock_registry.get.return_value = None
-        mock_event.side_effect = stripe.error.SignatureVerificationError("foo", "sig")
-        request = self.factory.post("/webhook", data=PLAN_CREATED_TEST_DATA, content_type="application/json", HTTP_STRIPE_SIGNATURE="foo")
+        request = self.factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA, secret="bar"))
+        response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+
+    def test_send_webhook_not_an_object(self):
+        request = self.factory.post("/webhook", **signed(b"[]"))
+        response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+
+    def test_send_webhook_stores_body(self):
+        body = b'{"id": "evt_raw", "object": "event", "type": "plan.created", "livemode": false, "data": {"object": {"id": "gold", "amount": 1.50}}}'
+        request = self.factory.post("/webhook", **signed(body))
         response = Webhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        event = Event.objects.get(stripe_id="evt_raw")
+        self.assertEqual(event.message["data"]["object"]["amount"], 1.5)
+        self.assertEqual(type(event.message), dict)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT message FROM pinax_stripe_event WHERE id = %s", [event.pk])
+            self.assertEqual(cursor.fetchone()[0], body.decode("utf-8"))
+
+
+class AsyncWebhookViewTest(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+    async def test_send_webhook(self):
+        request = self.factory.post("/webhook", **asgi_signed(PLAN_CREATED_TEST_DATA))
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook") as ProcessWebhookMock:
+            response = await AsyncWebhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(ProcessWebhookMock.called)
+        event = await sync_to_async(Event.objects.get)(stripe_id=PLAN_CREATED_TEST_DATA["id"])
+        self.assertTrue(event.processed)
+
+    async def test_send_webhook_async_handler(self):
+        handled = []
+
+        async def process_webhook(webhook):
+            handled.append(webhook.event.stripe_id)
+
+        request = self.factory.post("/webhook", **asgi_signed(PLAN_CREATED_TEST_DATA))
+        with patch.object(registry.get(PLAN_CREATED_TEST_DATA["type"]), "process_webhook", process_webhook, create=True):
+            response = await AsyncWebhook.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(handled, [PLAN_CREATED_TEST_DATA["id"]])
+
+    async def test_send_webhook_dupe(self):
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook") as ProcessWebhookMock:
+            for _ in range(2):
+                response = await AsyncWebhook.as_view()(self.factory.post("/webhook", **asgi_signed(PLAN_CREATED_TEST_DATA)))
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(ProcessWebhookMock.call_count, 1)
+
+    async def test_send_webhook_stripe_error(self):
+        request = self.factory.post("/webhook", **asgi_signed(PLAN_CREATED_TEST_DATA, secret="bar"))
+        response = await AsyncWebhook.as_view()(request)
         self.assertEqual(response.status_code, 400)
+
+    async def test_view_is_async(self):
+        view = AsyncWebhook.as_view()
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertTrue(view.csrf_exempt)
+        response = await view(self.factory.get("/webhook"))
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(PINAX_STRIPE_PROCESSING_BACKEND="pinax.stripe.processing.DatabaseBackend")
+    async def test_send_webhook_deferred(self):
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook") as ProcessWebhookMock:
+            response = await AsyncWebhook.as_view()(self.factory.post("/webhook", **asgi_signed(PLAN_CREATED_TEST_DATA)))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ProcessWebhookMock.called)
+
+
+class WebhookViewConcurrencyTest(TransactionTestCase):
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("in-memory SQLite cannot take concurrent writes")
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_concurrent_duplicate_deliveries(self, ProcessWebhookMock):
+        factory = RequestFactory()
+        deliveries = 8
+        barrier = threading.Barrier(deliveries)
+        responses = []
+
+        def deliver():
+            request = factory.post("/webhook", **signed(PLAN_CREATED_TEST_DATA))
+            barrier.wait()
+            try:
+                responses.append(Webhook.as_view()(request).status_code)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=deliver) for _ in range(deliveries)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(responses, [200] * deliveries)
+        self.assertEqual(Event.objects.filter(stripe_id=PLAN_CREATED_TEST_DATA["id"]).count(), 1)
+        self.assertEqual(ProcessWebhookMock.call_count, 1)
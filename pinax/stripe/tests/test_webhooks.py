@@ -1,20 +1,30 @@
+import datetime
 import json
+import threading
 from unittest.mock import patch
 
 from django.dispatch import Signal
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test.client import Client
 from django.urls import reverse
 
 import stripe
+from asgiref.sync import sync_to_async
 
-from ..models import Event, EventProcessingException
+from ..models import (
+    Event,
+    EventProcessingException,
+    EventProcessingExceptionGroup
+)
+from ..receivers import independent, live_receivers
+from ..signals import WEBHOOK_BATCH_SIGNALS, WEBHOOK_SIGNALS
 from ..webhooks import (
     AccountExternalAccountCreatedWebhook,
     AccountUpdatedWebhook,
     Webhook,
     registry
 )
+from . import signed
 
 
 class NewAccountUpdatedWebhook(AccountUpdatedWebhook):
@@ -34,6 +44,74 @@ class WebhookRegistryTest(TestCase):
         webhook = registry.get("account.updated")
         self.assertIs(webhook, NewAccountUpdatedWebhook)
 
+    def test_lazy_event_types(self):
+        lazy = type(registry)()
+        lazy.load({"thing.happened": "Occurs whenever a thing happens."})
+        self.assertEqual(list(lazy.keys()), ["thing.happened"])
+        self.assertIsNone(lazy["thing.happened"]["webhook"])
+        self.assertIsNone(lazy["thing.happened"]["signal"])
+
+        webhook = lazy.get("thing.happened")
+        self.assertEqual(webhook.__name__, "ThingHappenedWebhook")
+        self.assertEqual(webhook.name, "thing.happened")
+        self.assertEqual(webhook.description, "Occurs whenever a thing happens.")
+        self.assertIs(lazy.find_class("ThingHappenedWebhook"), webhook)
+        self.assertIsNone(lazy.find_class("NotAWebhook"))
+        self.assertIsNone(registry.get("thing.happened"))
+
+    def test_generated_class_does_not_replace_subclass(self):
+        self.assertIs(registry.generated("account.updated"), AccountUpdatedWebhook)
+        self.assertIs(registry.get("account.updated"), NewAccountUpdatedWebhook)
+
+    def test_module_attribute(self):
+        from .. import webhooks
+        self.assertIs(webhooks.InvoicePaidWebhook, registry.get("invoice.paid"))
+        with self.assertRaises(AttributeError):
+            webhooks.NotAWebhook
+
+    def test_get_unknown(self):
+        self.assertIsNone(registry.get("not a webhook"))
+
+    def test_resolve(self):
+        dispatch = registry.resolve("invoice.paid")
+        self.assertIs(dispatch.webhook, registry.get("invoice.paid"))
+        self.assertEqual(dispatch.signals, (registry.get_signal("invoice.paid"),))
+        self.assertEqual(dispatch.names, ("invoice.paid",))
+
+    def test_resolve_unknown(self):
+        dispatch = registry.resolve("not.a.webhook")
+        self.assertIsNone(dispatch.webhook)
+        self.assertEqual(dispatch.signals, ())
+
+    def test_wildcard_signal(self):
+        signal = registry.get_signal("invoice.*")
+        self.assertIs(signal, registry.get_signal("invoice.*"))
+        self.assertIn(signal, registry.resolve("invoice.paid").signals)
+        self.assertIn(signal, registry.resolve("invoice.payment_failed").signals)
+        self.assertNotIn(signal, registry.resolve("charge.succeeded").signals)
+        self.assertIn(signal, registry.resolve("invoice.not_yet_known").signals)
+        self.assertIn("invoice.*", registry.resolve("invoice.paid").names)
+
+    def test_compile(self):
+        table = registry.compile()
+        self.assertNotIn("invoice.paid", table)
+        dispatch = registry.resolve("invoice.paid")
+        self.assertIs(table["invoice.paid"], dispatch)
+        with self.assertRaises(TypeError):
+            table["invoice.paid"] = None
+        # any new pattern may match an event type already resolved
+        registry.get_signal("compile.test.*")
+        self.assertNotIn("invoice.paid", table)
+
+    def test_register_invalidates_table(self):
+        registry.compile()
+
+        class SomethingNewWebhook(Webhook):
+            name = "something.new"
+
+        self.addCleanup(registry.unregister, "something.new")
+        self.assertIs(registry.resolve("something.new").webhook, SomethingNewWebhook)
+
 
 class WebhookTests(TestCase):
 
@@ -91,37 +169,21 @@ class WebhookTests(TestCase):
         webhook = Webhook(event)
         self.assertIsNone(webhook.name)
 
-    @patch("stripe.Webhook.construct_event")
     @patch("stripe.Event.retrieve")
     @patch("stripe.Transfer.retrieve")
-    def test_webhook_with_transfer_event(self, TransferMock, StripeEventMock, MockEvent):
-        MockEvent.return_value.to_dict_recursive.return_value = self.event_data.copy()
+    def test_webhook_with_transfer_event(self, TransferMock, StripeEventMock):
         StripeEventMock.return_value.to_dict.return_value = self.event_data
         TransferMock.return_value = self.event_data["data"]["object"]
-        msg = json.dumps(self.event_data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
-            msg,
-            content_type="application/json",
-            HTTP_STRIPE_SIGNATURE="foo"
-        )
+        resp = Client().post(reverse("pinax_stripe_webhook"), **signed(self.event_data))
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(Event.objects.filter(kind="transfer.created").exists())
 
-    @patch("stripe.Webhook.construct_event")
     @patch("stripe.Event.retrieve")
-    def test_webhook_associated_with_stripe_account(self, StripeEventMock, MockEvent):
+    def test_webhook_associated_with_stripe_account(self, StripeEventMock):
         connect_event_data = self.event_data.copy()
         connect_event_data["account"] = "acc_XXX"
-        MockEvent.return_value.to_dict_recursive.return_value = connect_event_data
         StripeEventMock.return_value.to_dict.return_value = connect_event_data
-        msg = json.dumps(connect_event_data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
-            msg,
-            content_type="application/json",
-            HTTP_STRIPE_SIGNATURE="foo"
-        )
+        resp = Client().post(reverse("pinax_stripe_webhook"), **signed(connect_event_data))
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(Event.objects.filter(kind="transfer.created").exists())
         self.assertEqual(
@@ -129,18 +191,17 @@ class WebhookTests(TestCase):
             "acc_XXX"
         )
 
-    @patch("stripe.Webhook.construct_event")
-    def test_webhook_duplicate_event(self, MockEvent):
-        MockEvent.return_value.to_dict_recursive.return_value = self.event_data.copy()
-        data = {"id": 123}
+    def test_webhook_sets_customer_id(self):
+        event_data = json.loads(json.dumps(self.event_data))
+        event_data["data"]["object"]["customer"] = "cus_XXX"
+        resp = Client().post(reverse("pinax_stripe_webhook"), **signed(event_data))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Event.objects.get(kind="transfer.created").customer_id, "cus_XXX")
+
+    def test_webhook_duplicate_event(self):
+        data = dict(self.event_data, id="123")
         Event.objects.create(stripe_id=123, livemode=True, message={})
-        msg = json.dumps(data)
-        resp = Client().post(
-            reverse("pinax_stripe_webhook"),
-            msg,
-            content_type="application/json",
-            HTTP_STRIPE_SIGNATURE="foo"
-        )
+        resp = Client().post(reverse("pinax_stripe_webhook"), **signed(data))
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(Event.objects.filter(stripe_id="123").count(), 1)
 
@@ -161,6 +222,19 @@ class WebhookTests(TestCase):
         WH(event).send_signal()
         self.assertTrue(SignalSendMock.called)
 
+    def test_send_signal_wildcard(self):
+        received = []
+
+        def signal_handler(sender, event, **kwargs):
+            received.append(event)
+            return "ok"
+        registry.get_signal("account.application.*").connect(signal_handler)
+        self.addCleanup(registry.get_signal("account.application.*").disconnect, signal_handler)
+        event = Event(kind="account.application.deauthorized")
+        responses = registry.get("account.application.deauthorized")(event).send_signal()
+        self.assertEqual(received, [event])
+        self.assertEqual(responses, [(signal_handler, "ok")])
+
     def test_send_signal_not_sent(self):
         event = Event(kind="account.application.deauthorized")
         WH = registry.get("account.application.deauthorized")
@@ -197,7 +271,392 @@ class WebhookTests(TestCase):
             AccountExternalAccountCreatedWebhook(event).process()
         self.assertTrue(EventProcessingException.objects.filter(event=event).exists())
 
+    @override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_RATE=1.0)
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_process_exceptions_are_grouped(self, ProcessWebhookMock):
+        for index in range(3):
+            event = Event.objects.create(stripe_id="evt_{}".format(index), kind="account.external_account.created", message={})
+            ProcessWebhookMock.side_effect = Exception("failed {}".format(index))
+            with self.assertRaises(Exception):
+                AccountExternalAccountCreatedWebhook(event).process()
+        group = EventProcessingExceptionGroup.objects.get()
+        self.assertEqual(group.count, 3)
+        self.assertEqual(group.exception_type, "builtins.Exception")
+        self.assertEqual(group.message, "failed 2")
+        self.assertEqual(group.sample_event_ids, ["evt_0", "evt_1", "evt_2"])
+        self.assertEqual(EventProcessingException.objects.filter(group=group).count(), 3)
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_RATE=0)
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_process_exceptions_sampled(self, ProcessWebhookMock):
+        ProcessWebhookMock.side_effect = Exception("boom")
+        for index in range(3):
+            event = Event.objects.create(stripe_id="evt_{}".format(index), kind="account.external_account.created", message={})
+            with self.assertRaises(Exception):
+                AccountExternalAccountCreatedWebhook(event).process()
+        self.assertEqual(EventProcessingExceptionGroup.objects.get().count, 3)
+        self.assertEqual(EventProcessingException.objects.get().event.stripe_id, "evt_0")
+
+    @override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_EVENTS=1)
+    @patch("pinax.stripe.webhooks.base.random.random", return_value=0.5)
+    def test_process_exceptions_sampled_by_default(self, RandomMock):
+        events = [Event.objects.create(stripe_id="evt_{}".format(index), kind="account.external_account.created", message={}) for index in range(3)]
+        exception = Exception("boom")
+        AccountExternalAccountCreatedWebhook(events[0]).log_exception(None, exception)
+        # once the group has its sample events, a repeated failure is a single UPDATE
+        with self.assertNumQueries(1):
+            AccountExternalAccountCreatedWebhook(events[1]).log_exception(None, exception)
+        RandomMock.return_value = 0.001
+        AccountExternalAccountCreatedWebhook(events[2]).log_exception(None, exception)
+        self.assertEqual(EventProcessingExceptionGroup.objects.get().count, 3)
+        self.assertEqual(list(EventProcessingException.objects.values_list("event__stripe_id", flat=True).order_by("pk")), ["evt_0", "evt_2"])
+
+    @override_settings(PINAX_STRIPE_LATEST_WINS_KINDS=["account.external_account.created"])
+    @patch("pinax.stripe.webhooks.Webhook.send_signal")
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_process_latest_wins(self, ProcessWebhookMock, SendSignalMock):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+        message = {"data": {"object": {"id": "ba_1"}}}
+        newer = Event.objects.create(
+            stripe_id="evt_2",
+            kind="account.external_account.created",
+            stripe_created_at=created + datetime.timedelta(seconds=1),
+            message=message
+        )
+        AccountExternalAccountCreatedWebhook(newer).process()
+        self.assertEqual(ProcessWebhookMock.call_count, 1)
+        older = Event.objects.create(
+            stripe_id="evt_1",
+            kind="account.external_account.created",
+            stripe_created_at=created,
+            message=message
+        )
+        AccountExternalAccountCreatedWebhook(older).process()
+        self.assertEqual(ProcessWebhookMock.call_count, 1)
+        self.assertEqual(SendSignalMock.call_count, 1)
+        older.refresh_from_db()
+        self.assertTrue(older.processed)
+        self.assertEqual(older.attempts, 0)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_process_latest_wins_disabled(self, ProcessWebhookMock):
+        created = datetime.datetime(2020, 9, 13, tzinfo=datetime.timezone.utc)
+        for stripe_id, seconds in [("evt_2", 1), ("evt_1", 0)]:
+            event = Event.objects.create(
+                stripe_id=stripe_id,
+                kind="account.external_account.created",
+                stripe_created_at=created + datetime.timedelta(seconds=seconds),
+                message={"data": {"object": {"id": "ba_1"}}}
+            )
+            AccountExternalAccountCreatedWebhook(event).process()
+        self.assertEqual(ProcessWebhookMock.call_count, 2)
+
     def test_process_return_none(self):
         # note: we choose an event type for which we do no processing
         event = Event.objects.create(kind="account.external_account.created", message={}, processed=False)
         self.assertIsNone(AccountExternalAccountCreatedWebhook(event).process())
+
+    def test_process_async_handler(self):
+        handled = []
+
+        async def process_webhook(webhook):
+            handled.append(webhook.event)
+
+        event = Event.objects.create(kind="account.external_account.created", message={}, processed=False)
+        with patch.object(AccountExternalAccountCreatedWebhook, "process_webhook", process_webhook, create=True):
+            AccountExternalAccountCreatedWebhook(event).process()
+        self.assertEqual(handled, [event])
+        self.assertTrue(event.processed)
+
+    async def test_aprocess(self):
+        received = []
+
+        def signal_handler(sender, event, **kwargs):
+            received.append(event)
+
+        signal = registry.get_signal("account.external_account.created")
+        signal.connect(signal_handler)
+        self.addCleanup(signal.disconnect, signal_handler)
+        event = await sync_to_async(Event.objects.create)(kind="account.external_account.created", message={})
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook") as ProcessWebhookMock:
+            await AccountExternalAccountCreatedWebhook(event).aprocess()
+        self.assertTrue(ProcessWebhookMock.called)
+        self.assertEqual(received, [event])
+        await sync_to_async(event.refresh_from_db)()
+        self.assertTrue(event.processed)
+
+    async def test_aprocess_exception_is_logged(self):
+        event = await sync_to_async(Event.objects.create)(kind="account.external_account.created", message={})
+        with patch("pinax.stripe.webhooks.Webhook.process_webhook", side_effect=ValueError("boom")):
+            with self.assertRaises(ValueError):
+                await AccountExternalAccountCreatedWebhook(event).aprocess()
+        self.assertTrue(await sync_to_async(EventProcessingException.objects.filter(event=event).exists)())
+
+
+# store every failure, so each failed event can be checked for its exception
+@override_settings(PINAX_STRIPE_EXCEPTION_SAMPLE_RATE=1.0)
+class WebhookBatchTests(TestCase):
+
+    def setUp(self):
+        self.WebhookClass = registry.get("invoice.paid")
+        self.events = [
+            Event.objects.create(stripe_id="evt_{}".format(index), kind="invoice.paid", message={})
+            for index in range(3)
+        ]
+
+    def assertOutcome(self, results, succeeded):
+        self.assertEqual([(event.stripe_id, ok) for event, ok in results], list(zip(["evt_0", "evt_1", "evt_2"], succeeded)))
+        for event, ok in zip(self.events, succeeded):
+            event.refresh_from_db()
+            self.assertEqual(event.processed, ok)
+            self.assertEqual(event.attempts, 1)
+            self.assertEqual(EventProcessingException.objects.filter(event=event).exists(), not ok)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook", autospec=True)
+    def test_default_process_batch(self, ProcessWebhookMock):
+        def process(webhook):
+            if webhook.event.stripe_id == "evt_1":
+                raise ValueError("boom")
+
+        ProcessWebhookMock.side_effect = process
+        self.assertOutcome(self.WebhookClass.process_many(self.events), [True, False, True])
+        self.assertEqual(ProcessWebhookMock.call_count, 3)
+
+    @patch("pinax.stripe.webhooks.Webhook.process_webhook")
+    def test_process_batch(self, ProcessWebhookMock):
+        with patch.object(self.WebhookClass, "process_batch") as ProcessBatchMock:
+            ProcessBatchMock.side_effect = lambda events: {events[1]: ValueError("boom")}
+            self.assertOutcome(self.WebhookClass.process_many(self.events), [True, False, True])
+        ProcessBatchMock.assert_called_once_with(self.events)
+        self.assertFalse(ProcessWebhookMock.called)
+        self.assertEqual(EventProcessingException.objects.get().message, "boom")
+
+    def test_process_batch_raises(self):
+        with patch.object(self.WebhookClass, "process_batch", side_effect=ValueError("boom")):
+            self.assertOutcome(self.WebhookClass.process_many(self.events), [False, False, False])
+        self.assertEqual(EventProcessingExceptionGroup.objects.get().count, 3)
+
+    def test_batch_signal(self):
+        received = []
+
+        def receiver(sender, events, **kwargs):
+            received.append((sender, [event.stripe_id for event in events]))
+
+        signal = WEBHOOK_BATCH_SIGNALS["invoice.paid"]
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        with patch.object(self.WebhookClass, "process_batch", return_value={self.events[0]: ValueError("boom")}):
+            self.assertOutcome(self.WebhookClass.process_many(self.events), [False, True, True])
+        self.assertEqual(received, [(self.WebhookClass, ["evt_1", "evt_2"])])
+
+    def test_batch_signal_raises(self):
+        def receiver(sender, events, **kwargs):
+            raise ValueError("boom")
+
+        signal = WEBHOOK_BATCH_SIGNALS["invoice.paid"]
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        self.assertOutcome(self.WebhookClass.process_many(self.events), [False, False, False])
+
+    def test_signal_raises(self):
+        def receiver(sender, event, **kwargs):
+            if event.stripe_id == "evt_2":
+                raise ValueError("boom")
+
+        signal = WEBHOOK_SIGNALS["invoice.paid"]
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        self.assertOutcome(self.WebhookClass.process_many(self.events), [True, True, False])
+
+    def test_skips_processed(self):
+        self.events[0].processed = True
+        results = self.WebhookClass.process_many(self.events)
+        self.assertEqual([event.stripe_id for event, ok in results], ["evt_1", "evt_2"])
+
+
+@override_settings(PINAX_STRIPE_ROBUST_RECEIVERS=True)
+class RobustReceiversTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.signal = WEBHOOK_SIGNALS["invoice.paid"]
+        self.event = Event.objects.create(stripe_id="evt_robust", kind="invoice.paid", message={})
+
+    def connect(self, receiver):
+        self.signal.connect(receiver)
+        self.addCleanup(self.signal.disconnect, receiver)
+
+    def test_failed_receiver_is_retried_alone(self):
+        failing = [True]
+
+        def first(sender, event, **kwargs):
+            self.calls.append("first")
+
+        def second(sender, event, **kwargs):
+            self.calls.append("second")
+            if failing:
+                raise ValueError("boom")
+
+        def third(sender, event, **kwargs):
+            self.calls.append("third")
+
+        for receiver in [first, second, third]:
+            self.connect(receiver)
+        WebhookClass = registry.get("invoice.paid")
+        with self.assertRaises(ValueError):
+            WebhookClass(self.event).process()
+        self.assertEqual(self.calls, ["first", "second", "third"])
+        self.event.refresh_from_db()
+        self.assertFalse(self.event.processed)
+        outcomes = {name.rsplit(".", 1)[-1]: outcome for name, outcome in self.event.receivers.items()}
+        self.assertEqual({name: outcome["succeeded"] for name, outcome in outcomes.items()}, {"first": True, "second": False, "third": True})
+        self.assertEqual(outcomes["second"]["error"], "ValueError: boom")
+        self.assertEqual(EventProcessingException.objects.filter(event=self.event).count(), 1)
+
+        failing.clear()
+        self.calls.clear()
+        WebhookClass(self.event).process()
+        self.assertEqual(self.calls, ["second"])
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.processed)
+
+    def test_every_failure_is_logged(self):
+        def first(sender, event, **kwargs):
+            raise ValueError("one")
+
+        def second(sender, event, **kwargs):
+            raise KeyError("two")
+
+        self.connect(first)
+        self.connect(second)
+        with self.assertRaises(ValueError):
+            registry.get("invoice.paid")(self.event).process()
+        self.assertEqual(
+            sorted(EventProcessingException.objects.filter(event=self.event).values_list("message", flat=True)),
+            ["'two'", "one"]
+        )
+
+    def test_independent_receivers_run_on_the_pool(self):
+        threads = {}
+
+        @independent
+        def first(sender, event, **kwargs):
+            threads["first"] = threading.current_thread().name
+
+        @independent
+        def second(sender, event, **kwargs):
+            threads["second"] = threading.current_thread().name
+
+        def third(sender, event, **kwargs):
+            threads["third"] = threading.current_thread().name
+
+        for receiver in [first, second, third]:
+            self.connect(receiver)
+        responses = registry.get("invoice.paid")(self.event).send_signal()
+        self.assertEqual([receiver for receiver, response in responses], [first, second, third])
+        self.assertTrue(threads["first"].startswith("pinax-stripe-receiver"))
+        self.assertTrue(threads["second"].startswith("pinax-stripe-receiver"))
+        self.assertEqual(threads["third"], threading.current_thread().name)
+        self.assertEqual(len(self.event.receivers), 3)
+
+    def test_receivers_keyed_by_signal_and_uid(self):
+        class Listener:
+            def __init__(self, calls, label):
+                self.calls = calls
+                self.label = label
+
+            def __call__(self, sender, event, **kwargs):
+                self.calls.append(self.label)
+
+            def receive(self, sender, event, **kwargs):
+                self.calls.append(self.label)
+
+        one, two = Listener(self.calls, "one"), Listener(self.calls, "two")
+        self.connect(one.receive)
+        self.connect(two.receive)
+        uid = Listener(self.calls, "uid")
+        self.signal.connect(uid, dispatch_uid="accounting")
+        self.addCleanup(self.signal.disconnect, dispatch_uid="accounting")
+        wildcard = registry.get_signal("invoice.*")
+        wildcard.connect(one.receive)
+        self.addCleanup(wildcard.disconnect, one.receive)
+
+        registry.get("invoice.paid")(self.event).send_signal()
+        self.assertEqual(self.calls, ["one", "two", "uid", "one"])
+        name = "invoice.paid:pinax.stripe.tests.test_webhooks.RobustReceiversTests.test_receivers_keyed_by_signal_and_uid.<locals>.Listener.receive"
+        self.assertEqual(sorted(self.event.receivers), sorted([
+            name,
+            name + "#2",
+            "invoice.paid:accounting",
+            name.replace("invoice.paid:", "invoice.*:"),
+        ]))
+
+    def test_async_receiver_has_savepoint(self):
+        async def failing(sender, event, **kwargs):
+            await sync_to_async(Event.objects.create)(stripe_id="evt_async", kind="invoice.paid", message={})
+            raise ValueError("boom")
+
+        def succeeding(sender, event, **kwargs):
+            Event.objects.create(stripe_id="evt_sync", kind="invoice.paid", message={})
+
+        self.connect(failing)
+        self.connect(succeeding)
+        responses = []
+        with self.assertRaises(ValueError):
+            responses = registry.get("invoice.paid")(self.event).send_signal_robust()
+        self.assertEqual(responses, [])
+        self.assertFalse(Event.objects.filter(stripe_id="evt_async").exists())
+        self.assertTrue(Event.objects.filter(stripe_id="evt_sync").exists())
+
+
+class LiveReceiversTests(TestCase):
+    """
+    Pins the parts of ``Signal``'s private state that ``live_receivers``
+    reads.
+    """
+
+    def setUp(self):
+        self.signal = Signal()
+
+    def test_sync_and_async(self):
+        def sync_receiver(sender, **kwargs):
+            pass
+
+        async def async_receiver(sender, **kwargs):
+            pass
+
+        self.signal.connect(async_receiver)
+        self.signal.connect(sync_receiver)
+        self.assertEqual(
+            sorted(live_receivers(self.signal, Webhook), key=lambda pair: pair[1].__name__),
+            [(None, async_receiver), (None, sync_receiver)]
+        )
+
+    def test_sender(self):
+        def receiver(sender, **kwargs):
+            pass
+
+        self.signal.connect(receiver, sender=AccountUpdatedWebhook)
+        self.assertEqual(live_receivers(self.signal, AccountUpdatedWebhook), [(None, receiver)])
+        self.assertEqual(live_receivers(self.signal, Webhook), [])
+
+    def test_dispatch_uid(self):
+        class Listener:
+            def receive(self, sender, **kwargs):
+                pass
+
+        listener = Listener()
+        self.signal.connect(listener.receive, dispatch_uid="listener")
+        self.signal.connect(listener.receive, weak=False, dispatch_uid="strong")
+        self.assertEqual(
+            live_receivers(self.signal, Webhook),
+            [("listener", listener.receive), ("strong", listener.receive)]
+        )
+
+    def test_dead_receivers(self):
+        def receiver(sender, **kwargs):
+            pass
+
+        self.signal.connect(receiver, dispatch_uid="gone")
+        del receiver
+        self.assertEqual(live_receivers(self.signal, Webhook), [])
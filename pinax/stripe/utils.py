@@ -1,12 +1,15 @@
 import datetime
 import decimal
+import hashlib
+import os
+import random
+import traceback
 
 from django.conf import settings
-from django.utils import timezone
 
 
 def convert_tstamp(response, field_name=None):
-    tz = timezone.utc if settings.USE_TZ else None
+    tz = datetime.timezone.utc if settings.USE_TZ else None
 
     if field_name and response.get(field_name):
         return datetime.datetime.fromtimestamp(
@@ -56,3 +59,54 @@ CURRENCY_SYMBOLS = {
 
 def obfuscate_secret_key(secret_key):
     return "*" * 20 + secret_key[-4:]
+
+
+# Field of ``data.object`` that holds the customer id, for event types where it
+# is not ``customer``; ``customer.*`` events about the customer itself carry it
+# as the object id.
+CUSTOMER_ID_FIELDS = {
+    "customer.created": "id",
+    "customer.updated": "id",
+    "customer.deleted": "id",
+}
+
+
+def extract_object(data):
+    """
+    The Stripe object an event payload is about, ``data.object``.
+    """
+    obj = ((data or {}).get("data") or {}).get("object")
+    return obj if isinstance(obj, dict) else {}
+
+
+def extract_customer_id(data):
+    data = data or {}
+    obj = extract_object(data)
+    value = obj.get(CUSTOMER_ID_FIELDS.get(data.get("type"), "customer"))
+    if isinstance(value, dict):
+        value = value.get("id")
+    return value if isinstance(value, str) else ""
+
+
+def retry_delay(attempts, base, maximum):
+    """
+    Seconds to wait after the given number of failed attempts: doubling from
+    ``base`` up to ``maximum``, with the upper half jittered so events that
+    failed together are not all retried together.
+    """
+    delay = min(maximum, base * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def exception_fingerprint(exception):
+    """
+    Identify an exception by its type and the functions its traceback went
+    through, leaving out the message, line numbers and install paths so that
+    repeats of the same failure share a fingerprint across events and deploys.
+    """
+    parts = ["{}.{}".format(type(exception).__module__, type(exception).__qualname__)]
+    parts.extend(
+        "{}:{}".format(os.path.basename(frame.filename), frame.name)
+        for frame in traceback.extract_tb(exception.__traceback__)
+    )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
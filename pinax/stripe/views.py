@@ -1,48 +1,168 @@
-from django.conf import settings
-from django.http import HttpResponse
+import asyncio
+import datetime
+import functools
+
+from django.http import Http404, HttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import View
 
 import stripe
+from asgiref.sync import sync_to_async
 
+from . import dedup, metrics, payloads
+from .conf import settings
 from .models import Event
+from .processing import get_backend
 from .webhooks import registry
 
 
 class Webhook(View):
 
+    def seen_before(self, data):
+        seen = dedup.get_filter()
+        return seen is not None and seen.seen(data["id"])
+
+    def store(self, event):
+        """
+        Insert ``event`` unless it is a duplicate, and only then remember its
+        id in the seen filter: remembered any earlier, a delivery whose insert
+        failed would have Stripe's retry acknowledged with nothing stored.
+        Returns the event, or ``None`` if it was a duplicate.
+        """
+        stripe_id = event.stripe_id
+        event = Event.objects.save_if_new(event)
+        seen = dedup.get_filter()
+        if seen is not None:
+            seen.remember(stripe_id)
+        return event
+
+    def build_event(self, data, backend):
+        event = Event.objects.build(data)
+        if backend.processes_immediately:
+            # keep the worker off the event while the first attempt is made here
+            event.next_attempt_at += datetime.timedelta(seconds=settings.PINAX_STRIPE_RETRY_BASE_DELAY)
+        elif settings.PINAX_STRIPE_COALESCE_WINDOW and data["type"] in settings.PINAX_STRIPE_LATEST_WINS_KINDS:
+            # let the rest of a burst of updates to the object arrive first
+            event.next_attempt_at += datetime.timedelta(seconds=settings.PINAX_STRIPE_COALESCE_WINDOW)
+        return event
+
     def add_event(self, data):
         kind = data["type"]
-        event = Event.objects.create(
-            account_id=data.get("account", ""),
-            stripe_id=data["id"],
-            kind=kind,
-            livemode=data["livemode"],
-            message=data,
-            api_version=data["api_version"],
-            pending_webhooks=data["pending_webhooks"]
-        )
-        WebhookClass = registry.get(kind)
+        if self.seen_before(data):
+            metrics.increment("event.duplicate", kind=kind)
+            return
+        backend = get_backend()
+        event = self.build_event(data, backend)
+        with metrics.timer("event.insert", kind=kind):
+            event = self.store(event)
+        if event is None:
+            metrics.increment("event.duplicate", kind=kind)
+            return
+        metrics.increment("event.received", kind=kind)
+        metrics.observe_lag("event.delivery_lag", data.get("created"), kind=kind)
+        WebhookClass = registry.get(event.kind)
         if WebhookClass is not None:
-            webhook = WebhookClass(event)
-            webhook.process()
+            backend.enqueue(WebhookClass(event))
+
+    def parse(self, request):
+        """
+        Return the verified and parsed event payload of the request, or
+        ``None`` if it is not a valid delivery.
+        """
+        signature = request.META["HTTP_STRIPE_SIGNATURE"]
+        payload = request.body
+        try:
+            with metrics.timer("webhook.verify"):
+                payloads.verify_signature(payload, signature, settings.PINAX_STRIPE_ENDPOINT_SECRET)
+                return payloads.parse(payload)
+        except ValueError:
+            metrics.increment("webhook.invalid")
+        except stripe.error.SignatureVerificationError:
+            metrics.increment("webhook.invalid")
+        return None
 
     @method_decorator(csrf_exempt)
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        signature = self.request.META["HTTP_STRIPE_SIGNATURE"]
-        payload = self.request.body
-        event = None
-        try:
-            event = stripe.Webhook.construct_event(payload, signature, settings.PINAX_STRIPE_ENDPOINT_SECRET)
-        except ValueError:
-            return HttpResponse(status=400)
-        except stripe.error.SignatureVerificationError:
-            return HttpResponse(status=400)
+        with metrics.timer("webhook.request"):
+            data = self.parse(request)
+            if data is None:
+                return HttpResponse(status=400)
+            self.add_event(data)
+            return HttpResponse()
+
+
+class AsyncWebhook(Webhook):
+    """
+    The webhook view for ASGI deployments.
+
+    Verification runs on the event loop, the database work in a single
+    ``sync_to_async`` call each for the duplicate check and the insert, and
+    the handler through the backend's ``aenqueue`` (see ``Webhook.aprocess``),
+    so a delivery only holds a thread from the sync pool while it talks to
+    the database.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # class-based views only run async handlers from Django 4.1 on, so
+        # hand Django a coroutine function that awaits whatever the handler
+        # returns
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        return functools.wraps(view)(async_view)
+
+    async def aadd_event(self, data):
+        kind = data["type"]
+        if await sync_to_async(self.seen_before)(data):
+            metrics.increment("event.duplicate", kind=kind)
+            return
+        backend = get_backend()
+        event = self.build_event(data, backend)
+        with metrics.timer("event.insert", kind=kind):
+            event = await sync_to_async(self.store)(event)
+        if event is None:
+            metrics.increment("event.duplicate", kind=kind)
+            return
+        metrics.increment("event.received", kind=kind)
+        metrics.observe_lag("event.delivery_lag", data.get("created"), kind=kind)
+        WebhookClass = registry.get(event.kind)
+        if WebhookClass is not None:
+            aenqueue = getattr(backend, "aenqueue", None)
+            if aenqueue is None:
+                await sync_to_async(backend.enqueue)(WebhookClass(event))
+            else:
+                await aenqueue(WebhookClass(event))
+
+    async def post(self, request, *args, **kwargs):
+        with metrics.timer("webhook.request"):
+            data = self.parse(request)
+            if data is None:
+                return HttpResponse(status=400)
+            await self.aadd_event(data)
+            return HttpResponse()
+
+
+class Metrics(View):
+    """
+    Serves the ``PrometheusSink`` metrics in the Prometheus text format.
+
+    Not routed by default; add it to your urls (behind whatever protection
+    your metrics endpoints need) when ``PINAX_STRIPE_METRICS_SINK`` is
+    ``"pinax.stripe.metrics.PrometheusSink"``.
+    """
 
-        if not Event.objects.filter(stripe_id=event.id).exists():
-            self.add_event(event.to_dict_recursive())
-        return HttpResponse()
+    def get(self, request, *args, **kwargs):
+        sink = metrics.get_sink()
+        if not isinstance(sink, metrics.PrometheusSink):
+            raise Http404("Prometheus metrics are not enabled")
+        return HttpResponse(sink.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
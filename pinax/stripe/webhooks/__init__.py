@@ -1,3 +1,13 @@
 from .base import Webhook  # noqa
-from .generated import *  # noqa
+from .generated import EVENT_TYPES
 from .registry import registry  # noqa
+
+registry.load(EVENT_TYPES)
+
+
+def __getattr__(attr):
+    # handler classes such as ``InvoicePaidWebhook`` are created on first use
+    webhook = registry.find_class(attr)
+    if webhook is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, attr))
+    return webhook
@@ -1,9 +1,15 @@
-import sys
+import inspect
+import random
 import traceback
 
+from django.db import transaction
+
 import stripe
+from asgiref.sync import async_to_sync, sync_to_async
 
-from .. import models
+from .. import metrics, models, receivers
+from ..conf import settings
+from ..utils import exception_fingerprint
 from .registry import registry
 
 
@@ -19,42 +25,273 @@ class Webhook(metaclass=Registerable):
 
     name = None
 
-    def __init__(self, event):
+    def __init__(self, event, coalesced=None):
         if event.kind != self.name:
             raise Exception("The Webhook handler ({}) received the wrong type of Event ({})".format(self.name, event.kind))
         self.event = event
+        # older pending events for the same object that this run stands in for
+        self.coalesced = coalesced or []
         self.stripe_account = None
 
     def send_signal(self):
-        signal = registry.get_signal(self.name)
-        if signal:
-            return signal.send(sender=self.__class__, event=self.event)
+        if settings.PINAX_STRIPE_ROBUST_RECEIVERS:
+            return self.send_signal_robust()
+        responses = []
+        for signal in registry.resolve(self.name).signals:
+            responses.extend(signal.send(sender=self.__class__, event=self.event, coalesced=self.coalesced))
+        return responses
+
+    def send_signal_robust(self):
+        """
+        Run the receivers that have not yet succeeded for this event, each in
+        a savepoint of its own, recording their outcome in
+        ``Event.receivers``. If any fail, all but the first of their
+        exceptions are logged here and the first is raised.
+        """
+        dispatch = registry.resolve(self.name)
+        responses, exceptions = receivers.send(
+            zip(dispatch.names, dispatch.signals),
+            self.__class__,
+            self.event.receivers,
+            self.name,
+            event=self.event,
+            coalesced=self.coalesced
+        )
+        if exceptions:
+            for exception in exceptions[1:]:
+                self.log_exception(data=getattr(exception, "http_body", None), exception=exception)
+            raise exceptions[0]
+        return responses
+
+    async def asend_signal(self):
+        """
+        Send the signals with ``Signal.asend`` where Django has it (5.0 and
+        later), which runs async receivers on the event loop and sync ones
+        through ``sync_to_async``.
+        """
+        if settings.PINAX_STRIPE_ROBUST_RECEIVERS:
+            return await sync_to_async(self.send_signal_robust)()
+        responses = []
+        for signal in registry.resolve(self.name).signals:
+            kwargs = {"sender": self.__class__, "event": self.event, "coalesced": self.coalesced}
+            if hasattr(signal, "asend"):
+                responses.extend(await signal.asend(**kwargs))
+            else:
+                responses.extend(await sync_to_async(signal.send)(**kwargs))
+        return responses
 
     def log_exception(self, data, exception):
-        info = sys.exc_info()
-        info_formatted = "".join(traceback.format_exception(*info)) if info[1] is not None else ""
+        """
+        Count the exception in its group and, for the first occurrence and a
+        ``PINAX_STRIPE_EXCEPTION_SAMPLE_RATE`` share of the rest, keep the
+        full traceback and response data as well.
+        """
+        group_id, created = models.EventProcessingExceptionGroup.objects.record(
+            exception_fingerprint(exception),
+            exception,
+            event=self.event
+        )
+        if not created and random.random() >= settings.PINAX_STRIPE_EXCEPTION_SAMPLE_RATE:
+            return
+        tb = exception.__traceback__
+        info_formatted = "".join(traceback.format_exception(type(exception), exception, tb)) if tb is not None else ""
         models.EventProcessingException.objects.create(
             event=self.event,
+            group_id=group_id,
             data=data or "",
-            message=str(exception),
+            message=str(exception)[:500],
             traceback=info_formatted
         )
 
     def process(self):
-        if self.event.processed:
+        if self.event.processed or self.skip_superseded():
             return
 
+        kind = self.event.kind
+        self.event.attempts += 1
         try:
-            self.process_webhook()
-            self.send_signal()
-            self.event.processed = True
-            self.event.save()
+            # in savepoints, so that a database error in the handler or a
+            # receiver leaves the worker's transaction usable for recording
+            # the failure
+            with transaction.atomic(), metrics.timer("event.handler", kind=kind):
+                self.run_handler()
+            if settings.PINAX_STRIPE_ROBUST_RECEIVERS:
+                # receivers have savepoints of their own, and the work of the
+                # ones that succeeded must outlive a failure
+                with metrics.timer("event.signal", kind=kind):
+                    self.send_signal()
+            else:
+                with transaction.atomic(), metrics.timer("event.signal", kind=kind):
+                    self.send_signal()
+            self.mark_processed()
         except Exception as e:
-            data = None
-            if isinstance(e, stripe.error.StripeError):
-                data = e.http_body
-            self.log_exception(data=data, exception=e)
+            self.mark_failed(e)
             raise e
 
+    async def aprocess(self):
+        """
+        ``process`` for the async webhook view: an ``async def
+        process_webhook`` and async signal receivers run on the event loop,
+        everything else through ``sync_to_async``.
+        """
+        if self.event.processed or await sync_to_async(self.skip_superseded)():
+            return
+
+        kind = self.event.kind
+        self.event.attempts += 1
+        try:
+            with metrics.timer("event.handler", kind=kind):
+                await self.arun_handler()
+            with metrics.timer("event.signal", kind=kind):
+                await self.asend_signal()
+            await sync_to_async(self.mark_processed)()
+        except Exception as e:
+            await sync_to_async(self.mark_failed)(e)
+            raise e
+
+    def run_handler(self):
+        if inspect.iscoroutinefunction(self.process_webhook):
+            return async_to_sync(self.process_webhook)()
+        return self.process_webhook()
+
+    async def arun_handler(self):
+        if inspect.iscoroutinefunction(self.process_webhook):
+            return await self.process_webhook()
+        return await sync_to_async(self.process_webhook)()
+
+    @classmethod
+    def process_many(cls, events):
+        """
+        Process several events of this type with one ``process_batch`` call.
+
+        Signals are sent and each event is marked processed (or failed, with
+        its exception logged) on its own, so one bad event does not hold back
+        the rest. Returns a list of ``(event, succeeded)`` tuples.
+        """
+        results = []
+        webhooks = []
+        for event in events:
+            if event.processed:
+                continue
+            webhook = cls(event)
+            if webhook.skip_superseded():
+                results.append((event, True))
+            else:
+                webhook.event.attempts += 1
+                webhooks.append(webhook)
+        if webhooks:
+            failures = cls.run_batch([webhook.event for webhook in webhooks])
+            for webhook in webhooks:
+                results.append((webhook.event, webhook.finish_batched(failures.get(webhook.event))))
+        return results
+
+    @classmethod
+    def run_batch(cls, events):
+        """
+        Run ``process_batch`` and then the batch signal for the events it
+        handled, returning a dict of the events that failed and why.
+        """
+        kind = cls.name
+        try:
+            with transaction.atomic(), metrics.timer("event.batch_handler", kind=kind):
+                failures = dict(cls.process_batch(events) or {})
+        except Exception as e:
+            return dict.fromkeys(events, e)
+        handled = [event for event in events if event not in failures]
+        signal = registry.get_batch_signal(kind, create=False)
+        if signal is not None and handled:
+            try:
+                with transaction.atomic(), metrics.timer("event.batch_signal", kind=kind):
+                    signal.send(sender=cls, events=handled)
+            except Exception as e:
+                failures.update(dict.fromkeys(handled, e))
+        return failures
+
+    def finish_batched(self, exception=None):
+        if exception is None:
+            try:
+                if settings.PINAX_STRIPE_ROBUST_RECEIVERS:
+                    # receivers have savepoints of their own, and the work of
+                    # the ones that succeeded must outlive a failure
+                    self.signal_and_mark_processed()
+                else:
+                    with transaction.atomic():
+                        self.signal_and_mark_processed()
+            except Exception as e:
+                exception = e
+        if exception is not None:
+            self.mark_failed(exception)
+        return exception is None
+
+    def signal_and_mark_processed(self):
+        with metrics.timer("event.signal", kind=self.event.kind):
+            self.send_signal()
+        self.mark_processed()
+
+    @classmethod
+    def process_batch(cls, events):
+        """
+        Handle several events of this type at once, e.g. with bulk queries.
+
+        Return a dict mapping the events that failed to their exception;
+        raising fails the whole batch. By default ``process_webhook`` runs
+        for each event in turn.
+        """
+        failures = {}
+        for event in events:
+            try:
+                with transaction.atomic():
+                    cls(event).run_handler()
+            except Exception as e:
+                failures[event] = e
+        return failures
+
+    def skip_superseded(self):
+        """
+        Mark the event processed without running it if its type is one of
+        ``PINAX_STRIPE_LATEST_WINS_KINDS`` and a newer state of its object
+        has been applied already.
+        """
+        kind = self.event.kind
+        if kind not in settings.PINAX_STRIPE_LATEST_WINS_KINDS or not self.event.superseded():
+            return False
+        self.event.processed = True
+        self.event.dead_letter = False
+        self.event.save(update_fields=["processed", "dead_letter"])
+        self.settle_coalesced()
+        metrics.increment("event.superseded", kind=kind)
+        return True
+
+    def mark_processed(self):
+        kind = self.event.kind
+        self.event.processed = True
+        self.event.dead_letter = False
+        self.event.save()
+        self.settle_coalesced()
+        metrics.increment("event.processed", kind=kind)
+        created = self.event.stripe_created_at
+        metrics.observe_lag("event.processing_lag", created.timestamp() if created else None, kind=kind)
+
+    def mark_failed(self, exception):
+        metrics.increment("event.failed", kind=self.event.kind)
+        data = None
+        if isinstance(exception, stripe.error.StripeError):
+            data = exception.http_body
+        self.log_exception(data=data, exception=exception)
+        self.event.record_failure()
+        if self.coalesced:
+            # retried along with this event rather than on their own
+            models.Event.objects.filter(pk__in=[event.pk for event in self.coalesced]).update(
+                next_attempt_at=self.event.next_attempt_at
+            )
+
+    def settle_coalesced(self):
+        if self.coalesced:
+            models.Event.objects.filter(pk__in=[event.pk for event in self.coalesced]).update(
+                processed=True,
+                dead_letter=False
+            )
+            metrics.increment("event.coalesced", kind=self.event.kind, value=len(self.coalesced))
+
     def process_webhook(self):
         return
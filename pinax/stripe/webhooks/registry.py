@@ -1,31 +1,126 @@
+import fnmatch
+from collections import namedtuple
+from types import MappingProxyType
+
 from django.dispatch import Signal
 
+# names holds the event type or wildcard pattern of each of the signals
+Dispatch = namedtuple("Dispatch", ["webhook", "signals", "names"])
+
+
+def class_name(name):
+    return "{}Webhook".format(name.replace(".", " ").replace("_", " ").title().replace(" ", ""))
+
 
 class WebhookRegistry:
+    """
+    Maps event types to their handler class and signal.
+
+    Event types known from Stripe's list are loaded as plain data; their
+    handler class and signal are only created the first time they are asked
+    for.
+    """
 
     def __init__(self):
         self._registry = {}
+        self._patterns = {}
+        self._generated = {}
+        self._class_names = None
+        self._table = {}
+        self._batch_signals = {}
+
+    def load(self, event_types):
+        for name, description in event_types.items():
+            self._registry.setdefault(name, {
+                "webhook": None,
+                "signal": None,
+                "description": description
+            })
+        self._class_names = None
 
     def register(self, webhook):
-        self._registry[webhook.name] = {
-            "webhook": webhook,
-            "signal": Signal()
-        }
+        entry = self._registry.setdefault(webhook.name, {"signal": None, "description": None})
+        entry["webhook"] = webhook
+        self._table.pop(webhook.name, None)
 
     def unregister(self, name):
         del self._registry[name]
+        self._table.pop(name, None)
 
     def keys(self):
         return self._registry.keys()
 
-    def get(self, name):
-        return self[name]["webhook"]
+    def generated(self, name):
+        """
+        Return the handler class generated for a known event type, even if it
+        has been overridden by a subclass.
+        """
+        webhook = self._generated.get(name)
+        if webhook is None:
+            from .base import Webhook
+
+            entry = self._registry[name]
+            # name is set afterwards so that the metaclass does not register
+            # the class over a subclass that may already be registered
+            webhook = type(Webhook)(class_name(name), (Webhook,), {
+                "__module__": "pinax.stripe.webhooks",
+                "description": entry["description"],
+            })
+            webhook.name = name
+            if entry["webhook"] is None:
+                self.register(webhook)
+            self._generated[name] = webhook
+        return webhook
+
+    def find_class(self, attr):
+        if self._class_names is None:
+            self._class_names = {
+                class_name(name): name
+                for name, entry in self._registry.items()
+                if entry["description"] is not None
+            }
+        name = self._class_names.get(attr)
+        return self.generated(name) if name in self._registry else None
+
+    def get(self, name, default=None):
+        try:
+            entry = self[name]
+        except KeyError:
+            return default
+        if entry["webhook"] is None:
+            self.generated(name)
+        return entry["webhook"]
 
     def get_signal(self, name, default=None):
+        """
+        Return the signal for an event type.
+
+        ``name`` may also be a pattern such as ``invoice.*``, in which case the
+        signal is sent for every matching event type.
+        """
+        if "*" in name:
+            if name not in self._patterns:
+                self._patterns[name] = Signal()
+                self._table.clear()
+            return self._patterns[name]
         try:
-            return self[name]["signal"]
+            entry = self[name]
         except KeyError:
             return default
+        if entry["signal"] is None:
+            entry["signal"] = Signal()
+        return entry["signal"]
+
+    def get_batch_signal(self, name, create=True):
+        """
+        Return the signal sent once for every batch of events of type
+        ``name`` processed through ``Webhook.process_many``, with the list of
+        events that the handler processed successfully as ``events``.
+        """
+        signal = self._batch_signals.get(name)
+        if signal is None and create:
+            signal = self._batch_signals[name] = Signal()
+        return signal
 
     def signals(self):
         return {
@@ -33,6 +128,37 @@ class WebhookRegistry:
             for key in self.keys()
         }
 
+    def _dispatch(self, name):
+        webhook = self.get(name)
+        named = [(name, self.get_signal(name))] if name in self._registry else []
+        named.extend(
+            (pattern, signal)
+            for pattern, signal in self._patterns.items()
+            if fnmatch.fnmatchcase(name, pattern)
+        )
+        return Dispatch(webhook, tuple(signal for _, signal in named), tuple(pattern for pattern, _ in named))
+
+    def compile(self):
+        """
+        Reset the table that maps event types to their handler and all the
+        signals, exact and wildcard, to send for them, and return a read-only
+        view of it.
+
+        Entries are filled in the first time each event type is resolved
+        rather than all at once in ``AppConfig.ready``: that would create
+        every handler class and signal up front, and miss the wildcard
+        signals of apps that are ready after this one.
+        """
+        self._table.clear()
+        return MappingProxyType(self._table)
+
+    def resolve(self, name):
+        try:
+            return self._table[name]
+        except KeyError:
+            dispatch = self._table[name] = self._dispatch(name)
+            return dispatch
+
     def __getitem__(self, name):
         return self._registry[name]
 
@@ -8,36 +8,20 @@ data = response.json()
 version = data["event_types"]["data"]["version"]
 event_types = data["event_types"]["data"]["event_types"]
 
-class_template = """class {class_name}Webhook(Webhook):
-    name = "{name}"
-    description = "{description}"
-
-
-"""
-
 header = f"""# Stripe API Version: {version}
-from .base import Webhook
-
-
+EVENT_TYPES = {{
 """
 
-print(f"Creating {len(event_types)} classes...")
+print(f"Writing {len(event_types)} event types...")
 with open("pinax/stripe/webhooks/generated.py", "wb") as fp:
     fp.write(header.encode("utf-8"))
-    for index, event_type in enumerate(event_types):
+    for event_type in event_types:
         name = event_type["type"]
         description = event_type["description"].replace('"', "'")
         class_name = name.replace(".", " ").replace("_", " ").title().replace(" ", "")
 
-        code = class_template.format(
-            class_name=class_name,
-            name=name,
-            description=description
-        )
-        if index + 1 == len(event_types):
-            code = f"{code.strip()}\n"
-
-        fp.write(code.encode("utf-8"))
+        fp.write(f'    "{name}": "{description}",\n'.encode("utf-8"))
 
         print(f"* `{class_name}Webhook` - `{name}` - {description}")
+    fp.write("}\n".encode("utf-8"))
     fp.close()